@@ -0,0 +1,63 @@
+# 对比 PyPDF2 PdfMerger 与流式合并引擎的峰值内存和耗时
+#   python -m benchmarks.bench_merge --scale 2
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import run_isolated, dir_size
+from benchmarks.corpus import ensure_corpus, list_pdfs
+
+
+def merge_pypdf2(pdf_list, output_path):
+    # 改造前的 merge_pdfs 实现
+    from PyPDF2 import PdfMerger
+
+    merger = PdfMerger()
+    for pdf in pdf_list:
+        merger.append(pdf)
+    merger.write(output_path)
+    merger.close()
+
+
+def merge_streaming(pdf_list, output_path):
+    from pdf_utils import merge_pdfs
+
+    merge_pdfs(pdf_list, output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合并引擎基准测试")
+    parser.add_argument("--scale", type=float, default=1.0, help="合成语料规模（默认 300 个 3 页发票）")
+    parser.add_argument("--corpus", help="已有的 PDF 目录，不指定则生成合成数据")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            inputs = list_pdfs(args.corpus)
+        else:
+            inputs = ensure_corpus(os.path.join(tmp, "corpus"), "invoices", args.scale)
+        results = {"inputs": len(inputs), "input_bytes": dir_size(inputs), "engines": {}}
+        for name, func in (("pypdf2", merge_pypdf2), ("streaming", merge_streaming)):
+            out = os.path.join(tmp, f"{name}.pdf")
+            r = run_isolated(func, inputs, out)
+            results["engines"][name] = {
+                "wall_s": round(r["wall_s"], 3),
+                "peak_rss_mb": round(r["peak_rss"] / 2 ** 20, 1),
+                "output_bytes": os.path.getsize(out),
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['inputs']} 个文件，共 {results['input_bytes'] / 2 ** 20:.1f} MB")
+    for name, r in results["engines"].items():
+        print(f"{name:>10}: {r['wall_s']:8.2f} s  峰值 {r['peak_rss_mb']:8.1f} MB  输出 {r['output_bytes'] / 2 ** 20:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
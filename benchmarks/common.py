@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import multiprocessing
+
+
+def peak_rss_bytes():
+    # 当前进程的峰值常驻内存
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        )
+        return counters.PeakWorkingSetSize
+    return _maxrss("RUSAGE_SELF")
+
+
+def peak_children_rss_bytes():
+    # 已结束的子进程（如进程池的工作进程）中峰值常驻内存最大的一个；不是各进程之和。
+    # Windows 上没有对应接口，返回 None
+    if sys.platform == "win32":
+        return None
+    return _maxrss("RUSAGE_CHILDREN")
+
+
+def _maxrss(who):
+    import resource
+    peak = resource.getrusage(getattr(resource, who)).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _child(queue, func, args):
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+        queue.put({"wall_s": time.perf_counter() - start, "peak_rss": peak_rss_bytes(),
+                   "peak_rss_children": peak_children_rss_bytes(), "result": result})
+    except Exception as e:
+        queue.put({"error": repr(e)})
+
+
+def run_isolated(func, *args):
+    # 每个用例在独立子进程中执行，峰值内存互不影响
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(queue, func, args))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+
+def dir_size(paths):
+    return sum(os.path.getsize(p) for p in paths)
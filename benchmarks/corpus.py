@@ -0,0 +1,101 @@
+# 用 PyMuPDF 离线生成可复现的合成测试语料
+import os
+import json
+import random
+
+import pymupdf
+
+# 语料名 -> (生成函数名, 文件数, 每个文件的页数)，实际数量再乘以 scale
+CORPORA = {
+    "small": ("_make_text", 400, 2),
+    "huge": ("_make_text", 2, 2500),
+    "scans": ("_make_scans", 20, 20),
+    "fonts": ("_make_fonts", 30, 30),
+    "invoices": ("_make_invoices", 300, 3),
+}
+
+
+def _noise_pixmap(rng, width, height):
+    # 近似扫描件的灰度噪声图，压缩率低
+    data = rng.randbytes(width * height)
+    return pymupdf.Pixmap(pymupdf.csGRAY, width, height, data, False)
+
+
+def _make_text(path, pages, rng):
+    doc = pymupdf.open()
+    for k in range(pages):
+        page = doc.new_page()
+        y = 72
+        for line in range(40):
+            words = " ".join(str(rng.randrange(10 ** 6)) for _ in range(8))
+            page.insert_text((72, y), f"{k + 1}.{line} {words}", fontsize=10)
+            y += 16
+    doc.save(path, deflate=True)
+
+
+def _make_scans(path, pages, rng):
+    doc = pymupdf.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=_noise_pixmap(rng, 850, 1100))
+    doc.save(path, deflate=True)
+
+
+def _make_fonts(path, pages, rng):
+    # 每页嵌入不同字体，资源量大
+    names = ["cjk", "helv", "tiro", "cour", "hebo", "tibo"]
+    doc = pymupdf.open()
+    for k in range(pages):
+        page = doc.new_page()
+        font = names[k % len(names)]
+        page.insert_font(fontname=f"F{k % len(names)}", fontbuffer=pymupdf.Font(font).buffer)
+        for line in range(30):
+            page.insert_text((72, 72 + line * 20), f"font {font} page {k + 1} {rng.random():.6f}",
+                             fontname=f"F{k % len(names)}", fontsize=12)
+    doc.save(path, garbage=3, deflate=True)
+
+
+def _make_invoices(path, pages, rng):
+    # 共享同一字体和 logo 图片的发票，用于检验跨文件资源去重
+    doc = pymupdf.open()
+    logo = _make_invoices.logo
+    for k in range(pages):
+        page = doc.new_page()
+        page.insert_font(fontname="F0", fontbuffer=pymupdf.Font("cjk").buffer)
+        page.insert_text((72, 72), f"发票 {rng.randrange(10 ** 8)} 第 {k + 1} 页", fontname="F0", fontsize=14)
+        page.insert_image(pymupdf.Rect(72, 100, 522, 400), pixmap=logo)
+    doc.save(path, garbage=3, deflate=True)
+
+
+_make_invoices.logo = _noise_pixmap(random.Random(0), 600, 400)
+
+
+def ensure_corpus(root, name, scale=1.0, seed=0):
+    # 已生成且参数一致的语料直接复用
+    func_name, files, pages = CORPORA[name]
+    # 大文件语料按页数缩放，其余按文件数缩放
+    if files <= 2:
+        pages = max(1, round(pages * scale))
+    else:
+        files = max(1, round(files * scale))
+    out_dir = os.path.join(root, name)
+    stamp = os.path.join(out_dir, "corpus.json")
+    params = {"name": name, "files": files, "pages": pages, "seed": seed}
+    if os.path.exists(stamp):
+        with open(stamp, encoding="utf-8") as f:
+            if json.load(f) == params:
+                return list_pdfs(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    for old in list_pdfs(out_dir):
+        os.remove(old)
+    rng = random.Random(seed)
+    func = globals()[func_name]
+    for n in range(files):
+        func(os.path.join(out_dir, f"{name}_{n:05d}.pdf"), pages, rng)
+    with open(stamp, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return list_pdfs(out_dir)
+
+
+def list_pdfs(directory):
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(".pdf"))
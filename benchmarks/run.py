@@ -0,0 +1,242 @@
+# 缩略图、页数探测、合并和各拆分模式的基准测试，结果写成 JSON 便于跨提交对比
+#   python -m benchmarks.run --output results.json
+#   python -m benchmarks.run --compare baseline.json --threshold 0.15
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.common import run_isolated, dir_size
+from benchmarks.corpus import CORPORA, ensure_corpus
+
+
+def case_thumbnail(inputs, out_dir):
+    # 界面实际使用的路径：工作进程里渲染缩略图并读出文档信息
+    from pdf_utils import thumbnail_task
+
+    for pdf in inputs:
+        thumbnail_task(pdf, 120, 150)
+    return {"files": len(inputs), "pages": len(inputs)}
+
+
+def case_generate_thumbnail(inputs, out_dir):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    from pdf_utils import generate_thumbnail
+
+    app = QGuiApplication([])
+    for pdf in inputs:
+        generate_thumbnail(pdf)
+    del app
+    return {"files": len(inputs), "pages": len(inputs)}
+
+
+def case_page_count(inputs, out_dir):
+    from pdf_utils import get_pdf_page_count
+
+    pages = sum(get_pdf_page_count(pdf) for pdf in inputs)
+    return {"files": len(inputs), "pages": pages}
+
+
+def case_merge(inputs, out_dir, options=None):
+    from pdf_utils import merge_pdfs
+
+    report = merge_pdfs(inputs, os.path.join(out_dir, "merged.pdf"), options=options)
+    return {"files": len(inputs), "pages": report.pages, "output_bytes": report.bytes_written,
+            "saved_bytes": report.bytes_saved}
+
+
+def case_merge_compact(inputs, out_dir):
+    from pdf_utils import SaveOptions
+
+    return case_merge(inputs, out_dir, SaveOptions.compact())
+
+
+def _split_case(inputs, out_dir, func, *args, **kwargs):
+    outputs, pages, saved = [], 0, 0
+    for pdf in inputs:
+        report = func(pdf, out_dir, *args, **kwargs)
+        outputs.extend(report.outputs)
+        pages += report.pages
+        saved += report.bytes_saved
+    return {"files": len(inputs), "pages": pages, "outputs": len(outputs), "output_bytes": dir_size(outputs),
+            "saved_bytes": saved}
+
+
+def case_split_page(inputs, out_dir):
+    from pdf_utils import split_by_page
+
+    return _split_case(inputs, out_dir, split_by_page)
+
+
+def case_split_page_compact(inputs, out_dir):
+    from pdf_utils import split_by_page, SaveOptions
+
+    return _split_case(inputs, out_dir, split_by_page, options=SaveOptions.compact())
+
+
+def case_split_step(inputs, out_dir):
+    from pdf_utils import split_by_step
+
+    return _split_case(inputs, out_dir, split_by_step, 10)
+
+
+def case_split_ranges(inputs, out_dir):
+    from pdf_utils import split_by_custom_ranges, get_pdf_page_count
+
+    outputs, pages = [], 0
+    for pdf in inputs:
+        total = get_pdf_page_count(pdf)
+        spec = ",".join(f"{s}-{min(s + 4, total)}" for s in range(1, total + 1, 7))
+        report = split_by_custom_ranges(pdf, out_dir, spec)
+        outputs.extend(report.outputs)
+        pages += total
+    return {"files": len(inputs), "pages": pages, "outputs": len(outputs), "output_bytes": dir_size(outputs)}
+
+
+def case_export(inputs, out_dir):
+    from pdf_utils import export_images
+
+    outputs, pages, timings = [], 0, []
+    for i, pdf in enumerate(inputs):
+        # 各输入的图片文件名相同，分目录存放
+        target = os.path.join(out_dir, str(i))
+        os.makedirs(target, exist_ok=True)
+        report = export_images(pdf, target)
+        outputs.extend(report.outputs)
+        pages += report.pages
+        timings.extend(seconds for _, seconds, _ in report.timings)
+    timings.sort()
+    return {"files": len(inputs), "pages": pages, "outputs": len(outputs), "output_bytes": dir_size(outputs),
+            "page_p50_ms": round(1000 * timings[len(timings) // 2], 2) if timings else None}
+
+
+CASES = {
+    "thumbnail": case_thumbnail,
+    "generate_thumbnail": case_generate_thumbnail,
+    "page_count": case_page_count,
+    "merge": case_merge,
+    "merge_compact": case_merge_compact,
+    "split_page": case_split_page,
+    "split_page_compact": case_split_page_compact,
+    "split_step": case_split_step,
+    "split_ranges": case_split_ranges,
+    "export": case_export,
+}
+
+# 拆分和导出只在大文件语料上有意义
+SPLIT_CORPORA = ("huge", "scans", "fonts")
+
+
+def plan(corpora, cases):
+    for corpus in corpora:
+        for case in cases:
+            if case.startswith(("split", "export")) and corpus not in SPLIT_CORPORA:
+                continue
+            yield corpus, case
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import pymupdf
+
+    results = {}
+    corpus_root = args.corpus_dir or os.path.join(tempfile.gettempdir(), "pdftool-bench-corpus")
+    for corpus, case in plan(args.corpora, args.cases):
+        inputs = ensure_corpus(corpus_root, corpus, args.scale)
+        best = None
+        for _ in range(args.repeat):
+            out_dir = tempfile.mkdtemp(prefix="pdftool-bench-")
+            try:
+                r = run_isolated(CASES[case], inputs, out_dir)
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+            if best is None or r["wall_s"] < best["wall_s"]:
+                best = r
+        stats = dict(best["result"])
+        stats["wall_s"] = round(best["wall_s"], 4)
+        stats["pages_per_s"] = round(stats["pages"] / best["wall_s"], 1) if best["wall_s"] else None
+        stats["peak_rss_mb"] = round(best["peak_rss"] / 2 ** 20, 1)
+        # 多进程拆分、导出的内存主要在工作进程里，单独记录
+        if best.get("peak_rss_children") is not None:
+            stats["peak_children_rss_mb"] = round(best["peak_rss_children"] / 2 ** 20, 1)
+        stats["input_bytes"] = dir_size(inputs)
+        key = f"{corpus}/{case}"
+        results[key] = stats
+        print(f"{key:<28} {stats['wall_s']:9.3f} s {stats['pages_per_s'] or 0:10.1f} 页/秒 {stats['peak_rss_mb']:8.1f} MB "
+              f"子进程 {stats.get('peak_children_rss_mb', 0):8.1f} MB", file=sys.stderr)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pymupdf": pymupdf.VersionBind,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # 耗时或峰值内存超过基线 (1 + threshold) 倍即视为退化
+    regressions = []
+    for key, cur in report["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        for metric in ("wall_s", "peak_rss_mb", "peak_children_rss_mb"):
+            if base.get(metric) and cur.get(metric) and cur[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {base[metric]} -> {cur[metric]} "
+                                   f"(+{(cur[metric] / base[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 引擎基准测试")
+    parser.add_argument("--corpora", nargs="+", default=list(CORPORA), choices=list(CORPORA))
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--scale", type=float, default=1.0, help="语料规模系数")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例重复次数，取最快一次")
+    parser.add_argument("--corpus-dir", help="语料缓存目录")
+    parser.add_argument("--output", help="结果 JSON 路径，默认输出到标准输出")
+    parser.add_argument("--compare", help="基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="允许的退化比例")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"退化: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_utils
+import perf
+
+COMMANDS = ("merge", "split", "export", "info", "batch", "watch")
+
+
+def expand_inputs(patterns):
+    # 支持通配符（Windows 的 shell 不会展开）和 @清单文件（每行一个路径或通配符）
+    files = []
+    for pattern in patterns:
+        if pattern.startswith("@"):
+            with open(pattern[1:], encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+            files.extend(expand_inputs(lines))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            files.append(pattern)
+    return files
+
+
+def save_options(compact=False, image_dpi=None):
+    if not compact:
+        return None
+    return pdf_utils.SaveOptions.compact(image_dpi=image_dpi)
+
+
+def run_merge(inputs, output, options=None, incremental=False):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = pdf_utils.merge_pdfs(inputs, output, options=options, incremental=incremental)
+    return {"op": "merge", "inputs": len(inputs), "output": output, "pages": report.pages,
+            "bytes": report.bytes_written, "bytes_saved": report.bytes_saved, "reused_pages": report.reused_pages}
+
+
+def run_split(input_pdf, output_dir, step=None, ranges=None, workers=None, options=None, max_size_mb=None,
+              bookmarks=False):
+    os.makedirs(output_dir, exist_ok=True)
+    if step:
+        report = pdf_utils.split_by_step(input_pdf, output_dir, step, workers=workers, options=options)
+    elif max_size_mb:
+        report = pdf_utils.split_by_size(input_pdf, output_dir, int(max_size_mb * 1024 * 1024), workers=workers,
+                                         options=options)
+    elif bookmarks:
+        report = pdf_utils.split_by_bookmark(input_pdf, output_dir, workers=workers, options=options)
+    elif ranges:
+        report = pdf_utils.split_by_custom_ranges(input_pdf, output_dir, ranges, workers=workers, options=options)
+    else:
+        report = pdf_utils.split_by_page(input_pdf, output_dir, workers=workers, options=options)
+    return {"op": "split", "input": input_pdf, "outputs": report.outputs, "pages": report.pages,
+            "bytes": report.bytes_written, "bytes_saved": report.bytes_saved}
+
+
+def run_export(input_pdf, output_dir, ranges=None, options=None, workers=None, memory_mb=None):
+    os.makedirs(output_dir, exist_ok=True)
+    budget = memory_mb * 1024 * 1024 if memory_mb else pdf_utils.EXPORT_MEMORY_BUDGET
+    report = pdf_utils.export_images(input_pdf, output_dir, ranges, options, workers=workers, memory_budget=budget)
+    return {"op": "export", "input": input_pdf, "outputs": report.outputs, "pages": report.pages,
+            "bytes": report.bytes_written, "page_stats": report.page_stats()}
+
+
+def batch_result(batch):
+    # 监视模式下完成的一个任务
+    return {"op": "watch", "group": batch.key, "inputs": len(batch.paths), "outputs": batch.outputs,
+            "pages": batch.pages, "skipped": batch.skipped, "error": batch.error,
+            "latency_s": round(batch.latency, 3) if batch.latency is not None else None}
+
+
+def run_watch(folder, output_dir, options, journal=None, on_result=None):
+    # 一直运行到 Ctrl+C；已经在执行的任务完成后才退出，未处理的文件下次启动时继续
+    import threading
+    import watch
+    hot_folder = watch.HotFolder(folder, output_dir, options, journal)
+    results = []
+
+    def on_batch(batch):
+        results.append(batch_result(batch))
+        if on_result is not None:
+            on_result(results[-1], hot_folder.stats())
+
+    try:
+        hot_folder.run(threading.Event(), on_batch)
+    except KeyboardInterrupt:
+        pass
+    return results, hot_folder.stats()
+
+
+def run_info(path):
+    info = pdf_utils.probe_document(path)
+    return {
+        "path": path,
+        "pages": info.page_count,
+        "bytes": info.file_size,
+        "encrypted": info.encrypted,
+        "damaged": info.damaged,
+        "error": info.error,
+    }
+
+
+def run_job(spec, workers=None):
+    # 批处理清单中的单个任务，返回结果并附上耗时
+    start = time.perf_counter()
+    op = spec.get("op")
+    options = save_options(spec.get("compact", False), spec.get("image_dpi"))
+    if op == "merge":
+        result = run_merge(expand_inputs(spec["inputs"]), spec["output"], options, spec.get("incremental", False))
+    elif op == "split":
+        result = run_split(spec["input"], spec["output_dir"], step=spec.get("step"),
+                           ranges=spec.get("ranges"), workers=workers, options=options,
+                           max_size_mb=spec.get("max_size_mb"), bookmarks=spec.get("bookmarks", False))
+    elif op == "export":
+        image_options = pdf_utils.ImageOptions(spec.get("dpi", 150), spec.get("colorspace", "rgb"),
+                                               spec.get("format", "png"), spec.get("quality", 90))
+        result = run_export(spec["input"], spec["output_dir"], spec.get("ranges"), image_options, workers,
+                            spec.get("memory_mb"))
+    else:
+        raise ValueError(f"未知任务类型: {op}")
+    result["wall_s"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _add_compact_arguments(parser):
+    parser.add_argument("--compact", action="store_true", help="压缩输出：合并重复对象、压缩流、精简字体和资源")
+    parser.add_argument("--image-dpi", type=int, help="配合 --compact，把高于该分辨率的图片降采样")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="PDF 合并/拆分命令行工具")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果和耗时")
+    parser.add_argument("--trace", metavar="PATH", help="把本进程的埋点写成 Chrome trace（chrome://tracing 可打开）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    merge = sub.add_parser("merge", help="合并多个 PDF")
+    merge.add_argument("inputs", nargs="+", help="输入文件，支持通配符和 @清单文件")
+    merge.add_argument("-o", "--output", required=True)
+    merge.add_argument("--incremental", action="store_true",
+                       help="保存合并清单；输入列表前面部分不变时只追加变化的文件")
+    _add_compact_arguments(merge)
+
+    split = sub.add_parser("split", help="拆分 PDF")
+    split.add_argument("input")
+    split.add_argument("-o", "--output-dir", required=True)
+    mode = split.add_mutually_exclusive_group()
+    mode.add_argument("--every", action="store_true", help="每页拆分（默认）")
+    mode.add_argument("--step", type=int, help="按步长拆分")
+    mode.add_argument("--ranges", help="自定义范围，如 1-2,4-6")
+    mode.add_argument("--max-size", type=float, metavar="MB", help="按大小拆分，每份不超过该大小（MB）")
+    mode.add_argument("--bookmarks", action="store_true", help="按一级书签拆分，每章一个文件")
+    split.add_argument("--workers", type=int, help="拆分进程数")
+    _add_compact_arguments(split)
+
+    export = sub.add_parser("export", help="把页面导出为图片")
+    export.add_argument("input")
+    export.add_argument("-o", "--output-dir", required=True)
+    export.add_argument("--ranges", help="导出的页码范围，如 1-2,4-6，默认全部页面")
+    export.add_argument("--dpi", type=int, default=150)
+    export.add_argument("--colorspace", choices=tuple(pdf_utils.IMAGE_COLORSPACES), default="rgb")
+    export.add_argument("--format", choices=pdf_utils.IMAGE_FORMATS, default="png")
+    export.add_argument("--quality", type=int, default=90, help="JPEG 质量")
+    export.add_argument("--workers", type=int, help="渲染进程数")
+    export.add_argument("--memory-mb", type=int, help="渲染进程的总内存预算，决定进程数上限")
+
+    info = sub.add_parser("info", help="查看 PDF 信息")
+    info.add_argument("inputs", nargs="+")
+
+    watch = sub.add_parser("watch", help="监视目录，自动合并或拆分新到达的 PDF")
+    watch.add_argument("folder")
+    watch.add_argument("-o", "--output-dir", required=True)
+    watch.add_argument("--op", choices=("merge", "split"), default="merge")
+    watch.add_argument("--pattern", help="分组正则，取第一个捕获组为组名，如 ^([A-Z]+\\d+)_；默认按到达时间成组")
+    watch.add_argument("--window", type=float, default=30.0, help="组内最后一个文件到达后等待的秒数")
+    watch.add_argument("--settle", type=float, default=2.0, help="文件大小保持不变多少秒才算写完")
+    watch.add_argument("--interval", type=float, default=1.0, help="轮询间隔（秒）")
+    watch.add_argument("--step", type=int, help="--op split 时每份的页数，默认每页一份")
+    watch.add_argument("--workers", type=int, default=2, help="同时执行的任务数")
+    watch.add_argument("--journal", help="处理记录文件，默认放在本机缓存目录")
+    _add_compact_arguments(watch)
+
+    batch = sub.add_parser("batch", help="按 JSON 清单执行多个任务")
+    batch.add_argument("manifest", help='形如 [{"op": "merge", "inputs": [...], "output": "...", "compact": true}, ...]')
+    batch.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="并行任务数")
+    return parser
+
+
+def _print_watch_result(r, stats):
+    if r["error"]:
+        print(f"失败 {r['group'] or '默认组'}（{r['inputs']} 个文件）: {r['error']}")
+        return
+    skipped = f"，跳过 {len(r['skipped'])} 个无法打开的文件" if r["skipped"] else ""
+    print(f"{r['inputs']} 个文件 -> {len(r['outputs'])} 个输出（{r['pages']} 页，延迟 {r['latency_s']} 秒{skipped}）；"
+          f"队列 {stats['queue_depth']}，{stats['files_per_min']} 个文件/分钟")
+
+
+def run_command(args):
+    # 返回 (结果列表, 监视统计)；输入有误时抛出 ValueError，文件读写失败时抛出 OSError
+    stats = None
+    if args.command == "merge":
+        inputs = expand_inputs(args.inputs)
+        if not inputs:
+            raise ValueError("没有匹配的输入文件")
+        results = [run_merge(inputs, args.output, save_options(args.compact, args.image_dpi), args.incremental)]
+    elif args.command == "split":
+        results = [run_split(args.input, args.output_dir, args.step, args.ranges, args.workers,
+                             save_options(args.compact, args.image_dpi), args.max_size, args.bookmarks)]
+    elif args.command == "export":
+        options = pdf_utils.ImageOptions(args.dpi, args.colorspace, args.format, args.quality)
+        results = [run_export(args.input, args.output_dir, args.ranges, options, args.workers, args.memory_mb)]
+    elif args.command == "info":
+        inputs = expand_inputs(args.inputs)
+        if not inputs:
+            raise ValueError("没有匹配的输入文件")
+        results = [run_info(path) for path in inputs]
+    elif args.command == "watch":
+        import watch
+        options = watch.WatchOptions(args.op, args.pattern, args.window, args.settle, args.interval,
+                                     step=args.step, workers=args.workers,
+                                     save=save_options(args.compact, args.image_dpi))
+        on_result = None if args.json else _print_watch_result
+        print(f"正在监视 {os.path.abspath(args.folder)}，按 Ctrl+C 停止", file=sys.stderr)
+        results, stats = run_watch(args.folder, args.output_dir, options, args.journal, on_result)
+    else:
+        with open(args.manifest, encoding="utf-8") as f:
+            specs = json.load(f)
+        if args.jobs <= 1:
+            results = [run_job(spec) for spec in specs]
+        else:
+            # 任务之间已经并行，单个拆分任务内部不再开进程池
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                results = list(pool.map(run_job, specs, [1] * len(specs)))
+    return results, stats
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        results, stats = run_command(args)
+    except KeyError as e:
+        # 批处理清单缺少必填字段
+        print(f"错误: 任务缺少字段 {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, pdf_utils.JobCancelled) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    report = {"command": args.command, "wall_s": round(time.perf_counter() - start, 3), "results": results,
+              "perf": perf.recorder.snapshot()}
+    if args.command == "watch":
+        report["watch"] = stats
+    if args.trace:
+        perf.recorder.write_chrome_trace(args.trace)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        if args.command == "watch":
+            results = []
+            print(f"共处理 {stats['processed']} 个文件，失败 {stats['failed']} 个，输出 {stats['outputs']} 个；"
+                  f"延迟中位数 {stats['latency_p50_s']} 秒，{stats['files_per_min']} 个文件/分钟")
+        for r in results:
+            saved = f", 压缩节省 {r['bytes_saved'] / 2 ** 20:.1f} MB" if r.get("bytes_saved") else ""
+            if args.command == "info" and r["error"]:
+                print(f"错误: {r['path']}: {r['error']}", file=sys.stderr)
+            elif args.command == "info":
+                flags = "".join([", 已加密" if r["encrypted"] else "", ", 已损坏" if r["damaged"] else ""])
+                print(f"{r['path']}: {r['pages']} 页, {r['bytes']} 字节{flags}")
+            elif r["op"] == "merge":
+                reused = f", 沿用 {r['reused_pages']} 页" if r.get("reused_pages") else ""
+                print(f"已合并 {r['inputs']} 个文件 -> {r['output']} ({r['pages']} 页{saved}{reused})")
+            elif r["op"] == "export":
+                stats = r["page_stats"]
+                print(f"已导出 {r['input']} -> {len(r['outputs'])} 张图片（{stats['workers']} 个进程，"
+                      f"每页平均 {stats['mean_ms']} ms，p95 {stats['p95_ms']} ms）")
+            else:
+                print(f"已拆分 {r['input']} -> {len(r['outputs'])} 个文件{saved}")
+        print(f"耗时 {report['wall_s']} 秒")
+    # info 逐个报告，有文件读不了时其余结果照常输出，退出码为 1
+    if args.command == "info" and any(r["error"] for r in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
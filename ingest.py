@@ -0,0 +1,238 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+# 规范允许 %PDF- 前有少量垃圾字节，与 MuPDF 一样在文件头 1 KB 内查找
+HEAD_BYTES = 1024
+
+
+def default_extract_dir():
+    return os.path.join(tempfile.gettempdir(), "PDFTool-archives")
+
+
+def sniff(head):
+    # 按文件头判断类型，不看扩展名。先认 ZIP：未压缩存储的成员会让 %PDF- 出现在压缩包开头
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    if PDF_MAGIC in head[:HEAD_BYTES]:
+        return "pdf"
+    return None
+
+
+def file_digest(path, block=1024 * 1024):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(block)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+class ContentIndex:
+    # 按内容去重的索引：先按文件大小分桶，只有大小相同时才计算全文哈希，
+    # 绝大多数文件只需一次 stat。扫描线程和界面线程共用，内部加锁
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths = {}     # 路径 -> 大小
+        self._sizes = {}     # 大小 -> 该大小的路径列表
+        self._digests = {}   # 路径 -> 内容哈希（大小冲突时才计算）
+        self._seen = set()   # (大小, 内容哈希)
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def __contains__(self, path):
+        with self._lock:
+            return self._key(path) in self._paths
+
+    def add(self, path, size=None):
+        # 新内容返回 True 并登记；同一路径或内容相同的文件已存在时返回 False
+        key = self._key(path)
+        try:
+            size = os.path.getsize(path) if size is None else size
+        except OSError:
+            return False
+        with self._lock:
+            if key in self._paths:
+                return False
+            bucket = self._sizes.setdefault(size, [])
+            if not bucket:
+                bucket.append(key)
+                self._paths[key] = size
+                return True
+            pending = [p for p in bucket if p not in self._digests]
+        try:
+            digests = {p: file_digest(p) for p in pending + [key]}
+        except OSError:
+            return False
+        with self._lock:
+            for p in pending:
+                if p in self._paths and p not in self._digests:
+                    self._digests[p] = digests[p]
+                    self._seen.add((size, digests[p]))
+            if key in self._paths or (size, digests[key]) in self._seen:
+                return False
+            self._sizes[size].append(key)
+            self._paths[key] = size
+            self._digests[key] = digests[key]
+            self._seen.add((size, digests[key]))
+            return True
+
+    def register(self, path, size):
+        # 已知与索引中其他文件内容不同的文件（如恢复会话，保存时已去重）：只登记路径和大小，不读内容。
+        # 之后加入同样大小的文件时，add 才补算这些文件的哈希
+        key = self._key(path)
+        with self._lock:
+            if key in self._paths:
+                return False
+            self._sizes.setdefault(size, []).append(key)
+            self._paths[key] = size
+            return True
+
+    def discard(self, path):
+        key = self._key(path)
+        with self._lock:
+            size = self._paths.pop(key, None)
+            if size is None:
+                return
+            self._sizes[size].remove(key)
+            digest = self._digests.pop(key, None)
+            if digest is not None:
+                self._seen.discard((size, digest))
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+            self._sizes.clear()
+            self._digests.clear()
+            self._seen.clear()
+
+    def __len__(self):
+        return len(self._paths)
+
+
+def _walk(paths):
+    # 目录递归展开，顺序固定（按名称排序），与拖入顺序一致
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _archive_dir(archive, extract_dir):
+    st = os.stat(archive)
+    tag = hashlib.blake2b(f"{os.path.abspath(archive)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"),
+                          digest_size=8).hexdigest()
+    return os.path.join(extract_dir, f"{os.path.splitext(os.path.basename(archive))[0]}-{tag}")
+
+
+def _member_path(target, name):
+    # 成员解出后的路径，与 ZipFile.extract 的处理一致：去掉盘符、绝对路径、空段、. 和 ..；
+    # 结果不在 target 内时返回 None
+    arcname = name.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid = ("", os.path.curdir, os.path.pardir)
+    arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) if x not in invalid)
+    if os.path.sep == "\\":
+        arcname = zipfile.ZipFile._sanitize_windows_name(arcname, os.path.sep)
+    if not arcname:
+        return None
+    root = os.path.abspath(target)
+    out = os.path.join(root, arcname)
+    return out if os.path.commonpath([root, os.path.abspath(out)]) == root else None
+
+
+def _extract_pdfs(archive, extract_dir):
+    # 只解出文件头是 PDF 的成员；同一版本的压缩包解出的目录可复用。
+    # 复用前按 ZipFile.extract 的规则计算目标路径，成员名里的绝对路径和 .. 不会指向目录外的文件
+    target = _archive_dir(archive, extract_dir)
+    found = []
+    with zipfile.ZipFile(archive) as zf:
+        for member in sorted(zf.infolist(), key=lambda m: m.filename):
+            if member.is_dir():
+                continue
+            with zf.open(member) as f:
+                if sniff(f.read(HEAD_BYTES)) != "pdf":
+                    continue
+            out = _member_path(target, member.filename)
+            if out is None:
+                continue
+            if not os.path.exists(out) or os.path.getsize(out) != member.file_size:
+                out = zf.extract(member, target)
+            found.append(out)
+    return found
+
+
+def _inspect(path, extract_dir):
+    # 线程池中执行：返回 [(pdf 路径, 大小)]，压缩包展开为其中的 PDF
+    try:
+        with open(path, "rb") as f:
+            kind = sniff(f.read(HEAD_BYTES))
+        if kind == "pdf":
+            return [(path, os.path.getsize(path))]
+        if kind == "zip":
+            return [(p, os.path.getsize(p)) for p in _extract_pdfs(path, extract_dir)]
+    except (OSError, zipfile.BadZipFile, RuntimeError):
+        # 读不了的文件、损坏或加密的压缩包直接跳过
+        pass
+    return []
+
+
+class ScanStats:
+    def __init__(self):
+        self.scanned = 0      # 检查过的文件数
+        self.added = 0        # 新加入的 PDF
+        self.duplicates = 0   # 内容重复而跳过的 PDF
+
+
+def scan(paths, index, cancel=None, batch_size=200, batch_interval=0.2, workers=8, extract_dir=None, stats=None):
+    # 扫描文件、目录树和 ZIP，按文件头筛出 PDF，经 index 去重后分批产出新路径。
+    # 目录边遍历边把文件交给线程池读文件头/解压，窗口大小固定；去重按遍历顺序进行，重复内容保留先出现的一份。
+    # 凑够 batch_size 个或距上一批超过 batch_interval 秒就产出一批，界面可以边扫边显示
+    extract_dir = extract_dir or default_extract_dir()
+    stats = stats if stats is not None else ScanStats()
+    batch = []
+    last = time.perf_counter()
+    window = deque()
+    candidates = _walk(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                while len(window) < workers * 4:
+                    path = next(candidates, None)
+                    if path is None:
+                        break
+                    window.append(pool.submit(_inspect, path, extract_dir))
+                if not window or (cancel is not None and cancel.is_set()):
+                    break
+                stats.scanned += 1
+                for pdf, size in window.popleft().result():
+                    if index.add(pdf, size):
+                        batch.append(pdf)
+                        stats.added += 1
+                    else:
+                        stats.duplicates += 1
+                now = time.perf_counter()
+                if batch and (len(batch) >= batch_size or now - last >= batch_interval):
+                    yield batch
+                    batch, last = [], now
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    if batch and not (cancel is not None and cancel.is_set()):
+        yield batch
@@ -1,11 +1,41 @@
 # main.py
+import time
+
+# 启动计时的起点，尽量早
+STARTED = time.perf_counter()
+
 import sys
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+import logging
+import multiprocessing
 
 def main():
+    # 缩略图进程池在打包后的 exe 中也需要正常启动子进程
+    multiprocessing.freeze_support()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # 带子命令或选项（--help、--json、--trace 等）时走命令行，不加载 PyQt6
+    if len(sys.argv) > 1:
+        import cli
+        if sys.argv[1] in cli.COMMANDS or sys.argv[1].startswith("-"):
+            sys.exit(cli.main())
+
+    # PyMuPDF 在首次使用时才导入，窗口显示后由后台线程预热
+    from perf import StartupTimer
+    startup = StartupTimer(STARTED)
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+    startup.mark("imports")
+
     app = QApplication(sys.argv)
+    startup.mark("application")
     window = MainWindow()
+    startup.mark("window")
+
+    def on_first_paint():
+        startup.mark("first_paint")
+        logging.getLogger("startup").info("启动耗时（自 main.py 开始）：%s", startup.report())
+
+    window.first_painted.connect(on_first_paint)
     window.showMaximized()
     sys.exit(app.exec())
 
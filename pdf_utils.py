@@ -1,49 +1,1233 @@
 import os
-import fitz  # PyMuPDF
-from PyPDF2 import PdfMerger, PdfReader
-from PyQt6.QtGui import QPixmap, QImage
-from PyQt6.QtCore import Qt
+import re
+import json
+import hashlib
+import logging
+import math
+import mmap
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from perf import recorder, span, timed
+
+logger = logging.getLogger(__name__)
+
+class _LazyModule:
+    # 首次访问属性时才导入模块，之后属性直接缓存在实例上。
+    # 导入 PyMuPDF 要几百毫秒（杀毒软件扫描时可达数秒），界面首帧和只看信息的命令行不必付出这笔开销
+    def __init__(self, loader):
+        self._loader = loader
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._loader()
+        return self._module
+
+    def __getattr__(self, name):
+        value = getattr(self.load(), name)
+        setattr(self, name, value)
+        return value
+
+def _import_pymupdf():
+    # import 语句写在这里而不是字符串里，PyInstaller 仍能分析到这个依赖
+    import pymupdf
+    return pymupdf
+
+fitz = _LazyModule(_import_pymupdf)
+
+def warm_up():
+    # 在后台线程提前导入 PyMuPDF，首次生成缩略图或合并时不必再等
+    with span("startup.warm_up"):
+        fitz.load()
+
+class JobCancelled(Exception):
+    pass
+
+@dataclass(frozen=True)
+class DocumentInfo:
+    path: str
+    file_size: int
+    mtime_ns: int
+    page_count: int = 0
+    page_sizes: tuple = ()   # 每页 (宽, 高)，单位 pt
+    encrypted: bool = False  # 需要密码才能打开
+    repaired: bool = False   # 交叉引用表损坏，MuPDF 打开时做过修复
+    error: str = None        # 无法打开时的错误信息
+
+    @property
+    def damaged(self):
+        return self.repaired or self.error is not None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["page_sizes"] = tuple(tuple(size) for size in data.get("page_sizes", ()))
+        return cls(**data)
+
+@dataclass(frozen=True)
+class SaveOptions:
+    # 输出压缩选项，合并与拆分共用
+    garbage: int = 0             # 0-4，3 及以上会合并内容相同的对象
+    deflate: bool = False        # 压缩未压缩的流
+    object_streams: bool = False # 用对象流存放非流对象
+    clean: bool = False          # 整理内容流，页面资源只保留实际用到的
+    subset_fonts: bool = False   # 字体子集化
+    image_dpi: int = None        # 高于此分辨率的图片降采样到该分辨率
+    image_quality: int = 80      # 降采样后 JPEG 质量
+
+    @classmethod
+    def compact(cls, image_dpi=None):
+        return cls(garbage=3, deflate=True, object_streams=True, clean=True, subset_fonts=True, image_dpi=image_dpi)
+
+    @property
+    def enabled(self):
+        return self != SaveOptions()
+
+    def save_kwargs(self):
+        return {
+            "garbage": self.garbage,
+            "deflate": self.deflate,
+            "deflate_images": self.deflate,
+            "deflate_fonts": self.deflate,
+            "use_objstms": int(self.object_streams),
+            "clean": self.clean,
+        }
+
+@dataclass
+class OutputReport:
+    # 合并/拆分任务的结果；bytes_saved 为相对未压缩输出节省的字节数
+    outputs: list
+    pages: int = 0
+    bytes_written: int = 0
+    bytes_saved: int = 0
+    reused_pages: int = 0    # 增量合并时沿用上次输出的页数
+
+def _optimize(doc, options):
+    if options.image_dpi:
+        doc.rewrite_images(dpi_threshold=options.image_dpi + 1, dpi_target=options.image_dpi,
+                           quality=options.image_quality)
+    if options.subset_fonts:
+        doc.subset_fonts()
+
+def _plain_size(doc):
+    # 不压缩保存时的大小估计：各对象的字典加上流的 /Length，不真正序列化一遍。
+    # 另加文件头尾、每个对象的 obj/endobj 和交叉引用表项、每个流的 stream/endstream
+    total = 190
+    for xref in range(1, doc.xref_length()):
+        total += 40 + len(doc.xref_object(xref, compressed=True))
+        if not doc.xref_is_stream(xref):
+            continue
+        total += 17
+        kind, value = doc.xref_get_key(xref, "Length")
+        if kind == "xref":
+            kind, value = "int", doc.xref_object(int(value.split()[0]), compressed=True)
+        if kind == "int" and value.strip().isdigit():
+            total += int(value)
+    return total
+
+def document_bytes(doc, options=None):
+    # 按选项在内存中序列化文档，返回 (PDF 字节, 节省字节数)。
+    # 节省量与同一文档不做压缩时的估计大小比较，只序列化一次
+    if options is None or not options.enabled:
+        return doc.tobytes(), 0
+    baseline = _plain_size(doc)
+    _optimize(doc, options)
+    data = doc.tobytes(**options.save_kwargs())
+    return data, max(0, baseline - len(data))
+
+WRITE_BUFFER = 1024 * 1024
+
+def _write_file(path, data):
+    # 整块写出，避免逐对象的小块写入
+    with open(path, "wb", buffering=WRITE_BUFFER) as f:
+        f.write(data)
+
+# 读一次层：每个输入文件在本进程内只映射一次，探测、缩略图、合并、拆分共用同一块缓冲，
+# 网络盘上的文件不会被每个解析器各读一遍。文件大小或修改时间变化即重新映射；
+# 按映射字节数做 LRU。MuPDF 直接读映射的内存，映射只能在其上打开的文档全部关闭后解除：
+# 每块映射记下在它上面打开的文档（调用方负责关闭），移出缓存（淘汰、文件变化、release）
+# 且文档都已关闭时立即关闭映射，不等垃圾回收处理文档对象的循环引用
+class SourceBuffers:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.reads = 0
+        self._maps = OrderedDict()  # 绝对路径 -> ((大小, 修改时间), memoryview)
+        self._users = {}            # id(memoryview) -> (memoryview, [文档，None 表示正在打开])
+        self._lock = threading.Lock()
+
+    def open(self, pdf_path):
+        buffer, users = self._acquire(pdf_path)
+        try:
+            doc = fitz.open(stream=buffer, filetype="pdf")
+        except BaseException:
+            with self._lock:
+                users.remove(None)
+                self._sweep()
+            raise
+        with self._lock:
+            users[users.index(None)] = doc
+        return doc
+
+    def _acquire(self, pdf_path):
+        # 取映射并在同一次加锁内占住，返回前不会被其他线程的 release 关闭
+        key = os.path.abspath(pdf_path)
+        identity = _file_identity(pdf_path)
+        with self._lock:
+            entry = self._maps.get(key)
+            if entry is not None and entry[0] == identity:
+                self._maps.move_to_end(key)
+                return entry[1], self._pin(entry[1])
+        buffer = _map_file(pdf_path)
+        with self._lock:
+            self.reads += 1
+            self._drop(key)
+            if len(buffer) <= self.max_bytes:
+                self._maps[key] = (identity, buffer)
+                self.total_bytes += len(buffer)
+                while self.total_bytes > self.max_bytes:
+                    self._drop(next(iter(self._maps)))
+            users = self._pin(buffer)
+            self._sweep()
+            return buffer, users
+
+    def _pin(self, buffer):
+        users = self._users.setdefault(id(buffer), (buffer, []))[1]
+        users[:] = [doc for doc in users if doc is None or not doc.is_closed]
+        users.append(None)
+        return users
+
+    def _drop(self, key):
+        entry = self._maps.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= len(entry[1])
+
+    def _sweep(self):
+        # 持锁调用：不在缓存里、其上的文档都已关闭的映射立即解除
+        cached = {id(entry[1]) for entry in self._maps.values()}
+        for ident, (buffer, users) in list(self._users.items()):
+            users[:] = [doc for doc in users if doc is None or not doc.is_closed]
+            if not users and ident not in cached:
+                del self._users[ident]
+                _close_buffer(buffer)
+
+    def trim(self, pdf_path):
+        # 映射保留，但把已读入的页面从本进程的常驻内存中交还给系统页缓存，
+        # 再次访问时从页缓存取回；合并这类只顺序读一遍的场景用它控制峰值内存
+        with self._lock:
+            entry = self._maps.get(os.path.abspath(pdf_path))
+        buffer = entry and entry[1].obj
+        if isinstance(buffer, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+            buffer.madvise(mmap.MADV_DONTNEED)
+
+    def release(self, pdf_path=None):
+        # 移除文件时调用，Windows 上映射中的文件无法删除或覆盖。文档都已关闭时映射在返回前解除，
+        # 仍有打开的文档时等下一次 release 或取映射时再解除。只影响本进程：
+        # 工作进程的任务用 task_document，映射随任务结束释放，不进这里的缓存
+        with self._lock:
+            if pdf_path is None:
+                self._maps.clear()
+                self.total_bytes = 0
+            else:
+                self._drop(os.path.abspath(pdf_path))
+            self._sweep()
+
+    def stats(self):
+        with self._lock:
+            return {"reads": self.reads, "entries": len(self._maps), "bytes": self.total_bytes,
+                    "max_bytes": self.max_bytes}
+
+def _map_file(pdf_path):
+    with open(pdf_path, "rb") as f:
+        try:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (ValueError, OSError):
+            # 空文件或不支持映射的文件系统，退回一次性读入
+            return memoryview(f.read())
+
+source_buffers = SourceBuffers()
+
+def release_source(pdf_path=None):
+    source_buffers.release(pdf_path)
+
+def process_pool(max_workers, initializer=None):
+    # 所有工作进程池都用 spawn：fork 只复制调用线程，其他线程（界面的 Qt 线程、扫描和索引线程、
+    # MuPDF 与日志内部）持有的锁在子进程里永远不会释放，可能卡死。Windows 和 macOS 默认即是 spawn，
+    # Linux 上也这样做，各平台工作进程的行为一致
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer)
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _source_name(source):
+    return os.path.basename(source) if _is_path(source) else "<内存>"
+
+def _open_document(source):
+    # 文件路径经读一次层映射；bytes、bytearray、memoryview、mmap 以 memoryview 直接交给 MuPDF，
+    # 不复制也不落临时文件，调用方需在文档关闭前保持其有效
+    if _is_path(source):
+        return source_buffers.open(source)
+    if not isinstance(source, bytes):
+        source = memoryview(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def _close_buffer(buffer):
+    # 文档关闭后立即解除映射，不等垃圾回收
+    obj = buffer.obj
+    buffer.release()
+    if isinstance(obj, mmap.mmap):
+        obj.close()
+
+@contextmanager
+def task_document(pdf_path, password_ok=True):
+    # 工作进程里的任务用：每次单独映射，文档关闭时解除映射，不进读一次层。
+    # 工作进程长期存在，若把映射留在缓存里，界面移除文件后它在 Windows 上仍无法删除或覆盖
+    buffer = _map_file(pdf_path)
+    try:
+        doc = fitz.open(stream=buffer, filetype="pdf")
+        try:
+            if not password_ok and doc.needs_pass:
+                raise ValueError(f"{_source_name(pdf_path)} 已加密")
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        _close_buffer(buffer)
+
+def open_source(source):
+    # 打开文件路径或内存中的 PDF，加密文档直接报错
+    doc = _open_document(source)
+    if doc.needs_pass:
+        doc.close()
+        raise ValueError(f"{_source_name(source)} 已加密")
+    return doc
+
+# 进程内的文档信息缓存：路径 -> DocumentInfo，文件大小或修改时间变化即失效
+_info_cache = {}
+_info_lock = threading.Lock()
+
+def _file_identity(pdf_path):
+    st = os.stat(pdf_path)
+    return st.st_size, st.st_mtime_ns
+
+def _info_from_doc(doc, pdf_path, file_size, mtime_ns):
+    # 利用已经打开的文档收集信息，不再额外解析
+    if doc.needs_pass:
+        return DocumentInfo(pdf_path, file_size, mtime_ns, encrypted=True, repaired=doc.is_repaired)
+    sizes = []
+    for i in range(len(doc)):
+        rect = doc.page_cropbox(i)
+        sizes.append((round(rect.width, 2), round(rect.height, 2)))
+    return DocumentInfo(pdf_path, file_size, mtime_ns, len(doc), tuple(sizes), False, doc.is_repaired)
+
+def remember_document_info(info):
+    with _info_lock:
+        _info_cache[os.path.abspath(info.path)] = info
+
+def cached_document_info(pdf_path):
+    key = os.path.abspath(pdf_path)
+    with _info_lock:
+        info = _info_cache.get(key)
+    if info is None:
+        return None
+    try:
+        if _file_identity(pdf_path) != (info.file_size, info.mtime_ns):
+            return None
+    except OSError:
+        return None
+    return info
+
+def probe_document(pdf_path, doc=None):
+    # 打开一次文件，取得页数、页面尺寸、加密和损坏状态；结果按路径缓存，
+    # 缩略图、合并、拆分共用。已经打开的 doc 可直接传入以免重复解析。
+    # 也接受内存中的 PDF，此时 path 为空且不缓存
+    if not _is_path(pdf_path):
+        size = len(memoryview(pdf_path))
+        if doc is not None:
+            return _info_from_doc(doc, "", size, 0)
+        try:
+            with _open_document(pdf_path) as opened:
+                return _info_from_doc(opened, "", size, 0)
+        except Exception as e:
+            return DocumentInfo("", size, 0, error=str(e))
+    info = cached_document_info(pdf_path)
+    if info is not None:
+        return info
+    try:
+        file_size, mtime_ns = _file_identity(pdf_path)
+    except OSError as e:
+        return DocumentInfo(pdf_path, 0, 0, error=str(e))
+    with span("probe") as sp:
+        sp.bytes = file_size
+        if doc is not None:
+            info = _info_from_doc(doc, pdf_path, file_size, mtime_ns)
+        else:
+            try:
+                with _open_document(pdf_path) as opened:
+                    info = _info_from_doc(opened, pdf_path, file_size, mtime_ns)
+            except Exception as e:
+                info = DocumentInfo(pdf_path, file_size, mtime_ns, error=str(e))
+    remember_document_info(info)
+    return info
+
+def _check_cancel(cancel):
+    # cancel 为任意带 is_set() 的对象，如 threading.Event
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled()
+
+def thumbnail_matrix(page_rect, width, height):
+    # 按目标框直接算出缩放比例，一次渲染到位
+    zoom = min(width / page_rect.width, height / page_rect.height)
+    return fitz.Matrix(zoom, zoom)
+
+def _embedded_thumbnail(doc, page, width, height):
+    # 页面自带 /Thumb 且不小于目标尺寸时，直接用它，免去整页光栅化
+    kind, value = doc.xref_get_key(page.xref, "Thumb")
+    if kind != "xref":
+        return None
+    try:
+        pix = fitz.Pixmap(doc, int(value.split()[0]))
+    except Exception:
+        return None
+    scale = min(width / pix.width, height / pix.height)
+    if scale > 1:
+        return None
+    if pix.colorspace is None or pix.colorspace.n != 3 or pix.alpha:
+        pix = fitz.Pixmap(fitz.csRGB, pix, 0)
+    if scale < 1:
+        pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+    return pix
+
+def render_thumbnail_pixmap(doc, width=140, height=180):
+    page = doc.load_page(0)  # 加载第一页
+    pix = _embedded_thumbnail(doc, page, width, height)
+    if pix is None:
+        rect = page.rect
+        pix = page.get_pixmap(matrix=thumbnail_matrix(rect, width, height), clip=rect, alpha=False)
+    return pix
 
 def generate_thumbnail(pdf_path, width=140, height=180):
+    # 只有界面会用到 QPixmap，延迟导入让命令行和工作进程不必加载 PyQt6
+    from PyQt6.QtGui import QPixmap, QImage
     try:
-        doc = fitz.open(pdf_path)
-        page = doc.load_page(0)  # 加载第一页
-        mat = fitz.Matrix(2, 2)  # 放大2倍，清晰一点
-        pix = page.get_pixmap(matrix=mat, alpha=False)
+        with span("thumbnail.render"), _open_document(pdf_path) as doc:
+            pix = render_thumbnail_pixmap(doc, width, height)
 
-        # 转成 QImage
+        # 直接包装像素数据，无需再次缩放
         image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(image)
 
-        # 缩放到指定大小
-        scaled = image.scaled(width, height, aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio, transformMode=Qt.TransformationMode.SmoothTransformation)
+    except Exception:
+        logger.exception("生成缩略图失败: %s", pdf_path)
+        return None
 
-        doc.close()
+def thumbnail_task(pdf_path, width=140, height=180):
+    # 在工作进程中执行：同一次打开同时拿到缩略图和文档信息。
+    # width/height 为设备像素；返回 DocumentInfo、原始像素（供界面零拷贝包装）和 PNG（写入磁盘缓存）
+    with span("thumbnail.render"), task_document(pdf_path) as doc:
+        info = probe_document(pdf_path, doc)
+        if info.encrypted or not info.page_count:
+            return info, None, None
+        pix = render_thumbnail_pixmap(doc, width, height)
+        return info, (pix.width, pix.height, pix.stride, pix.samples), pix.tobytes("png")
 
-        return QPixmap.fromImage(scaled)
+def extract_text_task(pdf_path):
+    # 在工作进程中执行：逐页提取文本（空白折叠为单个空格），返回每页一项的列表
+    with span("text.extract"), task_document(pdf_path, password_ok=False) as doc:
+        return [" ".join(page.get_text("text").split()) for page in doc]
 
-    except Exception as e:
-        print(f"生成缩略图失败: {e}")
-        return None
+def render_pages_task(pdf_path, pages, width=90, height=120):
+    # 在工作进程中执行：渲染若干页的缩略图，返回 [(页码, (宽, 高, stride, 像素))]，页码从 0 开始。
+    # 每批单独打开（只解析交叉引用表，毫秒级），不在工作进程里长期占着文件
+    with span("pages.render", pages=len(pages)), task_document(pdf_path, password_ok=False) as doc:
+        return _render_pages(doc, pages, width, height)
+
+def _render_pages(doc, pages, width, height):
+    results = []
+    for index in pages:
+        if not 0 <= index < len(doc):
+            continue
+        page = doc.load_page(index)
+        pix = _embedded_thumbnail(doc, page, width, height)
+        if pix is None:
+            rect = page.rect
+            pix = page.get_pixmap(matrix=thumbnail_matrix(rect, width, height), clip=rect, alpha=False)
+        results.append((index, (pix.width, pix.height, pix.stride, pix.samples)))
+    return results
 
 def get_pdf_page_count(pdf_path):
-    try:
-        reader = PdfReader(pdf_path)
-        return len(reader.pages)
-    except:
+    return probe_document(pdf_path).page_count
+
+def _probe_inputs(pdf_list):
+    infos = [probe_document(pdf) for pdf in pdf_list]
+    for pdf, info in zip(pdf_list, infos):
+        if info.error:
+            raise ValueError(f"无法打开 {_source_name(pdf)}: {info.error}")
+        if info.encrypted:
+            raise ValueError(f"{_source_name(pdf)} 已加密")
+    return infos
+
+_REF_RE = re.compile(rb"(\d+) 0 R")
+# 按对象自身顶层的 /Type 判断，不看嵌套字典：页面可能内联带 /Type/ExtGState 的资源
+_SHARED_TYPES = ("/Font", "/FontDescriptor", "/ExtGState")
+# 页面、页面树、目录和注释有身份语义，指向它们的 /Kids、/Parent 可能不在本次新增的对象里，不参与合并
+_IDENTITY_TYPES = ("/Page", "/Pages", "/Catalog", "/Annot")
+
+def _dedupe_streams(doc, first_xref, seen):
+    # 对本次新增的对象做跨文件去重：字体、图片等内容相同的共享资源只保留第一份，
+    # 其余引用改指向它。字典里的引用先换成规范编号再参与哈希，
+    # 多轮处理让“引用了重复对象的对象”（如带 ICC 色彩空间的图片）也能被合并。
+    # 页面、注释等有身份语义的对象不参与
+    dup = {}
+
+    def repl(m):
+        return b"%d 0 R" % dup.get(int(m.group(1)), int(m.group(1)))
+
+    candidates = []
+    for xref in range(first_xref, doc.xref_length()):
+        kind, value = doc.xref_get_key(xref, "Type")
+        if kind == "name" and value in _IDENTITY_TYPES:
+            continue
+        is_stream = doc.xref_is_stream(xref)
+        if (is_stream or (kind == "name" and value in _SHARED_TYPES)
+                or doc.xref_object(xref, compressed=True).startswith("[")):
+            candidates.append((xref, is_stream))
+    found = True
+    while found:
+        found = False
+        for xref, is_stream in candidates:
+            if xref in dup:
+                continue
+            head = _REF_RE.sub(repl, doc.xref_object(xref, compressed=True).encode())
+            body = doc.xref_stream_raw(xref) if is_stream else b""
+            digest = hashlib.blake2b(head + b"\0" + body, digest_size=20).digest()
+            canonical = seen.setdefault(digest, xref)
+            if canonical != xref:
+                dup[xref] = canonical
+                found = True
+    if not dup:
         return 0
 
-def merge_pdfs(pdf_list, output_path):
-    merger = PdfMerger()
-    for pdf in pdf_list:
-        merger.append(pdf)
-    merger.write(output_path)
-    merger.close()
-
-def split_pdf(input_pdf, output_dir):
-    reader = PdfReader(input_pdf)
-    for i, page in enumerate(reader.pages):
-        writer = PdfMerger()
-        writer.append(input_pdf, pages=(i, i + 1))
-        out_file = os.path.join(output_dir, f"page_{i + 1}.pdf")
-        with open(out_file, "wb") as f:
-            writer.write(f)
+    for xref in range(first_xref, doc.xref_length()):
+        if xref in dup:
+            continue
+        obj = doc.xref_object(xref, compressed=True).encode()
+        new_obj = _REF_RE.sub(repl, obj)
+        if new_obj != obj:
+            doc.update_object(xref, new_obj.decode())
+    for xref in dup:
+        if doc.xref_is_stream(xref):
+            doc.update_stream(xref, b"")
+        doc.update_object(xref, "null")
+    return len(dup)
+
+class _MergeWriter:
+    # 合并输出：逐个追加输入、跨文件去重，每累计 flush_pages 页就增量写盘并重新打开，
+    # 内存中只保留当前批次的对象。entries 记录每个输入的指纹、页数和目录条目数，供增量合并使用
+    def __init__(self, doc, path, written, seen, dedupe, flush_pages):
+        self.doc = doc
+        self.path = path
+        self.written = written
+        self.seen = seen
+        self.dedupe = dedupe
+        self.flush_pages = flush_pages
+        self.pending = 0
+        self.toc = []
+        self.entries = []
+
+    def append(self, pdf, info):
+        first_xref = self.doc.xref_length()
+        offset = len(self.doc)
+        src = _open_document(pdf)
+        try:
+            self.doc.insert_pdf(src)
+            toc = [[level, title, page + offset if page > 0 else page] for level, title, page in src.get_toc(simple=True)]
+        finally:
+            src.close()
+        if _is_path(pdf):
+            source_buffers.trim(pdf)
+        if self.dedupe:
+            _dedupe_streams(self.doc, first_xref, self.seen)
+        self.toc.extend(toc)
+        self.entries.append({"input": _input_fingerprint(pdf, info), "pages": info.page_count, "toc": len(toc)})
+        self.pending += info.page_count
+        if self.pending >= self.flush_pages:
+            self.flush()
+
+    def flush(self):
+        if self.written:
+            self.doc.saveIncr()
+        else:
+            self.doc.save(self.path)
+            self.written = True
+        self.doc.close()
+        self.doc = fitz.open(self.path)
+        self.pending = 0
+
+    def finish(self):
+        if self.toc or self.doc.get_toc(simple=True):
+            self.doc.set_toc(self.toc)
+        self.flush()
+
+# 增量合并：输出旁边的隐藏清单记录每个输入的指纹，下次合并时列表前缀不变就只删除变化的尾部、
+# 追加新输入，用 PDF 增量更新写回，耗时与变化量相关；增量次数达到 MAX_INCREMENTS 后整体重写一次
+MANIFEST_VERSION = 1
+MAX_INCREMENTS = 10
+
+def merge_manifest_path(output_path):
+    folder, name = os.path.split(os.path.abspath(output_path))
+    return os.path.join(folder, f".{name}.merge.json")
+
+def _input_fingerprint(pdf, info):
+    if not _is_path(pdf):
+        return None
+    return [os.path.abspath(pdf), info.file_size, info.mtime_ns]
+
+def _load_manifest(output_path, dedupe):
+    try:
+        with open(merge_manifest_path(output_path), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if list(_file_identity(output_path)) != manifest["output"]:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("dedupe") != dedupe:
+        return None
+    return manifest
+
+def _save_manifest(output_path, writer, increments):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "output": list(_file_identity(output_path)),
+        "dedupe": writer.dedupe,
+        "increments": increments,
+        "inputs": writer.entries,
+        "shared": {digest.hex(): xref for digest, xref in writer.seen.items()},
+    }
+    path = merge_manifest_path(output_path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+def _remove_manifest(output_path):
+    try:
+        os.remove(merge_manifest_path(output_path))
+    except OSError:
+        pass
+
+def _merge_incremental(pdf_list, infos, output_path, manifest, flush_pages, progress, cancel):
+    # 返回 None 表示无法复用，需要整体重建
+    old = manifest["inputs"]
+    fingerprints = [_input_fingerprint(pdf, info) for pdf, info in zip(pdf_list, infos)]
+    keep = 0
+    while keep < min(len(old), len(fingerprints)) and old[keep]["input"] == fingerprints[keep]:
+        keep += 1
+    if keep == 0:
+        return None
+    total_pages = sum(info.page_count for info in infos)
+    if keep == len(old) == len(fingerprints):
+        return OutputReport([output_path], total_pages, os.path.getsize(output_path), reused_pages=total_pages)
+
+    st = os.stat(output_path)
+    doc = fitz.open(output_path)
+    if doc.needs_pass or not doc.can_save_incrementally() or len(doc) != sum(e["pages"] for e in old):
+        doc.close()
+        return None
+    kept_pages = sum(e["pages"] for e in old[:keep])
+    seen = {bytes.fromhex(digest): xref for digest, xref in manifest["shared"].items()}
+    writer = _MergeWriter(doc, output_path, True, seen, manifest["dedupe"], flush_pages)
+    writer.entries = old[:keep]
+    try:
+        writer.toc = doc.get_toc(simple=True)[:sum(e["toc"] for e in old[:keep])]
+        if kept_pages < len(doc):
+            doc.delete_pages(kept_pages, len(doc) - 1)
+        done_bytes = 0
+        for pdf, info in zip(pdf_list[keep:], infos[keep:]):
+            _check_cancel(cancel)
+            writer.append(pdf, info)
+            done_bytes += info.file_size
+            if progress:
+                progress(len(writer.doc), total_pages, done_bytes)
+        writer.finish()
+    except BaseException:
+        # 增量更新只在文件末尾追加，截回原长度即恢复原输出
+        if not writer.doc.is_closed:
+            writer.doc.close()
+        os.truncate(output_path, st.st_size)
+        os.utime(output_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        raise
+    increments = manifest["increments"] + 1
+    if increments >= MAX_INCREMENTS:
+        _rewrite_merge(writer)
+        increments = 0
+    writer.doc.close()
+    _save_manifest(output_path, writer, increments)
+    return OutputReport([output_path], total_pages, os.path.getsize(output_path), reused_pages=kept_pages)
+
+def _rewrite_merge(writer):
+    # 去掉历次增量留下的旧版本对象；对象编号不变，只丢弃已被回收的去重记录
+    part_path = writer.path + ".part"
+    writer.doc.save(part_path, garbage=1)
+    writer.doc.close()
+    os.replace(part_path, writer.path)
+    writer.doc = fitz.open(writer.path)
+    length = writer.doc.xref_length()
+    writer.seen = {digest: xref for digest, xref in writer.seen.items()
+                   if xref < length and writer.doc.xref_object(xref, compressed=True) != "null"}
+
+@timed("merge", nbytes=lambda report: report.bytes_written)
+def merge_pdfs(pdf_list, output_path, flush_pages=500, dedupe=True, options=None, incremental=False,
+               progress=None, cancel=None):
+    # 流式合并：逐个打开输入，复制完立即关闭，分批增量写盘，峰值内存与总量无关。
+    # options 启用压缩时最后整体重写一遍（这一步内存与输出大小相关）。
+    # incremental 时复用上次的输出，只追加变化的部分（与压缩互斥，启用压缩时总是整体重建）。
+    # 输入可以是路径或内存中的 PDF，路径经读一次层映射（映射页可由系统随时回收）。
+    # progress(已处理页数, 总页数, 已读取字节数)；cancel 置位后删除半成品并抛出 JobCancelled
+    infos = _probe_inputs(pdf_list)
+    total_pages = sum(info.page_count for info in infos)
+    compact = options is not None and options.enabled
+    incremental = incremental and not compact and all(_is_path(pdf) for pdf in pdf_list)
+    if incremental:
+        manifest = _load_manifest(output_path, dedupe)
+        if manifest is not None:
+            report = _merge_incremental(pdf_list, infos, output_path, manifest, flush_pages, progress, cancel)
+            if report is not None:
+                return report
+
+    part_path = output_path + ".part"
+    writer = _MergeWriter(fitz.open(), part_path, False, {}, dedupe, flush_pages)
+    done_bytes = 0
+    try:
+        for pdf, info in zip(pdf_list, infos):
+            _check_cancel(cancel)
+            writer.append(pdf, info)
+            done_bytes += info.file_size
+            if progress:
+                progress(len(writer.doc), total_pages, done_bytes)
+        writer.finish()
+        bytes_saved = 0
+        _remove_manifest(output_path)
+        if compact:
+            _check_cancel(cancel)
+            baseline = os.path.getsize(part_path)
+            _optimize(writer.doc, options)
+            writer.doc.save(output_path, **options.save_kwargs())
+            writer.doc.close()
+            os.remove(part_path)
+            bytes_saved = baseline - os.path.getsize(output_path)
+        else:
+            writer.doc.close()
+            os.replace(part_path, output_path)
+    except BaseException:
+        if not writer.doc.is_closed:
+            writer.doc.close()
+        for path in (part_path, output_path if compact else None):
+            if path and os.path.exists(path):
+                os.remove(path)
+        raise
+    if incremental:
+        writer.path = output_path
+        _save_manifest(output_path, writer, 0)
+    return OutputReport([output_path], total_pages, os.path.getsize(output_path), bytes_saved)
+
+def parse_page_ranges(spec, total):
+    # "1-2,4-6" -> [(0, 1), (3, 5)]，页码从 1 开始，返回从 0 开始的闭区间
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = map(int, part.split("-"))
+            else:
+                start = end = int(part)
+        except ValueError:
+            # "abc"、"3-"、"1-2-3" 等
+            raise ValueError(f"页码范围无效: {part}") from None
+        if not 1 <= start <= end <= total:
+            raise ValueError(f"页码范围无效: {part}")
+        ranges.append((start - 1, end - 1))
+    if not ranges:
+        raise ValueError("未指定页码范围")
+    return ranges
+
+def format_page_ranges(pages):
+    # parse_page_ranges 的逆操作：从 0 开始的页码集合 -> "1-3,7"
+    parts = []
+    start = prev = None
+    for index in sorted(set(pages)):
+        if prev is not None and index == prev + 1:
+            prev = index
+            continue
+        if start is not None:
+            parts.append(f"{start + 1}-{prev + 1}" if prev > start else f"{start + 1}")
+        start = prev = index
+    if start is not None:
+        parts.append(f"{start + 1}-{prev + 1}" if prev > start else f"{start + 1}")
+    return ",".join(parts)
+
+def range_file_name(start, end):
+    return f"pages_{start + 1}-{end + 1}.pdf"
+
+def _iter_ranges(doc, ranges, options=None, cancel=None):
+    # 对已解析的源文档逐个产出 (start, end, PDF 字节, 节省字节)；
+    # 源文档的对象由 MuPDF 缓存，各分块共用同一份解析结果
+    for start, end in ranges:
+        _check_cancel(cancel)
+        chunk = fitz.open()
+        try:
+            chunk.insert_pdf(doc, from_page=start, to_page=end)
+            data, saved = document_bytes(chunk, options)
+        finally:
+            chunk.close()
+        yield start, end, data, saved
+
+def extract_ranges(source, ranges, options=None, cancel=None):
+    # 源只解析一次，按顺序产出 ((start, end), PDF 字节)，不经过临时文件。
+    # source 为路径或内存中的 PDF，ranges 为从 0 开始的闭区间列表或 "1-2,4-6" 形式的页码范围
+    doc = open_source(source)
+    try:
+        if isinstance(ranges, str):
+            ranges = parse_page_ranges(ranges, doc.page_count)
+        for start, end, data, _ in _iter_ranges(doc, ranges, options, cancel):
+            yield (start, end), data
+    finally:
+        doc.close()
+
+def _split_batch(source, output_dir, batch, options=None, on_written=None, cancel=None):
+    # 源只打开一次，依次写出本批次的所有分块，返回 [(路径, 写入字节, 节省字节)]；
+    # 工作进程和单进程拆分共用，on_written 在每个分块写完后收到同样的三元组
+    doc = open_source(source)
+    outputs = []
+    try:
+        chunks = _iter_ranges(doc, [r for r, _ in batch], options, cancel)
+        for (_, _, data, saved), (_, name) in zip(chunks, batch):
+            out_file = os.path.join(output_dir, name)
+            _write_file(out_file, data)
+            outputs.append((out_file, len(data), saved))
+            if on_written:
+                on_written(outputs[-1])
+    finally:
+        doc.close()
+    return outputs
+
+def _partition(jobs, parts):
+    # 按页数把任务切成连续的若干批，尽量均衡
+    total = sum(end - start + 1 for (start, end), _ in jobs)
+    target = max(1, total // parts)
+    batches, batch, pages = [], [], 0
+    for job in jobs:
+        (start, end), _ = job
+        batch.append(job)
+        pages += end - start + 1
+        if pages >= target:
+            batches.append(batch)
+            batch, pages = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _remove_outputs(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+PARALLEL_MIN_PAGES = 200
+
+def _source_page_count(source):
+    if _is_path(source):
+        return _probe_inputs([source])[0].page_count
+    doc = open_source(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+@timed("split", nbytes=lambda report: report.bytes_written)
+def split_pdf(input_pdf, output_dir, ranges=None, names=None, workers=None, options=None, progress=None, cancel=None):
+    # 拆分引擎：ranges 为从 0 开始的 (start, end) 闭区间列表，默认每页一个文件。
+    # 各分块按页数分批交给进程池，输出文件名只取决于区间，与执行顺序无关。
+    # input_pdf 也可以是内存中的 PDF，此时在当前进程内拆分。
+    # progress(已写出页数, 总页数, 已写出字节数)；取消时删除本次已写出的文件并抛出 JobCancelled
+    if ranges is None:
+        total = _source_page_count(input_pdf)
+        ranges = [(i, i) for i in range(total)]
+        names = names or [f"page_{i + 1}.pdf" for i in range(total)]
+    names = names or [range_file_name(start, end) for start, end in ranges]
+    jobs = list(zip(ranges, names))
+    workers = workers or min(8, os.cpu_count() or 1)
+    total_pages = sum(end - start + 1 for start, end in ranges)
+    expected = [os.path.join(output_dir, name) for name in names]
+    report = OutputReport(expected, total_pages)
+    done_pages = 0
+
+    def collect(pages, written):
+        nonlocal done_pages
+        done_pages += pages
+        for _, nbytes, saved in written:
+            report.bytes_written += nbytes
+            report.bytes_saved += saved
+        if progress:
+            progress(done_pages, total_pages, report.bytes_written)
+
+    try:
+        if workers <= 1 or total_pages < PARALLEL_MIN_PAGES or not _is_path(input_pdf):
+            pages = iter(end - start + 1 for start, end in ranges)
+            _split_batch(input_pdf, output_dir, jobs, options,
+                         on_written=lambda written: collect(next(pages), [written]), cancel=cancel)
+            return report
+
+        batches = _partition(jobs, workers * 8)
+        with process_pool(workers) as pool:
+            futures = {pool.submit(_split_batch, input_pdf, output_dir, batch, options): batch for batch in batches}
+            try:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    collect(sum(end - start + 1 for (start, end), _ in batch), future.result())
+                    _check_cancel(cancel)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        return report
+    except JobCancelled:
+        _remove_outputs(expected)
+        raise
+
+def split_by_page(pdf_path, output_dir, workers=None, options=None, progress=None, cancel=None):
+    return split_pdf(pdf_path, output_dir, workers=workers, options=options, progress=progress, cancel=cancel)
+
+def split_by_step(pdf_path, output_dir, step, workers=None, options=None, progress=None, cancel=None):
+    if step < 1:
+        raise ValueError("步长必须大于 0")
+    total = _source_page_count(pdf_path)
+    ranges = [(start, min(start + step - 1, total - 1)) for start in range(0, total, step)]
+    return split_pdf(pdf_path, output_dir, ranges, workers=workers, options=options, progress=progress, cancel=cancel)
+
+def split_by_custom_ranges(pdf_path, output_dir, ranges, workers=None, options=None, progress=None, cancel=None):
+    total = _source_page_count(pdf_path)
+    return split_pdf(pdf_path, output_dir, parse_page_ranges(ranges, total), workers=workers, options=options,
+                     progress=progress, cancel=cancel)
+
+# --- 按大小、按书签拆分 ---
+# 页面引用图里不跟随的键：/Parent 会连到整棵页面树，/P 是注释指回所在页
+_BACK_REF_RE = re.compile(r"/(?:Parent|P)\s*\d+\s+0\s+R")
+_OBJ_REF_RE = re.compile(r"(\d+)\s+0\s+R")
+# 每个对象在输出文件中的固定开销（"N 0 obj" / "endobj" 和交叉引用表的一项）、流额外的 stream/endstream，
+# 以及每个文件的目录、页面树和尾部
+OBJECT_OVERHEAD = 40
+STREAM_OVERHEAD = 20
+FILE_OVERHEAD = 1024
+# insert_pdf 复制页面时带上的键，其余（/Thumb、/B 等）不会进入输出；前四个可从页面树继承
+_COPIED_PAGE_KEYS = ("Resources", "MediaBox", "CropBox", "Rotate", "Contents", "Annots")
+_INHERITED_PAGE_KEYS = _COPIED_PAGE_KEYS[:4]
+
+class _PageSizeModel:
+    # 估算页面对输出文件大小的贡献：从页面对象出发沿间接引用收集它用到的全部对象（内容流、字体、图片……），
+    # 每个对象的大小为对象字典长度加流的原始（已压缩）长度。拆分时对象按原样复制，
+    # 一份输出的大小就是其中各页对象集合的并集之和，共享的字体、图片在同一份里只算一次。
+    # 每个对象只解析一次，不需要试存
+    def __init__(self, doc):
+        self.doc = doc
+        self.xref_count = doc.xref_length()
+        self.page_xrefs = {doc.page_xref(i) for i in range(len(doc))}
+        self._refs = {}
+        self._sizes = {}
+
+    def _scan(self, xref):
+        text = self.doc.xref_object(xref, compressed=True)
+        refs = [int(r) for r in _OBJ_REF_RE.findall(_BACK_REF_RE.sub("", text))]
+        size = len(text) + OBJECT_OVERHEAD
+        if self.doc.xref_is_stream(xref):
+            size += self._stream_length(xref) + STREAM_OVERHEAD
+        self._refs[xref] = refs
+        self._sizes[xref] = size
+        return refs
+
+    def _stream_length(self, xref):
+        kind, value = self.doc.xref_get_key(xref, "Length")
+        try:
+            if kind == "int":
+                return int(value)
+            if kind == "xref":
+                return int(self.doc.xref_object(int(value.split()[0]), compressed=True))
+        except ValueError:
+            pass
+        return len(self.doc.xref_stream_raw(xref) or b"")
+
+    def _page_refs(self, xref):
+        # 页面对象只跟随会被复制的键，缺省的可继承键到上级页面树节点里找
+        refs = []
+        for key in _COPIED_PAGE_KEYS:
+            node, (kind, value) = xref, self.doc.xref_get_key(xref, key)
+            while kind == "null" and key in _INHERITED_PAGE_KEYS:
+                parent_kind, parent = self.doc.xref_get_key(node, "Parent")
+                if parent_kind != "xref":
+                    break
+                node = int(parent.split()[0])
+                kind, value = self.doc.xref_get_key(node, key)
+            if kind in ("xref", "array", "dict"):
+                refs.extend(int(r) for r in _OBJ_REF_RE.findall(_BACK_REF_RE.sub("", value)))
+        self._refs[xref] = refs
+        # 另加页面树 /Kids 中的一项
+        self._sizes[xref] = len(self.doc.xref_object(xref, compressed=True)) + OBJECT_OVERHEAD + 8
+        return refs
+
+    def page_objects(self, index):
+        root = self.doc.page_xref(index)
+        seen = {root}
+        if root not in self._refs:
+            self._page_refs(root)
+        stack = [root]
+        while stack:
+            xref = stack.pop()
+            refs = self._refs.get(xref)
+            if refs is None:
+                refs = self._scan(xref)
+            for ref in refs:
+                # 不进入其他页面（链接目标、书签等会引用别的页）
+                if ref not in seen and ref not in self.page_xrefs and 0 < ref < self.xref_count:
+                    seen.add(ref)
+                    stack.append(ref)
+        return seen
+
+    def size(self, xrefs):
+        return sum(self._sizes[xref] for xref in xrefs)
+
+def plan_size_chunks(doc, max_bytes, cancel=None):
+    # 按页序贪心装箱：每页加入当前分块时只计入分块里还没有的对象，超过 max_bytes 就另起一块。
+    # 单页本身超过上限时独占一块。返回 [((start, end), 估算字节数)]，页码从 0 开始
+    if max_bytes <= FILE_OVERHEAD:
+        raise ValueError("大小上限过小")
+    model = _PageSizeModel(doc)
+    chunks = []
+    start, objects, size = 0, set(), FILE_OVERHEAD
+    for index in range(len(doc)):
+        _check_cancel(cancel)
+        page_objects = model.page_objects(index)
+        cost = model.size(page_objects - objects)
+        if index > start and size + cost > max_bytes:
+            chunks.append(((start, index - 1), size))
+            start, objects, size = index, set(), FILE_OVERHEAD
+            cost = model.size(page_objects)
+        objects |= page_objects
+        size += cost
+    if len(doc):
+        chunks.append(((start, len(doc) - 1), size))
+    return chunks
+
+def safe_file_name(title, limit=80):
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "_", title).strip(" .")
+    return name[:limit] or "untitled"
+
+def bookmark_ranges(doc, level=1):
+    # 在第 level 级书签处切分：每段从书签指向的页开始，到下一个同级书签的前一页结束；
+    # 第一个书签之前的页单独成一段。返回 [((start, end), 文件名)]，文件名带序号，标题相同也不会冲突
+    total = len(doc)
+    starts = {}
+    for lvl, title, page in doc.get_toc(simple=True):
+        if lvl == level and 1 <= page <= total:
+            starts.setdefault(page - 1, title)
+    if not starts:
+        raise ValueError("文档没有可用于拆分的书签")
+    points = sorted(starts)
+    result = []
+    if points[0] > 0:
+        result.append(((0, points[0] - 1), "00_前置页.pdf"))
+    width = max(2, len(str(len(points))))
+    for n, start in enumerate(points, 1):
+        end = points[n] - 1 if n < len(points) else total - 1
+        result.append(((start, end), f"{n:0{width}d}_{safe_file_name(starts[start])}.pdf"))
+    return result
+
+def split_by_size(pdf_path, output_dir, max_bytes, workers=None, options=None, progress=None, cancel=None):
+    # 拆成不超过 max_bytes 的若干份（按估算值装箱，各页对象原样复制；启用压缩时实际输出只会更小）
+    doc = open_source(pdf_path)
+    try:
+        with span("split.plan_size", pages=len(doc)):
+            ranges = [r for r, _ in plan_size_chunks(doc, max_bytes, cancel)]
+    finally:
+        doc.close()
+    return split_pdf(pdf_path, output_dir, ranges, workers=workers, options=options, progress=progress, cancel=cancel)
+
+def split_by_bookmark(pdf_path, output_dir, level=1, workers=None, options=None, progress=None, cancel=None):
+    doc = open_source(pdf_path)
+    try:
+        parts = bookmark_ranges(doc, level)
+    finally:
+        doc.close()
+    ranges, names = zip(*parts)
+    return split_pdf(pdf_path, output_dir, list(ranges), list(names), workers=workers, options=options,
+                     progress=progress, cancel=cancel)
+
+# --- 导出为图片 ---
+IMAGE_COLORSPACES = {"rgb": 3, "gray": 1, "cmyk": 4}
+IMAGE_FORMATS = ("png", "jpg")
+
+@dataclass(frozen=True)
+class ImageOptions:
+    # 页面光栅化参数
+    dpi: int = 150
+    colorspace: str = "rgb"     # rgb / gray / cmyk
+    format: str = "png"         # png / jpg
+    jpeg_quality: int = 90
+
+    def __post_init__(self):
+        if self.colorspace not in IMAGE_COLORSPACES:
+            raise ValueError(f"不支持的颜色空间: {self.colorspace}")
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图片格式: {self.format}")
+        if self.format == "png" and self.colorspace == "cmyk":
+            raise ValueError("PNG 不支持 CMYK，请改用 JPEG")
+        if not 1 <= self.dpi <= 2400:
+            raise ValueError(f"DPI 无效: {self.dpi}")
+
+    def pixel_bytes(self, width, height):
+        # 按页面尺寸（pt）估算一页位图的字节数
+        scale = self.dpi / 72
+        return math.ceil(width * scale) * math.ceil(height * scale) * IMAGE_COLORSPACES[self.colorspace]
+
+@dataclass
+class ExportReport(OutputReport):
+    # timings 为每页的 (页码, 秒, 字节)，页码从 0 开始，含渲染、编码和写盘
+    timings: list = field(default_factory=list)
+    workers: int = 1
+
+    def page_stats(self):
+        seconds = sorted(t for _, t, _ in self.timings)
+        if not seconds:
+            return {}
+        pick = lambda q: seconds[min(len(seconds) - 1, int(q * len(seconds)))]
+        return {
+            "pages": len(seconds),
+            "workers": self.workers,
+            "mean_ms": round(1000 * sum(seconds) / len(seconds), 2),
+            "p50_ms": round(1000 * pick(0.5), 2),
+            "p95_ms": round(1000 * pick(0.95), 2),
+            "max_ms": round(1000 * seconds[-1], 2),
+        }
+
+def image_file_name(index, options):
+    return f"page_{index + 1}.{options.format}"
+
+def _render_page_image(page, options):
+    colorspace = {"rgb": fitz.csRGB, "gray": fitz.csGRAY, "cmyk": fitz.csCMYK}[options.colorspace]
+    pix = page.get_pixmap(dpi=options.dpi, colorspace=colorspace, alpha=False)
+    return pix.tobytes(options.format, jpg_quality=options.jpeg_quality), pix.stride * pix.height
+
+def _export_batch(source, output_dir, batch, options, store_limit=None, on_written=None, cancel=None):
+    # 源只打开一次，逐页渲染并立即写盘，返回 [(路径, 字节, 页码, 秒)]；位图不回传父进程。
+    # PyMuPDF 读不到 MuPDF 缓存的大小，以渲染过的位图字节数近似：累计超过 store_limit 就收缩一次缓存，
+    # 工作进程内存不随页数增长
+    doc = open_source(source)
+    outputs = []
+    rendered = 0
+    try:
+        for ((index, _), name) in batch:
+            _check_cancel(cancel)
+            started = time.perf_counter()
+            data, pixel_bytes = _render_page_image(doc.load_page(index), options)
+            out_file = os.path.join(output_dir, name)
+            _write_file(out_file, data)
+            outputs.append((out_file, len(data), index, time.perf_counter() - started))
+            del data
+            rendered += pixel_bytes
+            if store_limit and rendered > store_limit:
+                fitz.TOOLS.store_shrink(50)
+                rendered = 0
+            if on_written:
+                on_written(outputs[-1])
+    finally:
+        doc.close()
+    return outputs
+
+EXPORT_MEMORY_BUDGET = 1024 * 1024 * 1024
+# 每个工作进程除位图外的大致开销：解释器、已解析的文档和 MuPDF 缓存
+EXPORT_WORKER_OVERHEAD = 96 * 1024 * 1024
+EXPORT_PARALLEL_MIN_PAGES = 8
+
+def _export_page_sizes(source):
+    if _is_path(source):
+        return _probe_inputs([source])[0].page_sizes
+    doc = open_source(source)
+    try:
+        return tuple((r.width, r.height) for r in (doc.page_cropbox(i) for i in range(len(doc))))
+    finally:
+        doc.close()
+
+def export_workers(peak_bytes, workers=None, memory_budget=EXPORT_MEMORY_BUDGET):
+    # 每个进程同时持有一页位图和它的编码结果，按最大一页估算；预算再小也至少一个进程
+    workers = workers or min(8, os.cpu_count() or 1)
+    per_worker = EXPORT_WORKER_OVERHEAD + 2 * peak_bytes
+    return max(1, min(workers, memory_budget // per_worker))
+
+@timed("export", nbytes=lambda report: report.bytes_written)
+def export_images(source, output_dir, ranges=None, options=None, workers=None, memory_budget=EXPORT_MEMORY_BUDGET,
+                  progress=None, cancel=None):
+    # 把选定页面光栅化为图片写入 output_dir，文件名为 page_<页码>.<格式>。
+    # ranges 为从 0 开始的闭区间列表或 "1-2,4-6" 形式的页码范围，默认全部页面。
+    # 进程数受 memory_budget 限制（按最大一页的位图估算），各页完成即写盘。
+    # progress(已导出页数, 总页数, 已写出字节数)；取消时删除本次已写出的文件并抛出 JobCancelled
+    options = options or ImageOptions()
+    sizes = _export_page_sizes(source)
+    if isinstance(ranges, str):
+        ranges = parse_page_ranges(ranges, len(sizes))
+    for start, end in ranges or ():
+        if not 0 <= start <= end < len(sizes):
+            raise ValueError(f"页码范围无效: {start + 1}-{end + 1}")
+    ranges = ranges or [(0, len(sizes) - 1)]
+    # 重叠的范围只导出一次
+    pages = list(dict.fromkeys(index for start, end in ranges for index in range(start, end + 1)))
+    if not pages:
+        raise ValueError("没有可导出的页面")
+    peak = max(options.pixel_bytes(*sizes[index]) for index in set(pages))
+    workers = export_workers(peak, workers, memory_budget)
+    store_limit = max(16 * 1024 * 1024, memory_budget // workers - 2 * peak)
+    jobs = [((index, index), image_file_name(index, options)) for index in pages]
+    expected = [os.path.join(output_dir, name) for _, name in jobs]
+    report = ExportReport(expected, len(pages))
+
+    def collect(written):
+        for _, nbytes, index, seconds in written:
+            report.bytes_written += nbytes
+            report.timings.append((index, seconds, nbytes))
+            recorder.add("export.page", seconds, nbytes)
+        if progress:
+            progress(len(report.timings), len(pages), report.bytes_written)
+
+    try:
+        if workers <= 1 or len(pages) < EXPORT_PARALLEL_MIN_PAGES or not _is_path(source):
+            _export_batch(source, output_dir, jobs, options, store_limit,
+                          on_written=lambda written: collect([written]), cancel=cancel)
+            return report
+
+        report.workers = workers
+        batches = _partition(jobs, workers * 4)
+        with process_pool(workers) as pool:
+            futures = [pool.submit(_export_batch, source, output_dir, batch, options, store_limit)
+                       for batch in batches]
+            try:
+                for future in as_completed(futures):
+                    collect(future.result())
+                    _check_cancel(cancel)
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+        return report
+    except JobCancelled:
+        _remove_outputs(expected)
+        raise
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+# 直方图桶的上界（毫秒），按 2 的幂增长，最后一个桶收纳更慢的调用
+BUCKETS_MS = tuple(2 ** i / 2 for i in range(16))
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max", "bytes", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds, nbytes):
+        ms = seconds * 1000
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.bytes += nbytes
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q):
+        # 由直方图估算，返回所在桶的上界
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max * 1000
+        return 0.0
+
+
+class Span:
+    # span() 产出的对象，代码块内可以补记处理的字节数和附加参数
+    __slots__ = ("bytes", "args")
+
+    def __init__(self, args):
+        self.bytes = 0
+        self.args = args
+
+
+class Recorder:
+    # 进程内的轻量埋点：按名字累计次数、耗时直方图和字节数，同时保留最近的事件供导出 Chrome trace。
+    # 工作进程里的记录留在各自进程中，界面看到的是主进程一侧（含排队）的耗时
+    def __init__(self, max_events=20000):
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._events = []
+        self._origin = time.perf_counter()
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield Span(args)
+            return
+        span = Span(args)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self._record(name, start, time.perf_counter() - start, span.bytes, span.args)
+
+    def timed(self, name=None, nbytes=None):
+        # nbytes(返回值) 给出本次处理的字节数
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(label) as sp:
+                    result = func(*args, **kwargs)
+                    if nbytes is not None:
+                        sp.bytes = nbytes(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def add(self, name, seconds, nbytes=0, **args):
+        # 记录在别处测得的耗时（如提交到进程池到拿到结果）
+        if self.enabled:
+            self._record(name, time.perf_counter() - seconds, seconds, nbytes, args)
+
+    def _record(self, name, start, seconds, nbytes, args):
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat()
+            stat.add(seconds, nbytes)
+            event = {"name": name, "ph": "X", "ts": round((start - self._origin) * 1e6, 1),
+                     "dur": round(seconds * 1e6, 1), "pid": os.getpid(), "tid": threading.get_ident()}
+            if args or nbytes:
+                event["args"] = dict(args, bytes=nbytes) if nbytes else dict(args)
+            self._events.append(event)
+            if len(self._events) > self.max_events:
+                del self._events[:len(self._events) - self.max_events]
+
+    def snapshot(self):
+        with self._lock:
+            stats = {}
+            for name, stat in sorted(self._stats.items()):
+                stats[name] = {
+                    "count": stat.count,
+                    "total_ms": round(stat.total * 1000, 3),
+                    "mean_ms": round(stat.total * 1000 / stat.count, 3),
+                    "p50_ms": stat.percentile(0.5),
+                    "p95_ms": stat.percentile(0.95),
+                    "max_ms": round(stat.max * 1000, 3),
+                    "bytes": stat.bytes,
+                    "histogram": {f"<={b}ms": n for b, n in zip(BUCKETS_MS, stat.buckets) if n},
+                }
+                if stat.buckets[-1]:
+                    stats[name]["histogram"][f">{BUCKETS_MS[-1]}ms"] = stat.buckets[-1]
+            return stats
+
+    def chrome_trace(self):
+        # chrome://tracing 或 Perfetto 可直接打开
+        with self._lock:
+            return {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+            self._origin = time.perf_counter()
+
+
+recorder = Recorder()
+span = recorder.span
+timed = recorder.timed
+
+
+class StartupTimer:
+    # 启动各阶段距起点的耗时，同时记入 recorder（startup.<阶段>），调试面板里可见
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.marks = {}
+
+    def mark(self, name):
+        elapsed = time.perf_counter() - self.origin
+        self.marks[name] = elapsed
+        recorder.add(f"startup.{name}", elapsed)
+        return elapsed
+
+    def report(self):
+        return "，".join(f"{name} {elapsed * 1000:.0f} ms" for name, elapsed in self.marks.items())
+
+
+def default_profile_dir():
+    return os.path.join(tempfile.gettempdir(), "PDFTool-profiles")
+
+
+@contextmanager
+def capture(label, output_dir=None, top=30):
+    # 对代码块做 cProfile 和 tracemalloc 采样，写出 <label>.prof（可用 snakeviz 等查看）
+    # 和 <label>.txt（耗时前 top 项与内存分配前 top 处）；产出的列表在结束后填入这两个路径。
+    # cProfile 只覆盖当前线程，进程池里的工作不在其中
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    output_dir = output_dir or default_profile_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}")
+    paths = []
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield paths
+    finally:
+        profiler.disable()
+        memory = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        profiler.dump_stats(stem + ".prof")
+        with open(stem + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"tracemalloc peak: {peak / 2 ** 20:.1f} MB\n\n")
+            for stat in memory.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+            f.write("\n")
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(top)
+        paths.extend([stem + ".prof", stem + ".txt"])
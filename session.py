@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pdf_utils import DocumentInfo, safe_file_name
+from perf import span
+
+SESSION_SUFFIX = ".pdfsession"
+SESSION_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def default_session_dir():
+    # 会话是用户数据，不放在可能被清理的缓存目录
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "PDFTool", "sessions")
+
+
+def session_path(name, directory=None):
+    return os.path.join(directory or default_session_dir(), safe_file_name(name) + SESSION_SUFFIX)
+
+
+def list_sessions(directory=None):
+    # 返回 [(名称, 路径)]，最近保存的在前
+    directory = directory or default_session_dir()
+    try:
+        entries = [e for e in os.scandir(directory) if e.name.endswith(SESSION_SUFFIX) and e.is_file()]
+    except OSError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [(e.name[:-len(SESSION_SUFFIX)], e.path) for e in entries]
+
+
+@dataclass
+class SessionEntry:
+    # 列表中的一个文件。info 为保存时的文档信息，thumbnail 为缩略图 PNG；
+    # 载入时文件大小或修改时间与保存时不同则 changed 为 True，info 和 thumbnail 作废
+    path: str
+    file_size: int
+    mtime_ns: int
+    info: DocumentInfo = None
+    fingerprint: str = None
+    thumbnail: bytes = None
+    changed: bool = False
+    missing: bool = False
+
+
+@dataclass
+class Session:
+    name: str
+    entries: list
+    saved_at: float = None
+    extra: dict = field(default_factory=dict)   # 界面状态，如输出文件名、缩略图尺寸
+
+    @property
+    def valid(self):
+        return [e for e in self.entries if not e.changed and not e.missing]
+
+
+def save_session(path, session):
+    # 单个 zip：manifest.json（压缩）加 thumbs/ 下的 PNG（已是压缩格式，直接存储）。
+    # 先写临时文件再替换，保存中途失败不会损坏已有会话。返回写入的字节数
+    with span("session.save", files=len(session.entries)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        files = []
+        tmp = path + ".tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:
+            for i, entry in enumerate(session.entries):
+                thumb = None
+                if entry.thumbnail:
+                    thumb = f"thumbs/{i:05d}.png"
+                    zf.writestr(thumb, entry.thumbnail)
+                files.append({
+                    "path": entry.path,
+                    "file_size": entry.file_size,
+                    "mtime_ns": entry.mtime_ns,
+                    "info": entry.info.to_dict() if entry.info is not None else None,
+                    "fingerprint": entry.fingerprint,
+                    "thumbnail": thumb,
+                })
+            manifest = {"version": SESSION_VERSION, "name": session.name, "saved_at": time.time(),
+                        "extra": session.extra, "files": files}
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, separators=(",", ":")),
+                        compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+
+def load_session(path):
+    # 按大小和修改时间校验每个文件（每个文件一次 stat，不打开 PDF）；
+    # 未变化的文件连同文档信息和缩略图一起返回，变化或丢失的只做标记
+    with span("session.load"):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                manifest = json.loads(zf.read(MANIFEST_NAME))
+                if manifest.get("version") != SESSION_VERSION:
+                    raise ValueError(f"不支持的会话文件版本: {manifest.get('version')}")
+                entries = []
+                for item in manifest["files"]:
+                    entry = SessionEntry(item["path"], item["file_size"], item["mtime_ns"],
+                                         fingerprint=item.get("fingerprint"))
+                    try:
+                        st = os.stat(entry.path)
+                    except OSError:
+                        entry.missing = True
+                        entries.append(entry)
+                        continue
+                    if (st.st_size, st.st_mtime_ns) != (entry.file_size, entry.mtime_ns):
+                        entry.changed = True
+                        entry.fingerprint = None
+                    else:
+                        if item.get("info"):
+                            entry.info = DocumentInfo.from_dict(item["info"])
+                        if item.get("thumbnail"):
+                            entry.thumbnail = zf.read(item["thumbnail"])
+                    entries.append(entry)
+        except (zipfile.BadZipFile, KeyError, TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"会话文件已损坏: {e}") from None
+        return Session(manifest.get("name") or "", entries, manifest.get("saved_at"), manifest.get("extra") or {})
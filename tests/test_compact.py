@@ -0,0 +1,30 @@
+import pymupdf
+
+from pdf_utils import SaveOptions, document_bytes
+
+
+def _make_chunk():
+    doc = pymupdf.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i + 1} " * 40, fontname="helv")
+        page.draw_rect(pymupdf.Rect(50, 50, 300, 300))
+    return doc
+
+
+def test_bytes_saved_estimate_matches_plain_save():
+    with _make_chunk() as doc:
+        plain = len(doc.tobytes())
+    with _make_chunk() as doc:
+        data, saved = document_bytes(doc, SaveOptions.compact())
+    assert data.startswith(b"%PDF-")
+    assert saved > 0
+    assert abs((len(data) + saved) - plain) <= plain * 0.05
+
+
+def test_no_savings_without_options():
+    with _make_chunk() as doc:
+        data, saved = document_bytes(doc)
+    assert saved == 0
+    with pymupdf.open(stream=data, filetype="pdf") as out:
+        assert len(out) == 3
@@ -0,0 +1,133 @@
+import os
+import json
+
+import pymupdf
+import pytest
+
+import pdf_utils
+from pdf_utils import merge_pdfs, merge_manifest_path
+
+
+def _make_pdf(path, pages, label=None):
+    doc = pymupdf.open()
+    for i in range(pages):
+        doc.new_page(width=200, height=200).insert_text((20, 40), f"{label or path.stem} {i + 1}")
+    doc.set_toc([[1, label or path.stem, 1]])
+    doc.save(str(path))
+    doc.close()
+
+
+def _content(path):
+    # 增量更新后的文件与整体重写的对象编号不同，按渲染结果、文本和目录逐字节比较
+    with pymupdf.open(str(path)) as doc:
+        pages = [(page.get_text(), page.get_pixmap(dpi=36).samples) for page in doc]
+        return pages, doc.get_toc(simple=True)
+
+
+def _manifest(path):
+    with open(merge_manifest_path(str(path)), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    paths = []
+    for name, pages in (("a", 2), ("b", 3), ("c", 1)):
+        path = tmp_path / f"{name}.pdf"
+        _make_pdf(path, pages)
+        paths.append(path)
+    return paths
+
+
+def _merge(paths, output, **kwargs):
+    return merge_pdfs([str(p) for p in paths], str(output), incremental=True, **kwargs)
+
+
+def _full(paths, tmp_path):
+    output = tmp_path / "full.pdf"
+    merge_pdfs([str(p) for p in paths], str(output))
+    return _content(output)
+
+
+def test_changed_tail_reuses_prefix(tmp_path, inputs):
+    output = tmp_path / "out.pdf"
+    _merge(inputs, output)
+    _make_pdf(inputs[2], 4, "c2")
+    report = _merge(inputs, output)
+    assert report.reused_pages == 5
+    assert report.pages == 9
+    assert _content(output) == _full(inputs, tmp_path)
+
+
+def test_append_and_shorten(tmp_path, inputs):
+    output = tmp_path / "out.pdf"
+    _merge(inputs[:2], output)
+    report = _merge(inputs, output)
+    assert report.reused_pages == 5
+    assert _content(output) == _full(inputs, tmp_path)
+
+    report = _merge(inputs[:1], output)
+    assert report.reused_pages == 2
+    assert _content(output) == _full(inputs[:1], tmp_path)
+
+
+def test_unchanged_list_does_not_write(tmp_path, inputs):
+    output = tmp_path / "out.pdf"
+    _merge(inputs, output)
+    before = os.stat(output)
+    report = _merge(inputs, output)
+    assert report.reused_pages == report.pages == 6
+    assert os.stat(output).st_mtime_ns == before.st_mtime_ns
+
+
+def test_changed_first_input_rebuilds(tmp_path, inputs):
+    output = tmp_path / "out.pdf"
+    _merge(inputs, output)
+    _make_pdf(inputs[0], 1, "a2")
+    report = _merge(inputs, output)
+    assert report.reused_pages == 0
+    assert _content(output) == _full(inputs, tmp_path)
+
+
+def test_periodic_full_rewrite(tmp_path, inputs, monkeypatch):
+    monkeypatch.setattr(pdf_utils, "MAX_INCREMENTS", 2)
+    output = tmp_path / "out.pdf"
+    _merge(inputs, output)
+    _make_pdf(inputs[2], 2, "c2")
+    _merge(inputs, output)
+    assert _manifest(output)["increments"] == 1
+    grown = os.path.getsize(output)
+    _make_pdf(inputs[2], 3, "c3")
+    _merge(inputs, output)
+    # 第二次增量达到上限：整体重写，旧版本对象被丢弃
+    assert _manifest(output)["increments"] == 0
+    assert os.path.getsize(output) < grown
+    assert _content(output) == _full(inputs, tmp_path)
+    # 重写后清单仍然有效，可以继续增量
+    _make_pdf(inputs[2], 1, "c4")
+    assert _merge(inputs, output).reused_pages == 5
+    assert _content(output) == _full(inputs, tmp_path)
+
+
+class _CancelAfter:
+    def __init__(self, checks):
+        self.checks = checks
+
+    def is_set(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+def test_cancel_restores_previous_output(tmp_path, inputs):
+    output = tmp_path / "out.pdf"
+    _merge(inputs[:1], output)
+    before = output.read_bytes()
+    manifest = _manifest(output)
+    with pytest.raises(pdf_utils.JobCancelled):
+        _merge(inputs, output, cancel=_CancelAfter(1))
+    assert output.read_bytes() == before
+    assert _manifest(output) == manifest
+    # 恢复后的输出和清单仍可继续增量
+    report = _merge(inputs, output)
+    assert report.reused_pages == 2
+    assert _content(output) == _full(inputs, tmp_path)
@@ -0,0 +1,109 @@
+import os
+import zipfile
+
+import pymupdf
+import pytest
+
+import ingest
+from ingest import ContentIndex, ScanStats, scan, sniff, _member_path
+
+
+def _pdf_bytes(label):
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), label)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _scan(paths, index, extract_dir, stats=None):
+    return [p for batch in scan([str(p) for p in paths], index, extract_dir=str(extract_dir), stats=stats)
+            for p in batch]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("a.pdf", "a.pdf"),
+    ("sub/./b.pdf", os.path.join("sub", "b.pdf")),
+    ("../../evil.pdf", "evil.pdf"),
+    ("/abs/x.pdf", os.path.join("abs", "x.pdf")),
+    ("a/../../b.pdf", os.path.join("a", "b.pdf")),
+    ("..", None),
+    ("./", None),
+])
+def test_member_path_stays_inside_target(tmp_path, name, expected):
+    target = tmp_path / "target"
+    out = _member_path(str(target), name)
+    if expected is None:
+        assert out is None
+    else:
+        assert out == os.path.join(str(target), expected)
+
+
+def test_archive_with_traversal_names_extracts_inside(tmp_path):
+    archive = tmp_path / "scans.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("../../evil.pdf", _pdf_bytes("evil"))
+        zf.writestr("/abs/x.pdf", _pdf_bytes("abs"))
+        zf.writestr("notes.txt", b"not a pdf")
+    extract_dir = tmp_path / "extract"
+    # 原样拼接成员名时 ../../evil.pdf 指向这里；放一个同样大小的文件，复用检查不能把它当作已解出的成员
+    decoy = tmp_path / "evil.pdf"
+    decoy.write_bytes(_pdf_bytes("evil"))
+    first = _scan([archive], ContentIndex(), extract_dir)
+    # 第二次扫描时解压目录已存在，原样拼接的路径才能解析到目录外
+    found = _scan([archive], ContentIndex(), extract_dir)
+    assert len(found) == 2
+    assert found == first
+    for path in found:
+        path = os.path.realpath(path)
+        assert os.path.commonpath([os.path.realpath(extract_dir), path]) == os.path.realpath(extract_dir)
+        assert path != os.path.realpath(decoy)
+        assert sniff(open(path, "rb").read(1024)) == "pdf"
+
+
+def test_rescanning_same_archive_is_deduplicated(tmp_path):
+    archive = tmp_path / "batch.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("one.pdf", _pdf_bytes("one"))
+        zf.writestr("dir/two.pdf", _pdf_bytes("two"))
+    extract_dir = tmp_path / "extract"
+    index = ContentIndex()
+    first = _scan([archive], index, extract_dir)
+    assert len(first) == 2
+    stats_before = {p: os.stat(p).st_mtime_ns for p in first}
+    # 同一版本的压缩包再次加入：复用已解出的文件，内容全部判为重复
+    again = _scan([archive], index, extract_dir)
+    assert again == []
+    assert {p: os.stat(p).st_mtime_ns for p in first} == stats_before
+    # 新的索引（清空列表后重新加入）也复用同一个解压目录
+    assert sorted(_scan([archive], ContentIndex(), extract_dir)) == sorted(first)
+
+
+def test_duplicate_content_across_files_and_archives(tmp_path):
+    same = _pdf_bytes("same")
+    (tmp_path / "loose.pdf").write_bytes(same)
+    (tmp_path / "other.pdf").write_bytes(_pdf_bytes("diff"))
+    archive = tmp_path / "copy.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inside.pdf", same)
+    index = ContentIndex()
+    stats = ScanStats()
+    found = _scan([tmp_path / "loose.pdf", tmp_path / "other.pdf", archive], index, tmp_path / "extract", stats)
+    assert [os.path.basename(p) for p in found] == ["loose.pdf", "other.pdf"]
+    assert stats.duplicates == 1
+
+
+def test_content_index_hashes_only_on_size_collision(tmp_path, monkeypatch):
+    calls = []
+    digest = ingest.file_digest
+    monkeypatch.setattr(ingest, "file_digest", lambda p: calls.append(p) or digest(p))
+    a, b, c = (tmp_path / n for n in ("a.pdf", "b.pdf", "c.pdf"))
+    a.write_bytes(b"x" * 10)
+    b.write_bytes(b"y" * 20)
+    c.write_bytes(b"x" * 10)
+    index = ContentIndex()
+    assert index.add(str(a)) and index.add(str(b))
+    assert calls == []
+    assert not index.add(str(c))
+    assert len(calls) == 2
+    assert not index.add(str(a))
@@ -0,0 +1,47 @@
+import pymupdf
+
+from pdf_utils import merge_pdfs
+
+
+def _make_inline_resources_pdf(path, pages=2):
+    # 每页的 /Resources 直接写在页面字典里，带 /Type/ExtGState 的内联字典；各页内容相同
+    doc = pymupdf.open()
+    for _ in range(pages):
+        doc.new_page()
+    for page in doc:
+        contents = doc.get_new_xref()
+        doc.update_object(contents, "<<>>")
+        doc.update_stream(contents, b"q /GS0 gs 0 0 m 100 100 l S Q")
+        doc.xref_set_key(page.xref, "Contents", f"{contents} 0 R")
+        doc.xref_set_key(page.xref, "Resources", "<</ExtGState<</GS0<</Type/ExtGState/CA 0.5>>>>>>")
+    doc.save(str(path))
+    doc.close()
+
+
+def test_merge_keeps_pages_with_inline_resources(tmp_path):
+    src = tmp_path / "inline.pdf"
+    _make_inline_resources_pdf(src)
+    out = tmp_path / "merged.pdf"
+    merge_pdfs([str(src), str(src)], str(out))
+    with pymupdf.open(str(out)) as doc:
+        assert len(doc) == 4
+        for page in doc:
+            assert doc.xref_get_key(page.xref, "Type") == ("name", "/Page")
+            assert page.get_contents()
+
+
+def test_merge_shares_identical_fonts(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / f"f{i}.pdf"
+        doc = pymupdf.open()
+        doc.new_page().insert_text((72, 72), f"file {i}", fontname="helv")
+        doc.save(str(path))
+        doc.close()
+        paths.append(str(path))
+    out = tmp_path / "merged.pdf"
+    merge_pdfs(paths, str(out))
+    with pymupdf.open(str(out)) as doc:
+        fonts = {font[0] for page in doc for font in page.get_fonts()}
+        assert len(doc) == 2
+        assert len(fonts) == 1
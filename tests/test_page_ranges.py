@@ -0,0 +1,18 @@
+import pytest
+
+from pdf_utils import parse_page_ranges
+
+
+@pytest.mark.parametrize("spec, total, expected", [
+    ("1-2,4-6", 10, [(0, 1), (3, 5)]),
+    ("3", 3, [(2, 2)]),
+    (" 1 , 2-3 ,", 3, [(0, 0), (1, 2)]),
+])
+def test_parse_page_ranges(spec, total, expected):
+    assert parse_page_ranges(spec, total) == expected
+
+
+@pytest.mark.parametrize("spec", ["abc", "3-", "-3", "1-2-3", "0", "4", "3-2", "1-x", ""])
+def test_parse_page_ranges_rejects_invalid(spec):
+    with pytest.raises(ValueError, match="页码范围"):
+        parse_page_ranges(spec, 3)
@@ -0,0 +1,127 @@
+import os
+
+import pymupdf
+import pytest
+
+from pdf_utils import (FILE_OVERHEAD, bookmark_ranges, format_page_ranges, parse_page_ranges, plan_size_chunks,
+                       split_by_size)
+
+
+def _doc_with_page_sizes(sizes, shared=0):
+    # 每页一个未压缩的内容流，大小为 sizes[i] 字节；shared > 0 时各页再引用同一个该大小的流
+    doc = pymupdf.open()
+    common = None
+    if shared:
+        common = doc.get_new_xref()
+        doc.update_object(common, "<<>>")
+        doc.update_stream(common, b"%" + b"s" * (shared - 2) + b"\n", compress=False)
+    for size in sizes:
+        page = doc.new_page(width=200, height=200)
+        contents = doc.get_new_xref()
+        doc.update_object(contents, "<<>>")
+        doc.update_stream(contents, b"%" + b"x" * (size - 2) + b"\n", compress=False)
+        refs = f"{contents} 0 R" + (f" {common} 0 R" if common else "")
+        doc.xref_set_key(page.xref, "Contents", f"[{refs}]")
+    return doc
+
+
+def _chunk_ranges(doc, limit):
+    return [r for r, _ in plan_size_chunks(doc, limit)]
+
+
+@pytest.mark.parametrize("sizes, limit, expected", [
+    # 每份放得下两页
+    ([10_000] * 5, FILE_OVERHEAD + 25_000, [(0, 1), (2, 3), (4, 4)]),
+    # 单页超过上限：独占一份，前后照常装箱
+    ([1_000, 50_000, 1_000, 1_000], FILE_OVERHEAD + 10_000, [(0, 0), (1, 1), (2, 3)]),
+    ([50_000], FILE_OVERHEAD + 10_000, [(0, 0)]),
+    # 上限足够大时整份
+    ([1_000] * 4, 10_000_000, [(0, 3)]),
+    ([], 10_000, []),
+])
+def test_plan_size_chunks(sizes, limit, expected):
+    with _doc_with_page_sizes(sizes) as doc:
+        assert _chunk_ranges(doc, limit) == expected
+
+
+def test_plan_size_chunks_counts_shared_objects_once():
+    # 共享的 40 KB 流按份计一次：每份能放下多页，而不是每页都算 40 KB
+    with _doc_with_page_sizes([1_000] * 6, shared=40_000) as doc:
+        chunks = plan_size_chunks(doc, FILE_OVERHEAD + 50_000)
+    assert [r for r, _ in chunks] == [(0, 5)]
+    assert chunks[0][1] < FILE_OVERHEAD + 50_000
+
+
+def test_plan_size_chunks_rejects_tiny_limit():
+    with _doc_with_page_sizes([1_000]) as doc:
+        with pytest.raises(ValueError):
+            plan_size_chunks(doc, FILE_OVERHEAD)
+
+
+def test_split_by_size_outputs_respect_limit(tmp_path):
+    src = tmp_path / "src.pdf"
+    with _doc_with_page_sizes([20_000, 5_000, 5_000, 30_000, 5_000, 200_000, 5_000]) as doc:
+        doc.save(str(src))
+    limit = 64 * 1024
+    report = split_by_size(str(src), str(tmp_path), limit, workers=1)
+    assert report.pages == 7
+    for path in report.outputs:
+        with pymupdf.open(path) as part:
+            # 只有单页超限的那一份可以超过上限
+            assert os.path.getsize(path) <= limit or len(part) == 1
+
+
+def _toc_doc(pages, toc):
+    doc = pymupdf.open()
+    for _ in range(pages):
+        doc.new_page()
+    doc.set_toc(toc)
+    return doc
+
+
+@pytest.mark.parametrize("pages, toc, level, expected", [
+    (5, [[1, "A", 1], [1, "B", 3]], 1, [((0, 1), "01_A.pdf"), ((2, 4), "02_B.pdf")]),
+    # 第一个书签之前的页单独成一份
+    (5, [[1, "A", 3]], 1, [((0, 1), "00_前置页.pdf"), ((2, 4), "01_A.pdf")]),
+    # 标题相同靠序号区分，非法字符替换
+    (4, [[1, "Ch/1", 1], [1, "Ch/1", 3]], 1, [((0, 1), "01_Ch_1.pdf"), ((2, 3), "02_Ch_1.pdf")]),
+    # 只在指定级别切分；同一页的多个书签取第一个
+    (6, [[1, "A", 1], [2, "A.1", 2], [2, "A.2", 2], [1, "B", 5]], 2,
+     [((0, 0), "00_前置页.pdf"), ((1, 5), "01_A.1.pdf")]),
+    (3, [[1, "A", 1], [2, "A.1", 2]], 1, [((0, 2), "01_A.pdf")]),
+])
+def test_bookmark_ranges(pages, toc, level, expected):
+    with _toc_doc(pages, toc) as doc:
+        assert bookmark_ranges(doc, level) == expected
+
+
+def test_bookmark_ranges_pads_numbers():
+    toc = [[1, f"c{i}", i] for i in range(1, 101)]
+    with _toc_doc(100, toc) as doc:
+        names = [name for _, name in bookmark_ranges(doc)]
+    assert names[0] == "001_c1.pdf" and names[-1] == "100_c100.pdf"
+
+
+@pytest.mark.parametrize("toc, level", [
+    ([], 1),
+    ([[1, "A", 1]], 2),
+])
+def test_bookmark_ranges_without_usable_bookmarks(toc, level):
+    with _toc_doc(3, toc) as doc:
+        with pytest.raises(ValueError):
+            bookmark_ranges(doc, level)
+
+
+@pytest.mark.parametrize("pages, expected", [
+    ([], ""),
+    ([0], "1"),
+    ([0, 1, 2, 6], "1-3,7"),
+    ([6, 0, 2, 1, 2], "1-3,7"),
+    ([1, 3, 5], "2,4,6"),
+    ([4, 5], "5-6"),
+])
+def test_format_page_ranges_round_trip(pages, expected):
+    assert format_page_ranges(pages) == expected
+    if expected:
+        parsed = parse_page_ranges(expected, 10)
+        assert {i for start, end in parsed for i in range(start, end + 1)} == set(pages)
@@ -0,0 +1,101 @@
+import os
+import time
+
+import pymupdf
+import pytest
+
+from watch import HotFolder, WatchOptions
+
+
+def _make_pdf(path, pages):
+    doc = pymupdf.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"{os.path.basename(path)} {i + 1}")
+    doc.save(str(path))
+    doc.close()
+
+
+def _run_until(hot_folder, processed, timeout=60):
+    # settle 和 window 为 0：第二轮轮询确认文件写完，之后立即封组派发
+    batches = []
+    deadline = time.time() + timeout
+    while hot_folder.stats()["processed"] + hot_folder.stats()["failed"] < processed:
+        assert time.time() < deadline, hot_folder.stats()
+        batches.extend(hot_folder.poll())
+        time.sleep(0.05)
+    return batches
+
+
+@pytest.fixture
+def folders(tmp_path):
+    inbox, out = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    return inbox, out, str(tmp_path / "journal.db")
+
+
+def _hot_folder(folders, **options):
+    inbox, out, journal = folders
+    return HotFolder(str(inbox), str(out), WatchOptions(settle=0, window=0, interval=0.05, workers=1, **options),
+                     journal_path=journal)
+
+
+def test_merge_groups_by_pattern(folders):
+    inbox, out, _ = folders
+    for name, pages in (("A1_1.pdf", 1), ("A1_2.pdf", 2), ("B2_1.pdf", 3)):
+        _make_pdf(inbox / name, pages)
+    hot_folder = _hot_folder(folders, pattern=r"^([A-Z]\d)_")
+    try:
+        batches = _run_until(hot_folder, 3)
+    finally:
+        batches += hot_folder.close()
+    pages = {b.key: b.pages for b in batches}
+    assert pages == {"A1": 3, "B2": 3}
+    assert all(not b.error and len(b.outputs) == 1 for b in batches)
+    with pymupdf.open(batches[0].outputs[0]) as doc:
+        assert len(doc) == batches[0].pages
+
+
+def test_split_writes_into_new_directory(folders):
+    inbox, out, _ = folders
+    _make_pdf(inbox / "scan.pdf", 3)
+    hot_folder = _hot_folder(folders, op="split")
+    try:
+        batches = _run_until(hot_folder, 1)
+    finally:
+        batches += hot_folder.close()
+    (batch,) = batches
+    assert batch.error is None
+    assert len(batch.outputs) == 3
+    assert all(os.path.dirname(p) == str(out / "scan") for p in batch.outputs)
+
+
+def test_split_by_step_and_skip_damaged(folders):
+    inbox, _, _ = folders
+    _make_pdf(inbox / "book.pdf", 5)
+    (inbox / "broken.pdf").write_bytes(b"%PDF-1.7\nnot really a pdf\n%%EOF\n")
+    hot_folder = _hot_folder(folders, op="split", step=2)
+    try:
+        batches = _run_until(hot_folder, 2)
+    finally:
+        batches += hot_folder.close()
+    by_name = {os.path.basename(b.paths[0]): b for b in batches}
+    assert len(by_name["book.pdf"].outputs) == 3
+    assert by_name["broken.pdf"].skipped
+
+
+def test_journal_skips_processed_files_after_restart(folders):
+    inbox, out, _ = folders
+    _make_pdf(inbox / "a.pdf", 1)
+    hot_folder = _hot_folder(folders)
+    try:
+        _run_until(hot_folder, 1)
+    finally:
+        hot_folder.close()
+    hot_folder = _hot_folder(folders)
+    try:
+        for _ in range(3):
+            assert not hot_folder.poll()
+        assert hot_folder.stats()["arrived"] == 0
+    finally:
+        hot_folder.close()
+    assert len(os.listdir(out)) == 1
@@ -0,0 +1,91 @@
+import gc
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
+import pytest
+
+from pdf_utils import (thumbnail_task, render_pages_task, extract_text_task, merge_pdfs, open_source,
+                       release_source)
+
+
+def _make_pdf(path, pages):
+    doc = pymupdf.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+
+
+def _mapped(pid, path):
+    # Linux 上直接查工作进程的映射表；其他平台由下面的覆盖和删除本身检验（Windows 上映射中的文件会失败）
+    maps = f"/proc/{pid}/maps"
+    if not os.path.exists(maps):
+        return False
+    with open(maps) as f:
+        return any(str(path) in line for line in f)
+
+
+@pytest.fixture(scope="module")
+def worker():
+    # 与界面一样用长期存在的 spawn 进程池
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    pid = pool.submit(os.getpid).result()
+    yield pool, pid
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("task, args", [
+    (thumbnail_task, (120, 150)),
+    (render_pages_task, ([0, 1, 2], 90, 120)),
+    (extract_text_task, ()),
+])
+def test_file_can_be_replaced_and_deleted_after_task(tmp_path, worker, task, args):
+    pool, pid = worker
+    path = tmp_path / "input.pdf"
+    _make_pdf(path, 3)
+    pool.submit(task, str(path), *args).result()
+    assert not _mapped(pid, path)
+
+    replacement = tmp_path / "replacement.pdf"
+    _make_pdf(replacement, 1)
+    os.replace(replacement, path)
+    info, _, _ = pool.submit(thumbnail_task, str(path), 120, 150).result()
+    assert info.page_count == 1
+    assert not _mapped(pid, path)
+
+    os.remove(path)
+    assert not path.exists()
+
+
+def test_release_unmaps_in_process_without_gc(tmp_path):
+    # 合并后文档对象之间有循环引用，release 仍要在返回前解除映射
+    inputs = []
+    for i in range(2):
+        path = tmp_path / f"in{i}.pdf"
+        _make_pdf(path, 2)
+        inputs.append(path)
+    merge_pdfs([str(p) for p in inputs], str(tmp_path / "merged.pdf"))
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for path in inputs:
+            release_source(str(path))
+            assert not _mapped(os.getpid(), path)
+            os.remove(path)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def test_release_keeps_mapping_of_open_document(tmp_path):
+    path = tmp_path / "open.pdf"
+    _make_pdf(path, 2)
+    doc = open_source(str(path))
+    release_source(str(path))
+    # 文档仍可读：映射要等它关闭后才解除
+    assert "page 2" in doc[1].get_text()
+    doc.close()
+    release_source(str(path))
+    assert not _mapped(os.getpid(), path)
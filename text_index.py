@@ -0,0 +1,142 @@
+import os
+import time
+import sqlite3
+from thumbnail_cache import default_cache_dir, sample_hash
+
+# 全文索引中每页的 rowid = 文档 id << PAGE_BITS | 页码，删除一个文档只需按 rowid 区间删除
+PAGE_BITS = 20
+PAGE_MASK = (1 << PAGE_BITS) - 1
+# trigram 分词要求查询至少 3 个字符，更短的查询退回 LIKE 扫描
+MIN_MATCH_CHARS = 3
+
+
+def default_index_path():
+    return os.path.join(os.path.dirname(default_cache_dir()), "text-index.db")
+
+
+def _like_pattern(query):
+    return "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class TextIndex:
+    # 持久化的全文索引（SQLite FTS5）：文档按指纹（大小 + 首尾采样哈希）存放，改名或移动不必重建；
+    # files 表记录路径当时的大小和修改时间，未变化的文件不必再算指纹。
+    # trigram 分词对中文也能做子串匹配；SQLite 不支持时退回 unicode61。
+    # 一个连接只在创建它的线程里使用：后台线程写入，界面线程另开连接只读查询
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "id INTEGER PRIMARY KEY, fingerprint TEXT UNIQUE, page_count INTEGER, indexed_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, fingerprint TEXT)"
+        )
+        exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'pages'").fetchone()
+        if not exists:
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE pages USING fts5(body, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                self._db.execute("CREATE VIRTUAL TABLE pages USING fts5(body)")
+        self._db.commit()
+
+    # --- 写入（后台线程） ---
+    def resolve(self, pdf_path):
+        # 返回文件当前的指纹；大小和修改时间没变时直接用记录的值。文件读不到时返回 None
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        key = os.path.abspath(pdf_path)
+        row = self._db.execute("SELECT size, mtime_ns, fingerprint FROM files WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        try:
+            fingerprint = f"{st.st_size:x}-{sample_hash(pdf_path)}"
+        except OSError:
+            return None
+        self._db.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, fingerprint) VALUES (?, ?, ?, ?)",
+                         (key, st.st_size, st.st_mtime_ns, fingerprint))
+        if row and row[2] != fingerprint:
+            # 文件内容变了，旧版本没有其他路径引用时一并清除
+            self._purge_orphans()
+        self._db.commit()
+        return fingerprint
+
+    def has(self, fingerprint):
+        return self._db.execute("SELECT 1 FROM docs WHERE fingerprint = ?", (fingerprint,)).fetchone() is not None
+
+    def store(self, fingerprint, page_texts):
+        # page_texts 为每页一项的文本列表，页码从 0 开始
+        if len(page_texts) > PAGE_MASK:
+            page_texts = page_texts[:PAGE_MASK + 1]
+        with self._db:
+            self._delete_doc(fingerprint)
+            cursor = self._db.execute("INSERT INTO docs (fingerprint, page_count, indexed_at) VALUES (?, ?, ?)",
+                                      (fingerprint, len(page_texts), time.time()))
+            base = cursor.lastrowid << PAGE_BITS
+            self._db.executemany("INSERT INTO pages (rowid, body) VALUES (?, ?)",
+                                 ((base + page, text) for page, text in enumerate(page_texts) if text))
+
+    def _delete_doc(self, fingerprint):
+        row = self._db.execute("SELECT id FROM docs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        if row:
+            base = row[0] << PAGE_BITS
+            self._db.execute("DELETE FROM pages WHERE rowid BETWEEN ? AND ?", (base, base + PAGE_MASK))
+            self._db.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    def _purge_orphans(self):
+        orphans = self._db.execute(
+            "SELECT fingerprint FROM docs WHERE fingerprint NOT IN (SELECT fingerprint FROM files)").fetchall()
+        for (fingerprint,) in orphans:
+            self._delete_doc(fingerprint)
+        return len(orphans)
+
+    def prune(self):
+        # 清除已删除或已改动的文件；对应的文档不再被引用时删除其全文。返回删除的文档数
+        stale = []
+        for path, size, mtime_ns in self._db.execute("SELECT path, size, mtime_ns FROM files").fetchall():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append((path,))
+                continue
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                stale.append((path,))
+        with self._db:
+            self._db.executemany("DELETE FROM files WHERE path = ?", stale)
+            return self._purge_orphans()
+
+    # --- 查询（界面线程） ---
+    def search(self, query, fingerprints=None, limit=100000):
+        # 返回 {指纹: [页码, ...]}，页码从 0 开始；fingerprints 限定只在这些文档中查找
+        query = query.strip()
+        if not query:
+            return {}
+        if len(query) >= MIN_MATCH_CHARS:
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql, arg = "SELECT rowid FROM pages WHERE pages MATCH ? ORDER BY rowid LIMIT ?", phrase
+        else:
+            sql, arg = "SELECT rowid FROM pages WHERE body LIKE ? ESCAPE '\\' ORDER BY rowid LIMIT ?", \
+                _like_pattern(query)
+        rows = self._db.execute(sql, (arg, limit)).fetchall()
+        ids = dict(self._db.execute("SELECT id, fingerprint FROM docs").fetchall())
+        wanted = None if fingerprints is None else set(fingerprints)
+        result = {}
+        for (rowid,) in rows:
+            fingerprint = ids.get(rowid >> PAGE_BITS)
+            if fingerprint is None or (wanted is not None and fingerprint not in wanted):
+                continue
+            result.setdefault(fingerprint, []).append(rowid & PAGE_MASK)
+        return result
+
+    def stats(self):
+        docs, pages = self._db.execute("SELECT COUNT(*), COALESCE(SUM(page_count), 0) FROM docs").fetchone()
+        return {"docs": docs, "pages": pages, "files": self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]}
+
+    def close(self):
+        self._db.close()
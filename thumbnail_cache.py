@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import json
+import hashlib
+import sqlite3
+
+
+def default_cache_dir():
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "PDFTool", "thumbnails")
+
+
+def sample_hash(path, block=64 * 1024):
+    # 只读文件头尾各一块，避免对网络盘上的大文件做全文哈希
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(block))
+        f.seek(0, os.SEEK_END)
+        if f.tell() > block:
+            f.seek(max(block, f.tell() - block))
+            h.update(f.read(block))
+    return h.hexdigest()
+
+
+class ThumbnailCache:
+    # 磁盘缩略图缓存：目录下每个缩略图一个 PNG，index.db 记录大小、文档信息和最近使用时间，
+    # 超出字节预算时按 LRU 淘汰
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 * 1024, content_hash=False):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.db"))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbs ("
+            "key TEXT PRIMARY KEY, size INTEGER, page_count INTEGER, last_used REAL, info TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(thumbs)")}
+        if "info" not in columns:
+            self._db.execute("ALTER TABLE thumbs ADD COLUMN info TEXT")
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM thumbs").fetchone()[0]
+
+    def key(self, pdf_path, width, height):
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        parts = [os.path.abspath(pdf_path), str(st.st_size), str(st.st_mtime_ns), f"{width}x{height}"]
+        if self.content_hash:
+            parts.append(sample_hash(pdf_path))
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, pdf_path, width, height, touch=True):
+        # touch 为 False 时不更新最近使用时间（只读取，如保存会话）
+        key = self.key(pdf_path, width, height)
+        row = key and self._db.execute("SELECT info FROM thumbs WHERE key = ?", (key,)).fetchone()
+        if not row or not row[0]:
+            self.misses += 1
+            return None
+        try:
+            with open(self._file(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self._remove(key)
+            self._db.commit()
+            self.misses += 1
+            return None
+        if touch:
+            self._db.execute("UPDATE thumbs SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        self.hits += 1
+        return data, json.loads(row[0])
+
+    def put(self, pdf_path, width, height, data, info):
+        # info 为文档信息字典（DocumentInfo.to_dict()），命中时原样返回
+        key = self.key(pdf_path, width, height)
+        if key is None or len(data) > self.max_bytes:
+            return
+        tmp = self._file(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(key))
+        self._remove(key)
+        self._db.execute(
+            "INSERT INTO thumbs (key, size, page_count, last_used, info) VALUES (?, ?, ?, ?, ?)",
+            (key, len(data), info.get("page_count", 0), time.time(), json.dumps(info)),
+        )
+        self.total_bytes += len(data)
+        self._evict()
+        self._db.commit()
+
+    def _remove(self, key, delete_file=False):
+        row = self._db.execute("SELECT size FROM thumbs WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM thumbs WHERE key = ?", (key,))
+            self.total_bytes -= row[0]
+        if delete_file:
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key FROM thumbs ORDER BY last_used").fetchall()
+        for (key,) in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._remove(key, delete_file=True)
+            self.evictions += 1
+
+    def clear(self):
+        for (key,) in self._db.execute("SELECT key FROM thumbs").fetchall():
+            self._remove(key, delete_file=True)
+        self._db.commit()
+
+    def stats(self):
+        count = self._db.execute("SELECT COUNT(*) FROM thumbs").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self):
+        self._db.close()
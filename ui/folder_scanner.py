@@ -0,0 +1,28 @@
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+from ingest import scan, ScanStats
+
+
+class FolderScanner(QThread):
+    # 在后台线程里扫描拖入的目录和压缩包，新 PDF 分批通过信号送回界面
+    batch_found = pyqtSignal(list)
+    # 已检查文件数, 已添加, 跳过的重复
+    progress = pyqtSignal(int, int, int)
+
+    def __init__(self, paths, index, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.index = index
+        self.cancel_event = threading.Event()
+        self.stats = ScanStats()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        for batch in scan(self.paths, self.index, cancel=self.cancel_event, stats=self.stats):
+            if self.cancel_event.is_set():
+                return
+            self.batch_found.emit(batch)
+            self.progress.emit(self.stats.scanned, self.stats.added, self.stats.duplicates)
+        self.progress.emit(self.stats.scanned, self.stats.added, self.stats.duplicates)
@@ -0,0 +1,37 @@
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+from watch import HotFolder
+
+
+class FolderWatcher(QThread):
+    # 在后台线程里运行 HotFolder：轮询、日志和进程池都在本线程，完成的任务和统计通过信号送回界面
+    batch_done = pyqtSignal(object)
+    stats_changed = pyqtSignal(dict)
+    # 无法开始监视（目录无效、分组规则错误等）
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder, output_dir, options, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.output_dir = output_dir
+        self.options = options
+        self.stop_event = threading.Event()
+        self._last_stats = None
+
+    def stop(self):
+        # 只发出请求，不等待：正在执行的任务完成后线程才结束并发出 finished
+        self.stop_event.set()
+
+    def _on_poll(self, stats):
+        if stats != self._last_stats:
+            self._last_stats = stats
+            self.stats_changed.emit(stats)
+
+    def run(self):
+        try:
+            hot_folder = HotFolder(self.folder, self.output_dir, self.options)
+        except (OSError, ValueError) as e:
+            self.failed.emit(str(e))
+            return
+        hot_folder.run(self.stop_event, self.batch_done.emit, self._on_poll)
+        self.stats_changed.emit(hot_folder.stats())
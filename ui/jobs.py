@@ -0,0 +1,109 @@
+import time
+import queue
+import threading
+from contextlib import nullcontext
+from PyQt6.QtCore import QThread, pyqtSignal
+from pdf_utils import JobCancelled
+import perf
+
+
+class Job:
+    # func 需接受 progress 和 cancel 两个关键字参数
+    def __init__(self, title, func, *args, **kwargs):
+        self.title = title
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_event = threading.Event()
+        self.started_at = None
+        self.profile = False      # 为 True 时采集 cProfile 和 tracemalloc
+        self.profile_paths = []   # 采集结果文件
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class JobQueue(QThread):
+    # 在后台线程里依次执行合并/拆分任务，进度通过信号回到界面
+    job_started = pyqtSignal(object)
+    # job, 已处理页数, 总页数, 页/秒, MB/秒
+    job_progress = pyqtSignal(object, int, int, float, float)
+    job_finished = pyqtSignal(object, object)
+    job_failed = pyqtSignal(object, str)
+    job_cancelled = pyqtSignal(object)
+
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = []
+        self.current = None
+
+    def submit(self, job):
+        with self._lock:
+            self._waiting.append(job)
+        self._queue.put(job)
+        if not self.isRunning():
+            self.start()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._waiting)
+
+    def cancel_current(self):
+        job = self.current
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._waiting:
+                job.cancel()
+        self.cancel_current()
+
+    def stop(self):
+        self.cancel_all()
+        self._queue.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._waiting.remove(job)
+            if job.cancel_event.is_set():
+                self.job_cancelled.emit(job)
+                continue
+            self.current = job
+            signal, args = self._run_job(job)
+            # 先清空 current 再通知界面，界面据此判断是否还有任务
+            self.current = None
+            signal.emit(job, *args)
+
+    def _run_job(self, job):
+        job.started_at = time.perf_counter()
+        last_emit = 0.0
+        self.job_started.emit(job)
+
+        def progress(done, total, nbytes):
+            nonlocal last_emit
+            now = time.perf_counter()
+            if now - last_emit < self.PROGRESS_INTERVAL and done < total:
+                return
+            last_emit = now
+            elapsed = max(now - job.started_at, 1e-6)
+            self.job_progress.emit(job, done, total, done / elapsed, nbytes / elapsed / 2 ** 20)
+
+        capture = perf.capture(job.func.__name__) if job.profile else nullcontext([])
+        try:
+            with capture as job.profile_paths, perf.span(f"job.{job.func.__name__}", title=job.title):
+                result = job.func(*job.args, progress=progress, cancel=job.cancel_event, **job.kwargs)
+        except JobCancelled:
+            return self.job_cancelled, ()
+        except Exception as e:
+            return self.job_failed, (str(e),)
+        return self.job_finished, (result,)
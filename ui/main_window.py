@@ -1,19 +1,50 @@
 import os
+import time
+import logging
 import platform
+import threading
 import subprocess
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog,
     QHBoxLayout, QScrollArea, QLineEdit, QFrame, QMessageBox, QTabWidget,
-    QSizePolicy, QComboBox
+    QSizePolicy, QComboBox, QProgressBar, QCheckBox, QMenu, QInputDialog
 )
-from PyQt6.QtCore import Qt, QSettings
-from ui.widgets.file_card import FileCard
+from PyQt6.QtCore import Qt, QSettings, QTimer, QBuffer, QIODevice, pyqtSignal
+from PyQt6.QtGui import QShortcut, QKeySequence
 from ui.widgets.card_container import CardContainer
-from pdf_utils import merge_pdfs
-import fitz  # PyMuPDF
+from ui.thumbnail_loader import ThumbnailLoader
+from ui.thumbnail_store import ThumbnailStore
+from ui.folder_scanner import FolderScanner
+from ui.text_indexer import TextIndexer
+from ui.folder_watcher import FolderWatcher
+from ui.jobs import Job, JobQueue
+from thumbnail_cache import ThumbnailCache
+from text_index import TextIndex
+from watch import WatchOptions
+from session import Session, SessionEntry, save_session, load_session, list_sessions, session_path, SESSION_SUFFIX
+from ingest import ContentIndex, sniff, HEAD_BYTES
+from perf import span, recorder
+from pdf_utils import (
+    merge_pdfs, split_by_page, split_by_step, split_by_custom_ranges, split_by_size, split_by_bookmark,
+    remember_document_info, release_source,
+    parse_page_ranges, source_buffers, DocumentInfo, SaveOptions, ImageOptions, ExportReport, export_images, warm_up
+)
+
+logger = logging.getLogger(__name__)
+
+# 关闭窗口时自动保存的会话
+AUTOSAVE_SESSION = "上次关闭时"
+# 会话菜单中列出的最近会话数
+RECENT_SESSIONS = 15
+
+# 导出图片的分辨率选项
+EXPORT_DPIS = (96, 150, 200, 300, 600)
 
 
 class MainWindow(QWidget):
+    # 首帧绘制完成后发出一次
+    first_painted = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PDF工具")
@@ -25,6 +56,38 @@ class MainWindow(QWidget):
 
         self.mode = "merge"
         self.files = []
+        # 已添加文件的路径和内容索引，重复判断为 O(1)
+        self.file_index = ContentIndex()
+        self.scanners = []
+        cache_mb = int(self.settings.value("thumbnail_cache_mb", 256))
+        self.thumbnail_cache = ThumbnailCache(max_bytes=cache_mb * 1024 * 1024)
+        self.thumbnail_loader = ThumbnailLoader(cache=self.thumbnail_cache, parent=self)
+        self.thumbnail_loader.set_device_pixel_ratio(self.devicePixelRatioF())
+        self.thumbnail_loader.loaded.connect(self.on_thumbnail_loaded)
+        # 内存中的缩略图总量上限，超出时淘汰视野外的卡片
+        memory_mb = int(self.settings.value("thumbnail_memory_mb", 64))
+        self.thumbnail_store = ThumbnailStore(max_bytes=memory_mb * 1024 * 1024)
+        # 页面条、拆分/导出面板和调试面板在第一次用到时才创建
+        self.page_renderer = None
+        self.page_strip = None
+        self.mode_panels = {}
+        self.debug_panel = None
+        # 全文索引：后台线程写入，界面线程只读查询，都在第一次用到时创建
+        self.text_indexer = None
+        self.text_index = None
+        self.file_fingerprints = {}  # 路径 -> 已建好索引的文档指纹
+        self._painted = False
+        self.first_painted.connect(self.start_warm_up)
+        self.job_queue = JobQueue(self)
+        self.job_queue.job_started.connect(self.on_job_started)
+        self.job_queue.job_progress.connect(self.on_job_progress)
+        self.job_queue.job_finished.connect(self.on_job_finished)
+        self.job_queue.job_failed.connect(self.on_job_failed)
+        self.job_queue.job_cancelled.connect(self.on_job_cancelled)
+
+        # 隐藏的性能面板
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.toggle_debug_panel)
+        QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_session_dialog)
 
         main_layout = QHBoxLayout()
         self.setLayout(main_layout)
@@ -35,10 +98,12 @@ class MainWindow(QWidget):
         left_layout = QVBoxLayout()
         left_layout.setSpacing(20)
         left_widget.setLayout(left_layout)
+        self.left_layout = left_layout
 
         self.tab_widget = QTabWidget()
         self.tab_widget.addTab(QWidget(), "合并 PDF")
         self.tab_widget.addTab(QWidget(), "拆分 PDF")
+        self.tab_widget.addTab(QWidget(), "导出图片")
         self.tab_widget.setStyleSheet("""
              QTabWidget::pane {
                 border: none;
@@ -103,16 +168,72 @@ class MainWindow(QWidget):
         self.add_file_btn.clicked.connect(self.select_files)
         self.add_file_btn.hide()  # 默认隐藏
 
+        # 会话：保存/恢复文件列表，连同文档信息和缩略图
+        self.session_btn = QPushButton("会话")
+        self.session_btn.setFixedSize(80, 40)
+        self.session_btn.setStyleSheet("""
+            QPushButton {
+                background:white; color:#e53935; font-size:16px; font-weight:bold;
+                border:1px solid #e53935; border-radius:8px;
+            }
+            QPushButton:hover {
+                background:#fdecea;
+            }
+            QPushButton::menu-indicator {
+                width:0;
+            }
+        """)
+        session_menu = QMenu(self.session_btn)
+        session_menu.aboutToShow.connect(lambda: self._fill_session_menu(session_menu))
+        self.session_btn.setMenu(session_menu)
+
         upload_layout.addWidget(self.upload_btn, alignment=Qt.AlignmentFlag.AlignCenter)
         upload_layout.addWidget(self.add_file_btn, alignment=Qt.AlignmentFlag.AlignLeft)
+        upload_layout.addWidget(self.session_btn, alignment=Qt.AlignmentFlag.AlignRight)
         upload_container.setLayout(upload_layout)
         left_layout.addWidget(upload_container)
 
-        self.card_container = CardContainer()
+        # 拖入目录或压缩包时的扫描进度
+        self.scan_label = QLabel()
+        self.scan_label.setStyleSheet("font-size:13px; color:#555;")
+        self.scan_label.hide()
+        left_layout.addWidget(self.scan_label)
+
+        # 全文搜索：在已添加文件的文本中查找，命中的卡片和页面高亮
+        search_box = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索已添加文件中的文字")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                padding: 6px;
+                font-size: 14px;
+                color: #333;
+                background: #fff;
+            }
+        """)
+        self.search_label = QLabel()
+        self.search_label.setStyleSheet("font-size:13px; color:#555;")
+        search_box.addWidget(self.search_input, 1)
+        search_box.addWidget(self.search_label)
+        left_layout.addLayout(search_box)
+        # 输入停顿后再查询
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
+        self.card_container = CardContainer(self.thumbnail_store)
+        self.card_container.visible_changed.connect(self.on_visible_cards_changed)
+        self.card_container.remove_requested.connect(self.remove_file)
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         scroll_area.setFrameShape(QFrame.Shape.NoFrame)
         scroll_area.setWidget(self.card_container)
+        self.scroll_area = scroll_area
         left_layout.addWidget(scroll_area, stretch=1)
 
         main_layout.addWidget(left_widget)
@@ -204,26 +325,100 @@ class MainWindow(QWidget):
         right_layout.addWidget(self.filename_label)
         right_layout.addWidget(self.filename_input)
 
-        # 拆分模式（默认隐藏）
-        self.split_mode_label = QLabel("拆分模式")
-        self.split_mode_label.setStyleSheet("font-size:14px; color:#333;")
-        self.split_mode_combo = QComboBox()
-        self.split_mode_combo.addItems(["每页拆分", "按步长拆分", "自定义范围"])
-        self.split_mode_combo.currentIndexChanged.connect(self.on_split_mode_changed)
-        self.step_input = QLineEdit()
-        self.step_input.setPlaceholderText("步长，如 2")
-        self.range_input = QLineEdit()
-        self.range_input.setPlaceholderText("范围，如 1-2,4-6")
-        self.split_mode_label.hide()
-        self.split_mode_combo.hide()
-        self.step_input.hide()
-        self.range_input.hide()
-        right_layout.addWidget(self.split_mode_label)
-        right_layout.addWidget(self.split_mode_combo)
-        right_layout.addWidget(self.step_input)
-        right_layout.addWidget(self.range_input)
+        # 增量合并：列表前面部分不变时复用上次的输出，只追加变化的文件
+        self.incremental_check = QCheckBox("增量合并")
+        self.incremental_check.setToolTip("在输出目录保存合并清单，再次合并时只处理变化的文件")
+        self.incremental_check.setStyleSheet("font-size:14px; color:#333;")
+        self.incremental_check.setChecked(self.settings.value("incremental_merge", False, type=bool))
+        self.incremental_check.toggled.connect(lambda checked: self.settings.setValue("incremental_merge", checked))
+        right_layout.addWidget(self.incremental_check)
+
+        # 拆分、导出模式的设置面板，切换到对应标签页时才创建
+        self.mode_panel_layout = QVBoxLayout()
+        self.mode_panel_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.addLayout(self.mode_panel_layout)
+
+        # 输出压缩（合并和拆分都适用）
+        self.compact_check = QCheckBox("压缩输出")
+        self.compact_check.setStyleSheet("font-size:14px; color:#333; margin-top:10px;")
+        self.compact_check.setChecked(self.settings.value("compact_output", False, type=bool))
+        self.image_dpi_combo = QComboBox()
+        self.image_dpi_combo.addItems(["保留原图", "图片 300 DPI", "图片 150 DPI", "图片 96 DPI"])
+        self.image_dpi_combo.setCurrentIndex(int(self.settings.value("compact_image_dpi_index", 0)))
+        self.image_dpi_combo.setEnabled(self.compact_check.isChecked())
+        self.compact_check.toggled.connect(self.on_compact_toggled)
+        self.image_dpi_combo.currentIndexChanged.connect(
+            lambda index: self.settings.setValue("compact_image_dpi_index", index))
+        right_layout.addWidget(self.compact_check)
+        right_layout.addWidget(self.image_dpi_combo)
+
+        # 监视文件夹：新到达的 PDF 按分组规则或到达时间成组，自动合并到保存目录
+        self.watch_check = QCheckBox("监视文件夹并自动合并")
+        self.watch_check.setStyleSheet("font-size:14px; color:#333; margin-top:10px;")
+        self.watch_check.toggled.connect(self.on_watch_toggled)
+        self.watch_pattern_input = QLineEdit(self.settings.value("watch_pattern", ""))
+        self.watch_pattern_input.setPlaceholderText("分组规则（正则），留空按到达时间成组")
+        self.watch_pattern_input.setStyleSheet("""
+            QLineEdit {
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                padding: 6px;
+                font-size: 13px;
+                color: #333;
+                background: #fff;
+            }
+        """)
+        self.watch_label = QLabel()
+        self.watch_label.setStyleSheet("font-size:13px; color:#555;")
+        self.watch_label.setWordWrap(True)
+        self.watch_label.hide()
+        right_layout.addWidget(self.watch_check)
+        right_layout.addWidget(self.watch_pattern_input)
+        right_layout.addWidget(self.watch_label)
+        self.folder_watcher = None
+        self.watch_stats = {}
+        self.current_session = None
+        self._close_after_watch = False
 
         right_layout.addStretch()
+
+        # 任务进度（有任务时显示）
+        self.job_label = QLabel()
+        self.job_label.setStyleSheet("font-size:13px; color:#333;")
+        self.job_label.setWordWrap(True)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setStyleSheet("""
+            QProgressBar {
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                height: 16px;
+                text-align: center;
+            }
+            QProgressBar::chunk {
+                background: #e53935;
+                border-radius: 6px;
+            }
+        """)
+        self.cancel_job_btn = QPushButton("取消任务")
+        self.cancel_job_btn.setStyleSheet("""
+            QPushButton {
+                color: #1a73e8;
+                background: transparent;
+                border: none;
+                font-size: 14px;
+                font-weight: bold;
+            }
+        """)
+        self.cancel_job_btn.clicked.connect(self.job_queue.cancel_current)
+        job_box = QHBoxLayout()
+        job_box.addWidget(self.progress_bar, 1)
+        job_box.addWidget(self.cancel_job_btn)
+        right_layout.addWidget(self.job_label)
+        right_layout.addLayout(job_box)
+        self.job_label.hide()
+        self.progress_bar.hide()
+        self.cancel_job_btn.hide()
+
         self.action_btn = QPushButton("合并 PDF")
         self.action_btn.setStyleSheet("background:#e53935; color:white; font-size:18px; margin-top:20px;padding:15px; border-radius:10px;")
         self.action_btn.clicked.connect(self.process)
@@ -247,74 +442,554 @@ class MainWindow(QWidget):
             event.acceptProposedAction()
 
     def dropEvent(self, event):
-        files = [u.toLocalFile() for u in event.mimeData().urls() if u.toLocalFile().lower().endswith(".pdf")]
-        if files:
-            if self.mode == "split":
-                files = [files[0]]
-            self.add_files(files)
+        paths = [u.toLocalFile() for u in event.mimeData().urls() if u.isLocalFile()]
+        if not paths:
+            return
+        if self.mode == "merge":
+            # 目录、压缩包和单个文件统一交给后台扫描，按文件头识别 PDF
+            self.scan_paths(paths)
+            return
+        for path in paths:
+            if os.path.isfile(path) and _is_pdf_file(path):
+                self.add_files([path])
+                break
+
+    def scan_paths(self, paths):
+        scanner = FolderScanner(paths, self.file_index, self)
+        scanner.batch_found.connect(self.on_scan_batch)
+        scanner.progress.connect(self.on_scan_progress)
+        scanner.finished.connect(lambda: self.on_scan_finished(scanner))
+        self.scanners.append(scanner)
+        self.scan_label.setText("正在扫描…")
+        self.scan_label.show()
+        scanner.start()
+
+    def on_scan_batch(self, batch):
+        if self.sender().cancel_event.is_set():
+            return
+        self._append_files(batch)
+
+    def on_scan_progress(self, scanned, added, duplicates):
+        if self.sender().cancel_event.is_set():
+            return
+        running = any(s.isRunning() for s in self.scanners)
+        state = "正在扫描" if running else "扫描完成"
+        self.scan_label.setText(f"{state}：已检查 {scanned} 个文件，添加 {added} 个 PDF，跳过重复 {duplicates} 个")
+
+    def on_scan_finished(self, scanner):
+        self.scanners.remove(scanner)
+        scanner.deleteLater()
+        if not scanner.cancel_event.is_set():
+            stats = scanner.stats
+            self.scan_label.setText(f"扫描完成：已检查 {stats.scanned} 个文件，添加 {stats.added} 个 PDF，"
+                                    f"跳过重复 {stats.duplicates} 个")
+
+    # --- 会话 ---
+    def _fill_session_menu(self, menu):
+        menu.clear()
+        save_action = menu.addAction("保存会话…", self.save_session_dialog)
+        save_action.setEnabled(bool(self.files))
+        menu.addAction("打开会话文件…", self.open_session_dialog)
+        sessions = list_sessions()[:RECENT_SESSIONS]
+        if sessions:
+            menu.addSeparator()
+        for name, path in sessions:
+            menu.addAction(name, lambda path=path: self.open_session(path))
+
+    def save_session_dialog(self):
+        if not self.files:
+            QMessageBox.warning(self, "提示", "请先添加 PDF 文件")
+            return
+        default = self.current_session or time.strftime("会话 %Y-%m-%d %H%M")
+        name, ok = QInputDialog.getText(self, "保存会话", "会话名称", text=default)
+        name = name.strip()
+        if not ok or not name:
+            return
+        path = session_path(name)
+        if os.path.exists(path) and name != self.current_session:
+            answer = QMessageBox.question(self, "保存会话", f"会话“{name}”已存在，是否覆盖？")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        try:
+            self.save_session(name)
+        except OSError as e:
+            QMessageBox.warning(self, "保存会话失败", str(e))
+
+    def open_session_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "打开会话", "", f"PDF 工具会话 (*{SESSION_SUFFIX})")
+        if path:
+            self.open_session(path)
+
+    def _session_data(self, item):
+        # 返回 (文档信息, 缩略图 PNG)。缩略图依次取：恢复会话时载入的 PNG、磁盘缓存、内存中的缩略图（重新编码）；
+        # 还没滚动到的卡片只要磁盘缓存里有，文档信息也一并取出
+        info = item.info if item.loaded else None
+        if info is not None and (info.encrypted or info.error or not info.page_count):
+            return info, None
+        data = self.thumbnail_store.encoded(item.pdf_path)
+        if data is not None:
+            return info, data
+        cached = self.thumbnail_cache.get(item.pdf_path, *self.thumbnail_loader.target_size(), touch=False)
+        if cached is not None:
+            return info or DocumentInfo.from_dict(cached[1]), cached[0]
+        pixmap = self.thumbnail_store.get(item.pdf_path)
+        if info is None or pixmap is None:
+            return info, None
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        pixmap.save(buffer, "PNG")
+        return info, bytes(buffer.data())
+
+    def save_session(self, name):
+        # 按卡片顺序保存路径、大小和修改时间、文档信息、全文索引指纹和缩略图
+        entries = []
+        for path in self.card_container.paths():
+            item = self.card_container.item(path)
+            info, thumbnail = self._session_data(item)
+            if info is not None:
+                size, mtime_ns = info.file_size, info.mtime_ns
+            else:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+            entries.append(SessionEntry(path, size, mtime_ns, info, self.file_fingerprints.get(path), thumbnail))
+        extra = {
+            "filename": self.filename_input.text(),
+            "thumbnail_size": list(self.thumbnail_loader.target_size()),
+            "device_pixel_ratio": self.thumbnail_loader.device_pixel_ratio,
+        }
+        save_session(session_path(name), Session(name, entries, extra=extra))
+        self.current_session = name
+
+    def open_session(self, path):
+        start = time.perf_counter()
+        try:
+            session = load_session(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "无法打开会话", str(e))
+            return
+        if self.mode != "merge":
+            self.tab_widget.setCurrentIndex(0)
+        self.clear_files()
+        # 缩略图尺寸（如屏幕缩放）变了就不用保存的缩略图，可见时重新渲染
+        same_size = session.extra.get("thumbnail_size") == list(self.thumbnail_loader.target_size())
+        # 保存时列表已去重：未变化的文件只登记路径和大小，不计算哈希；
+        # 变化的文件随后照常按内容去重，大小相同时才与已登记的文件比较哈希
+        trusted = [not e.missing and not e.changed and self.file_index.register(e.path, e.file_size)
+                   for e in session.entries]
+        entries = []
+        for entry, registered in zip(session.entries, trusted):
+            if not registered and (entry.missing or not entry.changed or not self.file_index.add(entry.path)):
+                continue
+            if not same_size:
+                entry.thumbnail = None
+            if entry.info is not None:
+                remember_document_info(entry.info)
+            if entry.fingerprint:
+                self.file_fingerprints[entry.path] = entry.fingerprint
+            entries.append(entry)
+        paths = [entry.path for entry in entries]
+        self.files.extend(paths)
+        self.card_container.restore_cards(entries, session.extra.get("device_pixel_ratio", 1.0))
+        if session.extra.get("filename"):
+            self.filename_input.setText(session.extra["filename"])
+        self.upload_btn.setVisible(len(self.files) == 0)
+        self.add_file_btn.setVisible(len(self.files) > 0)
+        # 只有变化的文件需要重新读取（后台进行，可见的优先）；全文索引对未变化的文件只做一次 stat
+        for entry in entries:
+            if entry.changed:
+                self.thumbnail_loader.request(entry.path)
+        if paths:
+            self._text_indexer().enqueue(paths)
+        self.current_session = session.name or None
+        elapsed = time.perf_counter() - start
+        recorder.add("session.restore", elapsed, files=len(paths))
+        changed = sum(1 for entry in entries if entry.changed)
+        missing = sum(1 for entry in session.entries if entry.missing)
+        message = f"已恢复会话“{session.name}”：{len(paths)} 个文件，耗时 {elapsed * 1000:.0f} ms"
+        if changed:
+            message += f"，{changed} 个已变化正在重新读取"
+        if missing:
+            message += f"，{missing} 个已不存在"
+        self.scan_label.setText(message)
+        self.scan_label.show()
+
+    def cancel_scans(self):
+        for scanner in self.scanners:
+            scanner.cancel()
+        self.scan_label.hide()
+
+    def _new_panel(self):
+        panel = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(20)
+        panel.setLayout(layout)
+        return panel, layout
+
+    def _build_split_panel(self):
+        panel, layout = self._new_panel()
+        split_mode_label = QLabel("拆分模式")
+        split_mode_label.setStyleSheet("font-size:14px; color:#333;")
+        self.split_mode_combo = QComboBox()
+        self.split_mode_combo.addItems(["每页拆分", "按步长拆分", "自定义范围", "按大小拆分", "按书签拆分"])
+        self.split_mode_combo.currentIndexChanged.connect(self.on_split_mode_changed)
+        self.step_input = QLineEdit()
+        self.step_input.setPlaceholderText("步长，如 2")
+        self.range_input = QLineEdit()
+        self.range_input.setPlaceholderText("范围，如 1-2,4-6，也可在页面条中点选")
+        self.range_input.editingFinished.connect(self.on_range_edited)
+        self.size_input = QLineEdit(self.settings.value("split_size_mb", "10"))
+        self.size_input.setPlaceholderText("单个文件上限（MB），如 10")
+        self.step_input.hide()
+        self.range_input.hide()
+        self.size_input.hide()
+        for widget in (split_mode_label, self.split_mode_combo, self.step_input, self.range_input, self.size_input):
+            layout.addWidget(widget)
+        return panel
+
+    def _build_export_panel(self):
+        panel, layout = self._new_panel()
+        export_label = QLabel("导出设置")
+        export_label.setStyleSheet("font-size:14px; color:#333;")
+        self.export_range_input = QLineEdit()
+        self.export_range_input.setPlaceholderText("页码范围，如 1-2,4-6，留空导出全部")
+        self.export_range_input.editingFinished.connect(self.on_range_edited)
+        self.export_dpi_combo = QComboBox()
+        self.export_dpi_combo.addItems([f"{dpi} DPI" for dpi in EXPORT_DPIS])
+        self.export_dpi_combo.setCurrentIndex(int(self.settings.value("export_dpi_index", 1)))
+        self.export_dpi_combo.currentIndexChanged.connect(lambda i: self.settings.setValue("export_dpi_index", i))
+        self.export_color_combo = QComboBox()
+        self.export_color_combo.addItems(["彩色 (RGB)", "灰度", "CMYK（仅 JPEG）"])
+        self.export_color_combo.setCurrentIndex(int(self.settings.value("export_color_index", 0)))
+        self.export_color_combo.currentIndexChanged.connect(lambda i: self.settings.setValue("export_color_index", i))
+        self.export_format_combo = QComboBox()
+        self.export_format_combo.addItems(["PNG", "JPEG"])
+        self.export_format_combo.setCurrentIndex(int(self.settings.value("export_format_index", 0)))
+        self.export_format_combo.currentIndexChanged.connect(
+            lambda i: self.settings.setValue("export_format_index", i))
+        for widget in (export_label, self.export_range_input, self.export_dpi_combo, self.export_color_combo,
+                       self.export_format_combo):
+            layout.addWidget(widget)
+        return panel
+
+    def _mode_panel(self, mode):
+        panel = self.mode_panels.get(mode)
+        if panel is None:
+            build = {"split": self._build_split_panel, "export": self._build_export_panel}[mode]
+            panel = self.mode_panels[mode] = build()
+            self.mode_panel_layout.addWidget(panel)
+        return panel
+
+    def _ensure_page_strip(self):
+        # 拆分和导出模式下的页面条，点选页面生成页码范围
+        if self.page_strip is None:
+            from ui.page_renderer import PageRenderer
+            from ui.widgets.page_strip import PageStrip
+            self.page_renderer = PageRenderer(parent=self)
+            self.page_renderer.set_device_pixel_ratio(self.devicePixelRatioF())
+            self.page_strip = PageStrip(self.page_renderer)
+            self.page_strip.ranges_selected.connect(self.on_pages_selected)
+            self.left_layout.addWidget(self.page_strip)
+        return self.page_strip
 
     def on_tab_changed(self, index):
-        self.mode = "merge" if index == 0 else "split"
-        self.action_btn.setText("合并 PDF" if self.mode == "merge" else "拆分 PDF")
+        self.mode = ("merge", "split", "export")[index]
+        self.action_btn.setText(("合并 PDF", "拆分 PDF", "导出图片")[index])
         self.clear_files()
-        if self.mode == "merge":
-            self.add_file_btn.show()
-            self.filename_label.show()
-            self.filename_input.show()
-            self.split_mode_label.hide()
-            self.split_mode_combo.hide()
-            self.step_input.hide()
-            self.range_input.hide()
-        else:
-            self.add_file_btn.hide()
-            self.filename_label.hide()
-            self.filename_input.hide()
-            self.split_mode_label.show()
-            self.split_mode_combo.show()
+        merge = self.mode == "merge"
+        for widget in (self.add_file_btn, self.filename_label, self.filename_input, self.incremental_check):
+            widget.setVisible(merge)
+        panel = None if merge else self._mode_panel(self.mode)
+        for other in self.mode_panels.values():
+            other.setVisible(other is panel)
+        # 压缩选项只对 PDF 输出有意义
+        self.compact_check.setVisible(self.mode != "export")
+        self.image_dpi_combo.setVisible(self.mode != "export")
+
+    def on_watch_toggled(self, checked):
+        if not checked:
+            self.stop_watching()
+            return
+        folder = QFileDialog.getExistingDirectory(self, "选择要监视的文件夹", self.settings.value("watch_folder", ""))
+        if not folder:
+            self.watch_check.setChecked(False)
+            return
+        pattern = self.watch_pattern_input.text().strip() or None
+        try:
+            options = WatchOptions(pattern=pattern, window=float(self.settings.value("watch_window", 30)),
+                                   save=self.save_options())
+        except ValueError as e:
+            QMessageBox.warning(self, "提示", str(e))
+            self.watch_check.setChecked(False)
+            return
+        self.settings.setValue("watch_folder", folder)
+        self.settings.setValue("watch_pattern", pattern or "")
+        self.folder_watcher = FolderWatcher(folder, self.save_dir, options, parent=self)
+        self.folder_watcher.batch_done.connect(self.on_watch_batch)
+        self.folder_watcher.stats_changed.connect(self.on_watch_stats)
+        self.folder_watcher.failed.connect(self.on_watch_failed)
+        self.folder_watcher.finished.connect(self.on_watcher_finished)
+        self.folder_watcher.start()
+        self.watch_pattern_input.setEnabled(False)
+        self.watch_label.setText(f"监视中：{folder}")
+        self.watch_label.show()
+
+    def stop_watching(self):
+        # 不在界面线程里等：进行中的合并在后台做完，线程结束后由 on_watcher_finished 收尾。
+        # 未处理的文件记在日志里，下次监视时继续
+        if self.folder_watcher is None:
+            return
+        self.folder_watcher.stop()
+        self.watch_check.setEnabled(False)
+        self.watch_label.setText("正在停止监视，等待进行中的任务完成…")
+
+    def on_watcher_finished(self):
+        watcher, self.folder_watcher = self.folder_watcher, None
+        if watcher is not None:
+            watcher.deleteLater()
+        self.watch_check.blockSignals(True)
+        self.watch_check.setChecked(False)
+        self.watch_check.blockSignals(False)
+        self.watch_check.setEnabled(True)
+        self.watch_pattern_input.setEnabled(True)
+        self.watch_label.hide()
+        if self._close_after_watch:
+            self.close()
+
+    def on_watch_batch(self, batch):
+        if batch.error:
+            logger.warning("自动合并失败（%s）：%s", batch.key or "默认组", batch.error)
+        for path, reason in batch.skipped.items():
+            logger.warning("跳过无法打开的文件 %s：%s", path, reason)
+
+    def on_watch_stats(self, stats):
+        self.watch_stats = stats
+        if self.folder_watcher is None or self.folder_watcher.stop_event.is_set():
+            return
+        latency = f"，延迟中位数 {stats['latency_p50_s']} 秒" if stats["latency_p50_s"] is not None else ""
+        self.watch_label.setText(
+            f"监视中：{self.folder_watcher.folder}\n排队 {stats['queue_depth']} 个，写入中 {stats['writing']} 个，"
+            f"已合并 {stats['processed']} 个（{stats['outputs']} 个输出），失败 {stats['failed']} 个{latency}"
+        )
+
+    def on_watch_failed(self, message):
+        QMessageBox.warning(self, "无法监视文件夹", message)
+        self.watch_check.setChecked(False)
+
+    def on_compact_toggled(self, checked):
+        self.image_dpi_combo.setEnabled(checked)
+        self.settings.setValue("compact_output", checked)
+
+    def save_options(self):
+        if not self.compact_check.isChecked():
+            return None
+        image_dpi = (None, 300, 150, 96)[self.image_dpi_combo.currentIndex()]
+        return SaveOptions.compact(image_dpi=image_dpi)
+
+    def image_options(self):
+        colorspace = ("rgb", "gray", "cmyk")[self.export_color_combo.currentIndex()]
+        fmt = ("png", "jpg")[self.export_format_combo.currentIndex()]
+        return ImageOptions(dpi=EXPORT_DPIS[self.export_dpi_combo.currentIndex()], colorspace=colorspace, format=fmt)
 
     def on_split_mode_changed(self, index):
         self.step_input.setVisible(index == 1)
         self.range_input.setVisible(index == 2)
+        self.size_input.setVisible(index == 3)
 
     def select_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "选择 PDF 文件", "", "PDF Files (*.pdf)")
         if files:
-            if self.mode == "split":
+            if self.mode != "merge":
                 files = [files[0]]
             self.add_files(files)
 
     def add_files(self, file_list):
-        if self.mode == "split":
+        if self.mode != "merge":
             self.clear_files()
-        for f in file_list:
-            if f not in self.files:
-                self.files.append(f)
-                self.card_container.add_card(FileCard(f, self.remove_file))
+        self._append_files([f for f in file_list if self.file_index.add(f)])
+
+    def _append_files(self, new_files):
+        # new_files 已经过 file_index 去重
+        self.files.extend(new_files)
+        self.card_container.add_cards(new_files)
+        if new_files:
+            self._text_indexer().enqueue(new_files)
         self.upload_btn.setVisible(len(self.files) == 0)
         if self.mode == "merge":
             self.add_file_btn.setVisible(len(self.files) > 0)
 
-    def remove_file(self, card):
-        if card in self.card_container.cards:
-            self.card_container.cards.remove(card)
-        if card.pdf_path in self.files:
-            self.files.remove(card.pdf_path)
-        self.card_container.grid_layout.removeWidget(card)
-        card.setParent(None)
-        card.deleteLater()
+    def on_visible_cards_changed(self, paths):
+        # 缩略图只在卡片进入视野时才请求
+        self.thumbnail_loader.set_visible(paths)
+        for path in paths:
+            item = self.card_container.item(path)
+            if item is not None and (not item.loaded or self.thumbnail_store.needs_reload(path)):
+                self.thumbnail_loader.request(path)
+
+    def on_thumbnail_loaded(self, pdf_path, image, info):
+        # 工作进程已读出文档信息，登记到进程内缓存，合并/拆分时不再重复解析
+        if info is not None:
+            remember_document_info(info)
+        self.card_container.set_item_data(pdf_path, image, info)
+        if self.mode != "merge" and self.files and self.files[0] == pdf_path:
+            if info is not None and not info.encrypted and not info.error and info.page_count:
+                page_strip = self._ensure_page_strip()
+                page_strip.set_document(pdf_path, info.page_count)
+                item = self.card_container.item(pdf_path)
+                page_strip.highlight_pages((item.matches if item is not None else None) or [])
+                page_strip.show()
+
+    def on_pages_selected(self, spec):
+        if self.mode == "split":
+            self.split_mode_combo.setCurrentIndex(2)
+        self._range_input().setText(spec)
+
+    def _range_input(self):
+        return self.export_range_input if self.mode == "export" else self.range_input
+
+    def on_range_edited(self):
+        if self.page_strip is None:
+            return
+        total = self.page_strip.page_model.page_count
+        if not total:
+            return
+        try:
+            ranges = parse_page_ranges(self._range_input().text(), total)
+        except ValueError:
+            return
+        self.page_strip.select_ranges(ranges)
+
+    def remove_file(self, pdf_path):
+        self.thumbnail_loader.cancel(pdf_path)
+        self.file_fingerprints.pop(pdf_path, None)
+        if self.search_input.text().strip():
+            self.search_timer.start()
+        if pdf_path in self.file_index:
+            self.file_index.discard(pdf_path)
+            self.files.remove(pdf_path)
+        self.card_container.remove_card(pdf_path)
+        if self.page_strip is not None and self.page_strip.page_model.pdf_path == pdf_path:
+            self.page_strip.clear()
+            self.page_strip.hide()
+        release_source(pdf_path)
         self.upload_btn.setVisible(len(self.files) == 0)
         if self.mode == "merge":
             self.add_file_btn.setVisible(len(self.files) > 0)
-        self.card_container.relayout()
-        self.card_container.update()
 
     def clear_files(self):
+        self.cancel_scans()
+        self.thumbnail_loader.cancel_all()
+        self.file_fingerprints.clear()
+        if self.text_indexer is not None:
+            self.text_indexer.discard_pending()
+        if self.search_input.text().strip():
+            self.search_timer.start()
         self.card_container.clear_cards()
         self.files.clear()
+        # 换新索引而不是清空：已取消的扫描线程可能还在往旧索引里登记
+        self.file_index = ContentIndex()
+        if self.page_strip is not None:
+            self.page_strip.clear()
+            self.page_strip.hide()
+        release_source()
         self.upload_btn.setVisible(True)
         self.add_file_btn.hide()
-        self.card_container.relayout()
-        self.card_container.update()
+
+    def _text_indexer(self):
+        if self.text_indexer is None:
+            self.text_indexer = TextIndexer(parent=self)
+            self.text_indexer.indexed.connect(self.on_text_indexed)
+        return self.text_indexer
+
+    def on_text_indexed(self, pdf_path, fingerprint):
+        if pdf_path not in self.file_index:
+            return
+        self.file_fingerprints[pdf_path] = fingerprint
+        if self.search_input.text().strip():
+            # 新建好索引的文件也参与当前搜索
+            self.search_timer.start()
+
+    def run_search(self):
+        query = self.search_input.text().strip()
+        matches = None
+        if query:
+            if self.text_index is None:
+                self.text_index = TextIndex()
+            paths = {fp: path for path, fp in self.file_fingerprints.items()}
+            with span("search.query"):
+                found = self.text_index.search(query, paths)
+            matches = {paths[fp]: pages for fp, pages in found.items()}
+        self.card_container.set_matches(matches)
+        if self.page_strip is not None:
+            pages = (matches or {}).get(self.page_strip.page_model.pdf_path, [])
+            self.page_strip.highlight_pages(pages)
+        if matches is None:
+            self.search_label.clear()
+            return
+        pending = len(self.files) - len(self.file_fingerprints)
+        text = f"{len(matches)} 个文件，{sum(len(p) for p in matches.values())} 页"
+        if pending > 0:
+            text += f"（{pending} 个文件索引中）"
+        self.search_label.setText(text)
+        first = self.card_container.first_match_index()
+        if first is not None:
+            rect = self.card_container.cell_rect(first)
+            self.scroll_area.ensureVisible(rect.center().x(), rect.center().y(), 0, rect.height() // 2)
+
+    def toggle_debug_panel(self):
+        if self.debug_panel is None:
+            from ui.widgets.debug_panel import DebugPanel
+            self.debug_panel = DebugPanel({
+                "缩略图缓存": self.thumbnail_cache.stats,
+                "缩略图内存": self.thumbnail_store.stats,
+                "输入映射": source_buffers.stats,
+                "任务队列": lambda: {"pending": self.job_queue.pending_count()},
+                "文件夹监视": lambda: self.watch_stats,
+                "全文索引": lambda: self.text_index.stats() if self.text_index is not None else {},
+            }, parent=self)
+        self.debug_panel.setVisible(not self.debug_panel.isVisible())
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            # 等本轮事件处理完、首帧送到屏幕后再通知
+            QTimer.singleShot(0, self.first_painted.emit)
+
+    def start_warm_up(self):
+        # 首帧之后在后台导入 PyMuPDF，不占用启动时间
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    def closeEvent(self, event):
+        if self.folder_watcher is not None:
+            # 先隐藏窗口，等监视线程做完进行中的任务再真正关闭，期间不阻塞事件循环
+            self._close_after_watch = True
+            self.stop_watching()
+            self.hide()
+            event.ignore()
+            return
+        self.cancel_scans()
+        for scanner in list(self.scanners):
+            scanner.wait()
+        self.job_queue.stop()
+        self.thumbnail_loader.shutdown()
+        if self.page_renderer is not None:
+            self.page_renderer.shutdown()
+        if self.files and self.mode == "merge":
+            # 下次可从会话菜单恢复
+            try:
+                self.save_session(AUTOSAVE_SESSION)
+            except OSError:
+                logger.exception("自动保存会话失败")
+        self.thumbnail_cache.close()
+        if self.text_indexer is not None:
+            self.text_indexer.stop()
+        if self.text_index is not None:
+            self.text_index.close()
+        super().closeEvent(event)
 
     def choose_save_dir(self):
         dir_path = QFileDialog.getExistingDirectory(self, "选择保存目录", self.save_dir)
@@ -330,57 +1005,109 @@ class MainWindow(QWidget):
         output_dir = self.path_input.text()
         os.makedirs(output_dir, exist_ok=True)
 
+        # 任务拿到的是文件列表的快照，提交后可以继续添加文件
+        options = self.save_options()
         if self.mode == "merge":
             filename = self.filename_input.text().strip() or "merged.pdf"
             if not filename.lower().endswith(".pdf"):
                 filename += ".pdf"
             out_file = os.path.join(output_dir, filename)
-            merge_pdfs(self.files, out_file)
-            QMessageBox.information(self, "完成", f"文件已合并为 {filename}")
+            # 按卡片的当前顺序合并
+            job = Job(f"合并 {filename}", merge_pdfs, self.card_container.paths(), out_file, options=options,
+                      incremental=self.incremental_check.isChecked())
+            job.done_message = f"文件已合并为 {filename}"
+        elif self.mode == "export":
+            pdf_path = self.files[0]
+            try:
+                image_options = self.image_options()
+            except ValueError as e:
+                QMessageBox.warning(self, "提示", str(e))
+                return
+            ranges = self.export_range_input.text().strip() or None
+            job = Job(f"导出 {os.path.basename(pdf_path)}", export_images, pdf_path, output_dir, ranges,
+                      image_options)
+            job.done_message = f"图片已导出至：{output_dir}"
         else:
             pdf_path = self.files[0]
             mode = self.split_mode_combo.currentIndex()
+            title = f"拆分 {os.path.basename(pdf_path)}"
             if mode == 0:
-                self.split_by_page(pdf_path, output_dir)
+                job = Job(title, split_by_page, pdf_path, output_dir, options=options)
             elif mode == 1:
-                step = int(self.step_input.text().strip() or 1)
-                self.split_by_step(pdf_path, output_dir, step)
+                try:
+                    step = int(self.step_input.text().strip() or 1)
+                except ValueError:
+                    QMessageBox.warning(self, "提示", "步长必须是整数")
+                    return
+                job = Job(title, split_by_step, pdf_path, output_dir, step, options=options)
             elif mode == 2:
                 ranges = self.range_input.text().strip()
-                self.split_by_custom_ranges(pdf_path, output_dir, ranges)
-            QMessageBox.information(self, "完成", f"文件已拆分至：{output_dir}")
-
-    def split_by_page(self, pdf_path, output_dir):
-        doc = fitz.open(pdf_path)
-        for i in range(len(doc)):
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=i, to_page=i)
-            new_doc.save(os.path.join(output_dir, f"page_{i + 1}.pdf"))
-            new_doc.close()
-        doc.close()
-
-    def split_by_step(self, pdf_path, output_dir, step):
-        doc = fitz.open(pdf_path)
-        total = len(doc)
-        for start in range(0, total, step):
-            end = min(start + step - 1, total - 1)
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=start, to_page=end)
-            new_doc.save(os.path.join(output_dir, f"pages_{start + 1}-{end + 1}.pdf"))
-            new_doc.close()
-        doc.close()
-
-    def split_by_custom_ranges(self, pdf_path, output_dir, ranges):
-        doc = fitz.open(pdf_path)
-        for r in ranges.split(","):
-            if "-" in r:
-                start, end = map(int, r.split("-"))
+                job = Job(title, split_by_custom_ranges, pdf_path, output_dir, ranges, options=options)
+            elif mode == 3:
+                try:
+                    size_mb = float(self.size_input.text().strip())
+                except ValueError:
+                    QMessageBox.warning(self, "提示", "大小上限必须是数字（MB）")
+                    return
+                self.settings.setValue("split_size_mb", self.size_input.text().strip())
+                job = Job(title, split_by_size, pdf_path, output_dir, int(size_mb * 1024 * 1024), options=options)
             else:
-                start = end = int(r)
-            start -= 1
-            end -= 1
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=start, to_page=end)
-            new_doc.save(os.path.join(output_dir, f"pages_{start + 1}-{end + 1}.pdf"))
-            new_doc.close()
-        doc.close()
+                job = Job(title, split_by_bookmark, pdf_path, output_dir, options=options)
+            job.done_message = f"文件已拆分至：{output_dir}"
+        job.profile = self.debug_panel is not None and self.debug_panel.profile_check.isChecked()
+        self.job_queue.submit(job)
+        self.update_job_panel()
+
+    def update_job_panel(self, text=None):
+        busy = self.job_queue.current is not None or self.job_queue.pending_count() > 0
+        self.job_label.setVisible(busy)
+        self.progress_bar.setVisible(busy)
+        self.cancel_job_btn.setVisible(busy)
+        if not busy:
+            return
+        waiting = self.job_queue.pending_count()
+        if text is None:
+            current = self.job_queue.current
+            text = current.title if current else "等待中"
+        if waiting:
+            text += f"（队列中还有 {waiting} 个任务）"
+        self.job_label.setText(text)
+
+    def on_job_started(self, job):
+        self.progress_bar.setRange(0, 0)
+        self.update_job_panel(job.title)
+
+    def on_job_progress(self, job, done, total, pages_per_s, mb_per_s):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.update_job_panel(f"{job.title}：{done}/{total} 页，{pages_per_s:.0f} 页/秒，{mb_per_s:.1f} MB/秒")
+
+    def on_job_finished(self, job, result):
+        self.update_job_panel()
+        message = job.done_message
+        if result is not None and result.bytes_saved > 0:
+            message += f"\n压缩节省 {result.bytes_saved / 2 ** 20:.1f} MB（输出共 {result.bytes_written / 2 ** 20:.1f} MB）"
+        if result is not None and result.reused_pages:
+            message += f"\n沿用上次输出的 {result.reused_pages}/{result.pages} 页"
+        if isinstance(result, ExportReport) and result.timings:
+            stats = result.page_stats()
+            message += (f"\n共 {stats['pages']} 页，{stats['workers']} 个渲染进程，"
+                        f"每页平均 {stats['mean_ms']} ms，p95 {stats['p95_ms']} ms")
+        if job.profile_paths:
+            message += "\n性能采集已保存：" + "，".join(job.profile_paths)
+        QMessageBox.information(self, "完成", message)
+
+    def on_job_failed(self, job, message):
+        self.update_job_panel()
+        QMessageBox.warning(self, "失败", f"{job.title} 失败：{message}")
+
+    def on_job_cancelled(self, job):
+        self.update_job_panel()
+
+
+def _is_pdf_file(path):
+    try:
+        with open(path, "rb") as f:
+            return sniff(f.read(HEAD_BYTES)) == "pdf"
+    except OSError:
+        return False
@@ -0,0 +1,93 @@
+import time
+import logging
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage
+from pdf_utils import render_pages_task, process_pool
+from perf import recorder
+
+logger = logging.getLogger(__name__)
+
+
+class PageRenderer(QObject):
+    # 在后台进程池里渲染单个文档的页面缩略图，只渲染当前可见的页
+    # path, 页码（从 0 开始）, QImage
+    rendered = pyqtSignal(str, int, object)
+    # 进程池回调线程 -> GUI 线程
+    _finished = pyqtSignal(object, str, float)
+
+    BATCH = 8
+
+    def __init__(self, max_workers=2, width=90, height=120, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.width = width
+        self.height = height
+        self.device_pixel_ratio = 1.0
+        self.pdf_path = None
+        self._executor = None
+        self._pending = {}    # 页码 -> None，按请求顺序排队
+        self._in_flight = {}  # future -> 页码列表
+        self._visible = range(0)
+        self._finished.connect(self._on_finished)
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = process_pool(self.max_workers)
+        return self._executor
+
+    def set_device_pixel_ratio(self, ratio):
+        self.device_pixel_ratio = ratio or 1.0
+
+    def _target_size(self):
+        return round(self.width * self.device_pixel_ratio), round(self.height * self.device_pixel_ratio)
+
+    def set_document(self, pdf_path):
+        # 换文档时丢弃排队中的请求；已在运行的批次结果到达时按路径丢弃
+        self.pdf_path = pdf_path
+        self._pending.clear()
+        self._visible = range(0)
+
+    def set_visible(self, pages):
+        # 滚出视野的页不再渲染
+        self._visible = pages
+        for index in [i for i in self._pending if i not in pages]:
+            del self._pending[index]
+
+    def request(self, index):
+        if self.pdf_path is None or index in self._pending:
+            return
+        if any(index in pages for pages in self._in_flight.values()):
+            return
+        self._pending[index] = None
+        self._pump()
+
+    def _pump(self):
+        while self._pending and len(self._in_flight) < self.max_workers:
+            pages = sorted(self._pending)[:self.BATCH]
+            for index in pages:
+                del self._pending[index]
+            started = time.perf_counter()
+            future = self._pool().submit(render_pages_task, self.pdf_path, pages, *self._target_size())
+            self._in_flight[future] = pages
+            future.add_done_callback(lambda f, p=self.pdf_path, t=started: self._finished.emit(f, p, t))
+
+    def _on_finished(self, future, pdf_path, started):
+        self._in_flight.pop(future, None)
+        if pdf_path == self.pdf_path and not future.cancelled():
+            try:
+                results = future.result()
+                recorder.add("pages.request", time.perf_counter() - started, pages=len(results))
+            except Exception:
+                logger.exception("渲染页面失败: %s", pdf_path)
+                results = []
+            for index, (w, h, stride, samples) in results:
+                image = QImage(samples, w, h, stride, QImage.Format.Format_RGB888).copy()
+                image.setDevicePixelRatio(self.device_pixel_ratio)
+                self.rendered.emit(pdf_path, index, image)
+        self._pump()
+
+    def shutdown(self):
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,87 @@
+import queue
+import logging
+import threading
+from concurrent.futures import TimeoutError
+from PyQt6.QtCore import QThread, pyqtSignal
+from pdf_utils import extract_text_task, process_pool
+from text_index import TextIndex
+from perf import span
+
+logger = logging.getLogger(__name__)
+
+
+class TextIndexer(QThread):
+    # 后台建立全文索引：本线程独占写连接，文本提取交给单个工作进程，不和缩略图抢 CPU。
+    # 已索引且未改动的文件只需一次 stat
+    # path, 指纹：该文件的文本已可搜索
+    indexed = pyqtSignal(str, str)
+
+    def __init__(self, index_path=None, parent=None):
+        super().__init__(parent)
+        self.index_path = index_path
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self.pruned = 0
+
+    def enqueue(self, paths):
+        for path in paths:
+            self._queue.put(path)
+        if not self.isRunning():
+            self.start()
+
+    def discard_pending(self):
+        try:
+            while True:
+                if self._queue.get_nowait() is None:
+                    # 停止标记要保留
+                    self._queue.put(None)
+                    return
+        except queue.Empty:
+            pass
+
+    def stop(self):
+        # 正在提取的大文件不必等它完成
+        self._stopping.set()
+        self.discard_pending()
+        self._queue.put(None)
+        self.wait()
+
+    def _extract(self, pool, path):
+        future = pool.submit(extract_text_task, path)
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except TimeoutError:
+                if self._stopping.is_set():
+                    return None
+
+    def run(self):
+        index = TextIndex(self.index_path)
+        pool = process_pool(1)
+        try:
+            self.pruned = index.prune()
+            while True:
+                path = self._queue.get()
+                if path is None or self._stopping.is_set():
+                    return
+                fingerprint = index.resolve(path)
+                if fingerprint is None:
+                    continue
+                if not index.has(fingerprint):
+                    try:
+                        page_texts = self._extract(pool, path)
+                    except ValueError as e:
+                        # 加密等无法读取文本的文件
+                        logger.info("跳过全文索引 %s: %s", path, e)
+                        continue
+                    except Exception:
+                        logger.exception("提取文本失败: %s", path)
+                        continue
+                    if page_texts is None:
+                        return
+                    with span("text.store", pages=len(page_texts)):
+                        index.store(fingerprint, page_texts)
+                self.indexed.emit(path, fingerprint)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            index.close()
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage
+from pdf_utils import thumbnail_task, process_pool, DocumentInfo
+from perf import recorder
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailLoader(QObject):
+    # path, QImage（失败时为 None）, DocumentInfo（失败时为 None）
+    loaded = pyqtSignal(str, object, object)
+    # 进程池回调线程 -> GUI 线程
+    _finished = pyqtSignal(object, str, object, float)
+
+    def __init__(self, max_workers=None, width=120, height=150, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.width = width
+        self.height = height
+        self.device_pixel_ratio = 1.0
+        self._executor = None
+        self._pending = {}    # path -> None，按加入顺序排队
+        self._wanted = {}     # path -> 当前有效的 future
+        self._in_flight = {}  # future -> path，用于限制并发
+        self._visible = set()
+        self._finished.connect(self._on_finished)
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = process_pool(self.max_workers)
+        return self._executor
+
+    def set_device_pixel_ratio(self, ratio):
+        self.device_pixel_ratio = ratio or 1.0
+
+    def target_size(self):
+        # 按屏幕缩放换算成设备像素，渲染结果无需再缩放
+        return round(self.width * self.device_pixel_ratio), round(self.height * self.device_pixel_ratio)
+
+    def request(self, pdf_path):
+        if pdf_path in self._pending or pdf_path in self._wanted:
+            return
+        if self.cache is not None:
+            start = time.perf_counter()
+            cached = self.cache.get(pdf_path, *self.target_size())
+            if cached is not None:
+                # 缓存命中时完全跳过 MuPDF
+                data, info = cached
+                image = QImage.fromData(data, "PNG")
+                image.setDevicePixelRatio(self.device_pixel_ratio)
+                recorder.add("thumbnail.cache_hit", time.perf_counter() - start, len(data))
+                self.loaded.emit(pdf_path, image, DocumentInfo.from_dict(info))
+                return
+        self._pending[pdf_path] = None
+        self._pump()
+
+    def cancel(self, pdf_path):
+        self._pending.pop(pdf_path, None)
+        future = self._wanted.pop(pdf_path, None)
+        if future is not None:
+            # 已在运行的任务无法中断，结果到达时直接丢弃
+            future.cancel()
+
+    def cancel_all(self):
+        self._pending.clear()
+        for future in self._wanted.values():
+            future.cancel()
+        self._wanted.clear()
+
+    def set_visible(self, paths):
+        # 可见卡片优先渲染
+        self._visible = set(paths)
+
+    def _next_path(self):
+        for path in self._pending:
+            if path in self._visible:
+                return path
+        return next(iter(self._pending))
+
+    def _pump(self):
+        while self._pending and len(self._in_flight) < self.max_workers:
+            path = self._next_path()
+            del self._pending[path]
+            size = self.target_size()
+            started = time.perf_counter()
+            future = self._pool().submit(thumbnail_task, path, *size)
+            self._wanted[path] = future
+            self._in_flight[future] = path
+            future.add_done_callback(lambda f, p=path, s=size, t=started: self._finished.emit(f, p, s, t))
+
+    def _on_finished(self, future, pdf_path, size, started):
+        self._in_flight.pop(future, None)
+        if self._wanted.get(pdf_path) is future:
+            del self._wanted[pdf_path]
+            image, info = None, None
+            try:
+                info, pixels, png = future.result()
+                if pixels is not None:
+                    # 直接包装工作进程返回的像素，不复制也不再缩放
+                    w, h, stride, samples = pixels
+                    image = QImage(samples, w, h, stride, QImage.Format.Format_RGB888)
+                    image.setDevicePixelRatio(self.device_pixel_ratio)
+                if png is not None and self.cache is not None:
+                    self.cache.put(pdf_path, *size, png, info.to_dict())
+                # 从提交到拿到结果，含排队和进程间传输
+                recorder.add("thumbnail.request", time.perf_counter() - started, len(png or b""))
+            except Exception:
+                logger.exception("生成缩略图失败: %s", pdf_path)
+            self.loaded.emit(pdf_path, image, info)
+        self._pump()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
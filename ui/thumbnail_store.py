@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from PyQt6.QtGui import QPixmap, QImage
+
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+class ThumbnailStore:
+    # 卡片缩略图的内存池：所有 QPixmap 集中存放，总字节数超过上限时按 LRU 淘汰视野外的条目。
+    # 被淘汰的文件再次可见时由 ThumbnailLoader 重新载入（通常命中磁盘缓存，否则重新渲染）。
+    # 拖拽预览图也缓存在这里，计入同一预算，内存紧张时先淘汰。
+    # 恢复会话时缩略图以 PNG 形式放入，第一次显示时才解码；有 PNG 的条目被淘汰后直接重新解码
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._pixmaps = OrderedDict()   # 路径 -> QPixmap
+        self._previews = OrderedDict()  # 路径 -> 拖拽预览 QPixmap
+        self._bytes = 0
+        self._visible = set()
+        self._evicted = set()  # 已淘汰、尚未重新载入的路径
+        self._encoded = {}     # 路径 -> (PNG 字节, 设备像素比)
+        self._encoded_bytes = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.preview_hits = 0
+        self.preview_misses = 0
+        self.decodes = 0
+
+    def put(self, pdf_path, image):
+        # image 为 QImage，None 表示该文件没有预览
+        if pdf_path in self._evicted:
+            self.reloads += 1
+        self.discard(pdf_path)
+        if image is None:
+            return None
+        pixmap = QPixmap.fromImage(image)
+        self._pixmaps[pdf_path] = pixmap
+        self._bytes += pixmap_bytes(pixmap)
+        self._shrink()
+        return pixmap
+
+    def put_encoded(self, pdf_path, data, device_pixel_ratio=1.0):
+        self.discard(pdf_path)
+        self._encoded[pdf_path] = (data, device_pixel_ratio)
+        self._encoded_bytes += len(data)
+
+    def encoded(self, pdf_path):
+        entry = self._encoded.get(pdf_path)
+        return entry[0] if entry else None
+
+    def get(self, pdf_path):
+        pixmap = self._pixmaps.get(pdf_path)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(pdf_path)
+            return pixmap
+        entry = self._encoded.get(pdf_path)
+        if entry is None:
+            return None
+        image = QImage.fromData(entry[0], "PNG")
+        if image.isNull():
+            return None
+        image.setDevicePixelRatio(entry[1])
+        pixmap = QPixmap.fromImage(image)
+        self._pixmaps[pdf_path] = pixmap
+        self._bytes += pixmap_bytes(pixmap)
+        self.decodes += 1
+        self._shrink()
+        return pixmap
+
+    def needs_reload(self, pdf_path):
+        return pdf_path in self._evicted
+
+    def set_visible(self, paths):
+        # 可见卡片的缩略图不会被淘汰
+        self._visible = set(paths)
+        for path in paths:
+            if path in self._pixmaps:
+                self._pixmaps.move_to_end(path)
+        self._shrink()
+
+    def drag_preview(self, pdf_path, render):
+        # render() 生成预览图；同一文件只生成一次，缩略图或卡片状态变化时失效
+        pixmap = self._previews.get(pdf_path)
+        if pixmap is not None:
+            self._previews.move_to_end(pdf_path)
+            self.preview_hits += 1
+            return pixmap
+        self.preview_misses += 1
+        pixmap = render()
+        self._previews[pdf_path] = pixmap
+        self._bytes += pixmap_bytes(pixmap)
+        self._shrink()
+        return pixmap
+
+    def discard_preview(self, pdf_path):
+        pixmap = self._previews.pop(pdf_path, None)
+        if pixmap is not None:
+            self._bytes -= pixmap_bytes(pixmap)
+
+    def discard(self, pdf_path):
+        self._evicted.discard(pdf_path)
+        entry = self._encoded.pop(pdf_path, None)
+        if entry is not None:
+            self._encoded_bytes -= len(entry[0])
+        self.discard_preview(pdf_path)
+        pixmap = self._pixmaps.pop(pdf_path, None)
+        if pixmap is not None:
+            self._bytes -= pixmap_bytes(pixmap)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._previews.clear()
+        self._evicted.clear()
+        self._encoded.clear()
+        self._visible = set()
+        self._bytes = 0
+        self._encoded_bytes = 0
+
+    def _shrink(self):
+        # 最近一次拖拽的预览图保留
+        while self._bytes > self.max_bytes and len(self._previews) > 1:
+            _, pixmap = self._previews.popitem(last=False)
+            self._bytes -= pixmap_bytes(pixmap)
+        if self._bytes <= self.max_bytes:
+            return
+        for path in list(self._pixmaps):
+            if self._bytes <= self.max_bytes:
+                break
+            if path in self._visible:
+                continue
+            self._bytes -= pixmap_bytes(self._pixmaps.pop(path))
+            if path not in self._encoded:
+                self._evicted.add(path)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "entries": len(self._pixmaps),
+            "previews": len(self._previews),
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            "encoded_bytes": self._encoded_bytes,
+            "decodes": self.decodes,
+            "preview_hits": self.preview_hits,
+            "preview_misses": self.preview_misses,
+        }
@@ -1,134 +1,353 @@
-from PyQt6.QtWidgets import QWidget, QGridLayout
-from PyQt6.QtCore import Qt, QPoint, QPropertyAnimation, QEasingCurve, QRect
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QPoint, QRect, pyqtSignal, QPropertyAnimation, QParallelAnimationGroup, QEasingCurve
 from PyQt6.QtGui import QPainter, QPen
+from ui.widgets.file_card import FileCard
+from ui.thumbnail_store import ThumbnailStore
+from perf import timed
+
+
+class CardItem:
+    # 卡片数据；只有可见的条目才绑定 FileCard 控件，缩略图放在 ThumbnailStore 中
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.info = None       # DocumentInfo
+        self.loaded = False
+        self.matches = None    # 全文搜索命中的页码列表；没有搜索时为 None
+
+    @property
+    def page_count(self):
+        return self.info.page_count if self.info else None
+
 
 class CardContainer(QWidget):
-    def __init__(self):
+    # 虚拟化卡片网格：位置按下标直接计算，只为可见区域实例化 FileCard，
+    # 滚出视野的控件回收复用，窗口缩放只重排可见控件
+    CARD_WIDTH = 150
+    CARD_HEIGHT = 220
+    SPACING = 20
+    MARGIN = 10
+    REORDER_DURATION = 180
+
+    # 新出现在视野中的文件路径（可见集合发生变化时发出）
+    visible_changed = pyqtSignal(list)
+    remove_requested = pyqtSignal(str)
+
+    def __init__(self, store=None):
         super().__init__()
         self.setAcceptDrops(True)
-        self.cards = []
+        self.store = store or ThumbnailStore()
+        self.items = []
+        self._by_path = {}
+        self._index = {}   # 路径 -> 在 items 中的下标
+        self._cards = {}   # 下标 -> 已绑定的 FileCard
+        self._spare = []   # 回收的 FileCard
+        self._visible_range = range(0)
+        self.columns = 1
         self.drag_insert_index = None
+        self._animation = None
+        self._matched = set()  # 当前有搜索命中的路径
 
-        self.grid_layout = QGridLayout()
-        self.grid_layout.setSpacing(20)
-        self.setLayout(self.grid_layout)
-        self.dragged_card = None
+    # --- 数据 ---
+    def add_cards(self, paths):
+        for path in paths:
+            item = CardItem(path)
+            self._index[path] = len(self.items)
+            self.items.append(item)
+            self._by_path[path] = item
+        self.relayout()
 
-    def add_card(self, card):
-        self.cards.append(card)
+    def restore_cards(self, entries, device_pixel_ratio=1.0):
+        # 恢复会话：entries 为 SessionEntry，已校验的文档信息和缩略图直接填入，不必重新读取文件
+        for entry in entries:
+            item = CardItem(entry.path)
+            info = entry.info
+            if info is not None:
+                item.info = info
+                if entry.thumbnail:
+                    self.store.put_encoded(entry.path, entry.thumbnail, device_pixel_ratio)
+                # 本来就没有预览的文件不必再读；缺缩略图的交给 ThumbnailLoader 补上
+                item.loaded = bool(entry.thumbnail) or info.encrypted or bool(info.error) or not info.page_count
+            self._index[entry.path] = len(self.items)
+            self.items.append(item)
+            self._by_path[entry.path] = item
         self.relayout()
 
+    def add_card(self, pdf_path):
+        self.add_cards([pdf_path])
+
+    def paths(self):
+        return [item.pdf_path for item in self.items]
+
+    def item(self, pdf_path):
+        return self._by_path.get(pdf_path)
+
+    def set_item_data(self, pdf_path, image, info):
+        item = self._by_path.get(pdf_path)
+        if item is None:
+            return
+        self.store.put(pdf_path, image)
+        item.info = info
+        item.loaded = True
+        card = self._cards.get(self._index[pdf_path])
+        if card is not None:
+            card.bind(item)
+
+    def set_matches(self, matches):
+        # matches 为 {路径: 命中页码}，None 表示清除搜索；只重新绑定状态变化的可见卡片
+        matches = matches or {}
+        changed = self._matched | set(matches)
+        self._matched = set(p for p in matches if p in self._by_path)
+        for path in changed:
+            item = self._by_path.get(path)
+            if item is None:
+                continue
+            item.matches = matches.get(path)
+            self.store.discard_preview(path)
+            card = self._cards.get(self._index[path])
+            if card is not None:
+                card.bind(item)
+
+    def first_match_index(self):
+        indexes = [self._index[path] for path in self._matched if path in self._index]
+        return min(indexes) if indexes else None
+
+    def remove_card(self, pdf_path):
+        item = self._by_path.pop(pdf_path, None)
+        if item is None:
+            return
+        index = self._index.pop(pdf_path)
+        del self.items[index]
+        self.store.discard(pdf_path)
+        self._reindex(index, len(self.items) - 1)
+        self._rebind_all()
+
+    def clear_cards(self):
+        self._matched.clear()
+        self.store.clear()
+        self.items.clear()
+        self._by_path.clear()
+        self._index.clear()
+        self._rebind_all()
+
+    def _reindex(self, lo, hi):
+        for i in range(lo, hi + 1):
+            self._index[self.items[i].pdf_path] = i
+
+    def visible_paths(self):
+        return [self.items[i].pdf_path for i in self._visible_range if i < len(self.items)]
+
+    # --- 布局 ---
+    def _cell_size(self):
+        return self.CARD_WIDTH + self.SPACING, self.CARD_HEIGHT + self.SPACING
+
+    def _columns_for(self, width):
+        cell_w, _ = self._cell_size()
+        return max(1, (width - 2 * self.MARGIN + self.SPACING) // cell_w)
+
+    def cell_rect(self, index):
+        cell_w, cell_h = self._cell_size()
+        row, col = divmod(index, self.columns)
+        return QRect(self.MARGIN + col * cell_w, self.MARGIN + row * cell_h, self.CARD_WIDTH, self.CARD_HEIGHT)
+
+    def _content_height(self):
+        _, cell_h = self._cell_size()
+        rows = (len(self.items) + self.columns - 1) // self.columns
+        return 2 * self.MARGIN + max(0, rows * cell_h - self.SPACING)
+
+    def _viewport_span(self):
+        # 放在 QScrollArea 中时，父控件是视口，滚动表现为本控件的位移
+        viewport = self.parentWidget()
+        if viewport is None:
+            return 0, self.height()
+        top = -self.y()
+        return top, top + viewport.height()
+
+    def _compute_visible_range(self):
+        if not self.items:
+            return range(0)
+        _, cell_h = self._cell_size()
+        top, bottom = self._viewport_span()
+        first_row = max(0, (top - self.MARGIN) // cell_h)
+        last_row = max(first_row, (bottom - self.MARGIN) // cell_h)
+        return range(first_row * self.columns, min(len(self.items), (last_row + 1) * self.columns))
+
+    @timed("cards.relayout")
     def relayout(self):
-        for i in reversed(range(self.grid_layout.count())):
-            w = self.grid_layout.itemAt(i).widget()
-            if w:
-                self.grid_layout.removeWidget(w)
-        self.grid_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        width = self.width()
-        card_width = 200
-        spacing = self.grid_layout.spacing()
-        columns = max(1, width // (card_width + spacing))
-
-        for index, card in enumerate(self.cards):
-            row = index // columns
-            col = index % columns
-            self.grid_layout.addWidget(card, row, col)
+        self.columns = self._columns_for(self.width())
+        self.setMinimumHeight(self._content_height())
+        self._rebind_all()
+
+    def _rebind_all(self):
+        # 列表内容变了：可见区域内的控件全部重新绑定（代价只与可见数量有关）
+        self._finish_animation()
+        # 先摘下再隐藏：隐藏带焦点的控件时滚动区域可能重新定位，期间会重入 _update_visible
+        cards = list(self._cards.values())
+        self._cards.clear()
+        self._visible_range = range(0)
+        for card in cards:
+            card.hide()
+            self._spare.append(card)
+        self.setMinimumHeight(self._content_height())
+        self._update_visible()
+
+    def _take_card(self):
+        if self._spare:
+            return self._spare.pop()
+        card = FileCard(lambda c: self.remove_requested.emit(c.pdf_path), self.store)
+        card.setParent(self)
+        return card
+
+    @timed("cards.update_visible")
+    def _update_visible(self):
+        new_range = self._compute_visible_range()
+        for index in list(self._cards):
+            if index not in new_range:
+                card = self._cards.pop(index)
+                card.hide()
+                self._spare.append(card)
+        shown = []
+        for index in new_range:
+            card = self._cards.get(index)
+            if card is None:
+                card = self._take_card()
+                card.bind(self.items[index])
+                self._cards[index] = card
+                card.show()
+                shown.append(index)
+            card.setGeometry(self.cell_rect(index))
+        changed = new_range != self._visible_range
+        self._visible_range = new_range
+        if changed:
+            self.store.set_visible(self.visible_paths())
+        if changed or shown:
+            self.visible_changed.emit(self.visible_paths())
 
     def resizeEvent(self, event):
-        self.relayout()
         super().resizeEvent(event)
+        self._finish_animation()
+        columns = self._columns_for(self.width())
+        if columns != self.columns:
+            self.columns = columns
+            self.setMinimumHeight(self._content_height())
+        self._update_visible()
+
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        self._update_visible()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._update_visible()
 
     # --- 拖拽事件 ---
+    def get_insert_index(self, pos: QPoint):
+        # 由网格几何直接算出插入位置
+        cell_w, cell_h = self._cell_size()
+        row = max(0, (pos.y() - self.MARGIN) // cell_h)
+        col = min(self.columns, max(0, (pos.x() - self.MARGIN + cell_w // 2) // cell_w))
+        return min(len(self.items), row * self.columns + col)
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasFormat("application/x-card"):
             event.acceptProposedAction()
 
-    def dropEvent(self, event):
+    def dragMoveEvent(self, event):
         if event.mimeData().hasFormat("application/x-card"):
-            pos = event.position().toPoint()
-            self.handle_drop(pos)
+            self.drag_insert_index = self.get_insert_index(event.position().toPoint())
+            self.update()
             event.acceptProposedAction()
 
-    def handle_drop(self, pos):
-        if not self.dragged_card:
-            return
-        insert_index = self.get_insert_index(pos, self.dragged_card)
-        if insert_index is None:
-            insert_index = len(self.cards)
-        self.cards.remove(self.dragged_card)
-        self.cards.insert(insert_index, self.dragged_card)
-        self.relayout()
+    def dragLeaveEvent(self, event):
+        self.drag_insert_index = None
+        self.update()
 
     def dropEvent(self, event):
-        pos = event.position().toPoint()
+        self.drag_insert_index = None
+        self.update()
         pdf_path = event.mimeData().text()
-        dragged_card = next((c for c in self.cards if c.pdf_path == pdf_path), None)
-        if not dragged_card:
+        item = self._by_path.get(pdf_path)
+        if item is None:
             return
-
-        insert_index = self.get_insert_index(pos)
-        if insert_index is None:
-            insert_index = len(self.cards)
-
-        # 动画移动
-        self.animate_reorder(dragged_card, insert_index)
+        self.move_item(item, self.get_insert_index(event.position().toPoint()))
         event.acceptProposedAction()
 
-    def get_insert_index(self, pos: QPoint):
-        for i, card in enumerate(self.cards):
-            rect = card.geometry()
-            if pos.y() < rect.center().y():
-                return i
-        return None
-
-    def animate_reorder(self, card, new_index):
-        old_index = self.cards.index(card)
+    def move_item(self, item, new_index):
+        # 只有 [lo, hi] 区间内的卡片换了位置：区间内可见的控件跟着各自的条目移动并做动画，
+        # 区间外的控件不动；代价与被挤开的卡片数量成正比
+        old_index = self._index[item.pdf_path]
+        if new_index > old_index:
+            new_index -= 1
         if old_index == new_index:
             return
+        self._finish_animation()
+        self.items.pop(old_index)
+        self.items.insert(new_index, item)
+        lo, hi = min(old_index, new_index), max(old_index, new_index)
+        self._reindex(lo, hi)
 
-        self.cards.remove(card)
-        self.cards.insert(new_index, card)
-
-        # 先计算目标位置
-        width = self.width()
-        card_width = 170
-        spacing = self.grid_layout.spacing()
-        columns = max(1, width // (card_width + spacing))
-
-        animations = []
-        for i, c in enumerate(self.cards):
-            target_row = i // columns
-            target_col = i % columns
-            target_pos = self.grid_layout.cellRect(target_row, target_col).topLeft()
-
-            anim = QPropertyAnimation(c, b"geometry")
-            anim.setDuration(300)
-            anim.setEasingCurve(QEasingCurve.Type.OutCubic)
-            anim.setStartValue(c.geometry())
-            anim.setEndValue(QRect(target_pos, c.size()))
-            anim.start()
-            animations.append(anim)
-
-        # 重排布局（动画结束后）
-        self.relayout()
+        displaced = {}
+        for index in range(lo, hi + 1):
+            card = self._cards.pop(index, None)
+            if card is not None:
+                displaced[id(card.item)] = card
+        group = QParallelAnimationGroup(self)
+        visible = self._visible_range
+        shown = False
+        for index in range(max(lo, visible.start), min(hi + 1, visible.stop)):
+            moved = self.items[index]
+            card = displaced.pop(id(moved), None)
+            if card is None:
+                # 从视野外挤进来的条目直接放到位
+                card = self._take_card()
+                card.bind(moved)
+                card.setGeometry(self.cell_rect(index))
+                card.show()
+                shown = True
+            else:
+                animation = QPropertyAnimation(card, b"geometry", group)
+                animation.setDuration(self.REORDER_DURATION)
+                animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+                animation.setStartValue(card.geometry())
+                animation.setEndValue(self.cell_rect(index))
+                group.addAnimation(animation)
+            self._cards[index] = card
+        for card in displaced.values():
+            # 被挤出视野的控件回收
+            card.hide()
+            self._spare.append(card)
+        # 可见的条目变了：挤出视野的缩略图可以淘汰，挤进来的需要载入（可能已被淘汰）
+        self.store.set_visible(self.visible_paths())
+        if shown:
+            self.visible_changed.emit(self.visible_paths())
+        if group.animationCount():
+            self._animation = group
+            group.finished.connect(lambda: self._animation is group and self._finish_animation())
+            group.start()
+        else:
+            group.deleteLater()
+
+    def _finish_animation(self):
+        # 上一次拖放的动画还没结束就直接跳到终点
+        group, self._animation = self._animation, None
+        if group is None:
+            return
+        group.stop()
+        for i in range(group.animationCount()):
+            animation = group.animationAt(i)
+            animation.targetObject().setGeometry(animation.endValue())
+        group.deleteLater()
 
     def paintEvent(self, event):
         super().paintEvent(event)
-        if self.drag_insert_index is not None and self.drag_insert_index <= len(self.cards):
+        if self.drag_insert_index is not None and self.items:
             painter = QPainter(self)
             pen = QPen(Qt.GlobalColor.red, 2)
             painter.setPen(pen)
-            if self.drag_insert_index < len(self.cards):
-                rect = self.cards[self.drag_insert_index].geometry()
-                painter.drawLine(rect.left(), rect.top(), rect.left(), rect.bottom())
+            if self.drag_insert_index < len(self.items):
+                rect = self.cell_rect(self.drag_insert_index)
+                x = rect.left() - self.SPACING // 2
             else:
                 # 最后位置
-                if self.cards:
-                    rect = self.cards[-1].geometry()
-                    painter.drawLine(rect.right() + 10, rect.top(), rect.right() + 10, rect.bottom())
-
-    def clear_cards(self):
-        for card in self.cards:
-            card.deleteLater()
-        self.cards.clear()
-        self.relayout()
+                rect = self.cell_rect(len(self.items) - 1)
+                x = rect.right() + self.SPACING // 2
+            painter.drawLine(x, rect.top(), x, rect.bottom())
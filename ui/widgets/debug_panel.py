@@ -0,0 +1,88 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QCheckBox, QLabel,
+    QFileDialog, QHeaderView
+)
+from PyQt6.QtCore import Qt, QTimer
+from perf import recorder
+
+
+class DebugPanel(QWidget):
+    # 隐藏的调试面板（Ctrl+Shift+D）：实时显示埋点统计和缓存状态，可导出 JSON / Chrome trace
+    COLUMNS = ("名称", "次数", "平均 ms", "p50 ms", "p95 ms", "最大 ms", "总计 ms", "MB")
+
+    def __init__(self, stats_sources=None, parent=None):
+        super().__init__(parent, Qt.WindowType.Tool)
+        self.setWindowTitle("性能统计")
+        self.resize(720, 420)
+        # 名称 -> 返回统计字典的函数，如缩略图缓存的 stats()
+        self.stats_sources = stats_sources or {}
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table, 1)
+
+        self.sources_label = QLabel()
+        self.sources_label.setStyleSheet("color:#555; font-size:12px;")
+        self.sources_label.setWordWrap(True)
+        layout.addWidget(self.sources_label)
+
+        buttons = QHBoxLayout()
+        self.profile_check = QCheckBox("为后续任务采集 cProfile / tracemalloc")
+        buttons.addWidget(self.profile_check)
+        buttons.addStretch()
+        for text, slot in (("导出 JSON", self.export_json), ("导出 Chrome Trace", self.export_trace),
+                           ("重置", self.reset)):
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            buttons.addWidget(btn)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        stats = recorder.snapshot()
+        self.table.setRowCount(len(stats))
+        for row, (name, s) in enumerate(stats.items()):
+            values = (name, s["count"], s["mean_ms"], s["p50_ms"], s["p95_ms"], s["max_ms"], s["total_ms"],
+                      round(s["bytes"] / 2 ** 20, 2))
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if col:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+        lines = []
+        for label, source in self.stats_sources.items():
+            fields = ", ".join(f"{k}={v}" for k, v in source().items())
+            lines.append(f"{label}: {fields}")
+        self.sources_label.setText("\n".join(lines))
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出统计", "pdftool-stats.json", "JSON (*.json)")
+        if path:
+            recorder.write_json(path)
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出 Chrome Trace", "pdftool-trace.json", "JSON (*.json)")
+        if path:
+            recorder.write_chrome_trace(path)
+
+    def reset(self):
+        recorder.reset()
+        self.refresh()
@@ -1,38 +1,41 @@
 import os
 from PyQt6.QtWidgets import QFrame, QVBoxLayout, QLabel, QPushButton
 from PyQt6.QtCore import Qt, QMimeData
-from PyQt6.QtGui import QDrag
-from pdf_utils import generate_thumbnail, get_pdf_page_count
+from PyQt6.QtGui import QDrag, QPixmap
 
 class FileCard(QFrame):
-    def __init__(self, pdf_path, remove_callback):
+    # 可复用的卡片控件，通过 bind() 显示某个 CardItem
+    STYLE = "background:white; border:none; border-radius:10px;"
+    # 全文搜索命中时的底色
+    MATCH_STYLE = "background:#fff3c4; border:none; border-radius:10px;"
+    def __init__(self, remove_callback, store):
         super().__init__()
-        self.pdf_path = pdf_path
+        self.item = None
+        self.pdf_path = None
         self.remove_callback = remove_callback
+        self.store = store
         self.setFixedSize(150, 220)
-        self.setStyleSheet("background:white; border:none; border-radius:10px;")
+        self.setStyleSheet(self.STYLE)
 
         layout = QVBoxLayout()
         layout.setSpacing(20)
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        thumbnail = generate_thumbnail(pdf_path)
-        thumb_label = QLabel()
-        thumb_label.setStyleSheet("border:1px solid #ddd; border-radius:5px; background:#fafafa;")
-        thumb_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        if thumbnail:
-            thumb_label.setPixmap(thumbnail.scaled(120, 150, Qt.AspectRatioMode.KeepAspectRatio))
-        layout.addWidget(thumb_label)
+        # 缩略图和页数由后台线程池渲染，先显示占位
+        self.thumb_label = QLabel("加载中…")
+        self.thumb_label.setFixedSize(120, 150)
+        self.thumb_label.setStyleSheet("border:1px solid #ddd; border-radius:5px; background:#fafafa; color:#aaa;")
+        self.thumb_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.thumb_label)
 
-        name_label = QLabel(os.path.basename(pdf_path))
-        name_label.setStyleSheet("font-size:12px; color:#333;")
-        name_label.setWordWrap(True)
-        layout.addWidget(name_label)
+        self.name_label = QLabel()
+        self.name_label.setStyleSheet("font-size:12px; color:#333;")
+        self.name_label.setWordWrap(True)
+        layout.addWidget(self.name_label)
 
-        pages = get_pdf_page_count(pdf_path)
-        page_label = QLabel(f"共 {pages} 页")
-        page_label.setStyleSheet("color:gray; font-size:10px;")
-        layout.addWidget(page_label)
+        self.page_label = QLabel("共 - 页")
+        self.page_label.setStyleSheet("color:gray; font-size:10px;")
+        layout.addWidget(self.page_label)
 
         remove_btn = QPushButton("删除")
         remove_btn.setStyleSheet("background:#ff4d4f; color:white; border:none; padding:5px; border-radius:5px;")
@@ -41,6 +44,40 @@ class FileCard(QFrame):
 
         self.setLayout(layout)
 
+    def bind(self, item):
+        self.item = item
+        self.pdf_path = item.pdf_path
+        self.name_label.setText(os.path.basename(item.pdf_path))
+        # 缩略图被淘汰时先显示占位，等重新载入
+        self.set_thumbnail(self.store.get(item.pdf_path), item.loaded and not self.store.needs_reload(item.pdf_path))
+        self.set_info(item.info)
+        self.set_matches(item.matches)
+
+    def set_thumbnail(self, pixmap, loaded=True):
+        if pixmap is None:
+            self.thumb_label.setPixmap(QPixmap())
+            self.thumb_label.setText("无预览" if loaded else "加载中…")
+            return
+        # 已按标签尺寸和屏幕缩放渲染，直接显示
+        self.thumb_label.setPixmap(pixmap)
+
+    def set_info(self, info):
+        if info is None:
+            self.page_label.setText("共 - 页")
+        elif info.encrypted:
+            self.page_label.setText("已加密")
+        elif info.error:
+            self.page_label.setText("无法打开")
+        else:
+            self.page_label.setText(f"共 {info.page_count} 页" + ("（已修复）" if info.repaired else ""))
+
+    def set_matches(self, pages):
+        style = self.MATCH_STYLE if pages else self.STYLE
+        if self.styleSheet() != style:
+            self.setStyleSheet(style)
+        if pages:
+            self.page_label.setText(self.page_label.text() + f" · 命中 {len(pages)} 页")
+
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             drag = QDrag(self)
@@ -49,9 +86,8 @@ class FileCard(QFrame):
             mime_data.setData("application/x-card", self.pdf_path.encode())
             drag.setMimeData(mime_data)
 
-            # 设置拖拽时的预览图
-            pixmap = self.grab()
-            drag.setPixmap(pixmap)
+            # 拖拽预览图每个文件只截取一次
+            drag.setPixmap(self.store.drag_preview(self.pdf_path, self.grab))
             drag.setHotSpot(event.pos())
 
             drag.exec(Qt.DropAction.MoveAction)
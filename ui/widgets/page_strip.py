@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from PyQt6.QtWidgets import QListView, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QPoint, pyqtSignal
+from PyQt6.QtGui import QPixmap, QColor, QBrush
+from pdf_utils import format_page_ranges
+
+
+class PageStripModel(QAbstractListModel):
+    # 每页一行；缩略图只在视图真正要绘制该页时才请求，渲染结果放进按字节数限制的 LRU
+    def __init__(self, renderer, max_bytes=64 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self.pdf_path = None
+        self.page_count = 0
+        self._pixmaps = OrderedDict()  # 页码 -> QPixmap
+        self._bytes = 0
+        self._highlighted = frozenset()  # 全文搜索命中的页
+        self._highlight_brush = QBrush(QColor("#fff3c4"))
+        self._placeholder = QPixmap(renderer.width, renderer.height)
+        self._placeholder.fill(QColor("#eeeeee"))
+        renderer.rendered.connect(self._on_rendered)
+
+    def set_document(self, pdf_path, page_count):
+        self.beginResetModel()
+        self.pdf_path = pdf_path
+        self.page_count = page_count
+        self._highlighted = frozenset()
+        self._pixmaps.clear()
+        self._bytes = 0
+        self.renderer.set_document(pdf_path)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_document(None, 0)
+
+    def set_highlighted(self, rows):
+        rows = frozenset(rows)
+        if rows == self._highlighted:
+            return
+        changed = rows ^ self._highlighted
+        self._highlighted = rows
+        if changed:
+            self.dataChanged.emit(self.index(min(changed)), self.index(max(changed)),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.page_count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(row + 1)
+        if role == Qt.ItemDataRole.DecorationRole:
+            pixmap = self._pixmaps.get(row)
+            if pixmap is None:
+                self.renderer.request(row)
+                return self._placeholder
+            self._pixmaps.move_to_end(row)
+            return pixmap
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.BackgroundRole and row in self._highlighted:
+            return self._highlight_brush
+        return None
+
+    def _on_rendered(self, pdf_path, row, image):
+        if pdf_path != self.pdf_path or row >= self.page_count:
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._pixmaps[row] = pixmap
+        self._bytes += _pixmap_bytes(pixmap)
+        while self._bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self._bytes -= _pixmap_bytes(evicted)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+def _pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+class PageStrip(QListView):
+    # 单行页面条：QListView 只为可见的行取数据，几千页的文档也只渲染屏幕上的几页。
+    # 单击选中一页，Shift 单击选中一段，Ctrl 单击增减，选中结果转成 "1-3,7" 形式
+    ranges_selected = pyqtSignal(str)
+
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.page_model = PageStripModel(renderer, parent=self)
+        self.setModel(self.page_model)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setIconSize(QSize(renderer.width, renderer.height))
+        self.setGridSize(QSize(renderer.width + 16, renderer.height + 28))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setFixedHeight(renderer.height + 50)
+        self.setStyleSheet("""
+            QListView {
+                border: 1px solid #ddd;
+                border-radius: 6px;
+                background: white;
+            }
+            QListView::item:selected {
+                background: #fde0dc;
+                color: #e53935;
+            }
+        """)
+        self.horizontalScrollBar().valueChanged.connect(self._update_visible)
+        self.selectionModel().selectionChanged.connect(self._on_selection_changed)
+
+    def set_document(self, pdf_path, page_count):
+        self.page_model.set_document(pdf_path, page_count)
+        self.horizontalScrollBar().setValue(0)
+        self._update_visible()
+
+    def clear(self):
+        self.page_model.clear()
+
+    def highlight_pages(self, rows):
+        # 标出全文搜索命中的页，并滚动到第一处
+        self.page_model.set_highlighted(rows)
+        if rows:
+            self.scrollTo(self.page_model.index(min(rows)), QAbstractItemView.ScrollHint.PositionAtCenter)
+
+    def select_ranges(self, ranges):
+        # ranges 为从 0 开始的 (start, end) 闭区间，用于从输入框回填选中状态
+        selection = self.selectionModel()
+        selection.blockSignals(True)
+        selection.clearSelection()
+        for start, end in ranges:
+            for row in range(start, end + 1):
+                selection.select(self.page_model.index(row), selection.SelectionFlag.Select)
+        selection.blockSignals(False)
+        self.viewport().update()
+
+    def visible_rows(self):
+        if not self.page_model.page_count:
+            return range(0)
+        y = self.viewport().height() // 2
+        first = self.indexAt(QPoint(1, y))
+        last = self.indexAt(QPoint(self.viewport().width() - 2, y))
+        start = first.row() if first.isValid() else 0
+        end = last.row() if last.isValid() else self.page_model.page_count - 1
+        return range(start, end + 1)
+
+    def _update_visible(self, *args):
+        self.renderer.set_visible(self.visible_rows())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_visible()
+
+    def _on_selection_changed(self, *args):
+        rows = [index.row() for index in self.selectionModel().selectedIndexes()]
+        if rows:
+            self.ranges_selected.emit(format_page_ranges(rows))
@@ -0,0 +1,416 @@
+import os
+import re
+import time
+import signal
+import sqlite3
+import hashlib
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from thumbnail_cache import default_cache_dir
+from ingest import sniff, HEAD_BYTES
+from perf import recorder
+import pdf_utils
+
+logger = logging.getLogger(__name__)
+
+WATCH_OPS = ("merge", "split")
+# 扫描仪、同步工具和浏览器写入过程中使用的临时文件名
+_TEMP_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".filepart", ".download")
+TAIL_BYTES = 1024
+# 文件稳定后仍缺少 %%EOF 时最多再等多少秒
+INCOMPLETE_GRACE = 60.0
+# 最近多少个文件参与延迟统计
+LATENCY_SAMPLES = 1000
+
+
+def default_journal_path(folder):
+    # 每个监视目录一份日志，放在本机缓存目录，不往（可能是网络共享的）监视目录里写
+    tag = hashlib.blake2b(os.path.abspath(folder).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(os.path.dirname(default_cache_dir()), "watch", f"{tag}.db")
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    op: str = "merge"        # merge：同组文件合并为一个 PDF；split：每个文件单独拆分
+    pattern: str = None      # 分组正则，取第一个捕获组（没有捕获组时取整个匹配）为组名；不匹配的文件归入默认组
+    window: float = 30.0     # 组内最后一个文件到达后静默多少秒开始处理
+    settle: float = 2.0      # 文件大小和修改时间保持不变多少秒才算写完
+    interval: float = 1.0    # 轮询间隔（秒）
+    max_group: int = 200     # 一组达到这么多文件时不再等待，立即处理
+    step: int = None         # split 时每份的页数，None 为每页一份
+    workers: int = 2         # 同时执行的任务数
+    save: object = None      # SaveOptions
+
+    def __post_init__(self):
+        if self.op not in WATCH_OPS:
+            raise ValueError(f"不支持的监视任务: {self.op}")
+        if self.pattern:
+            try:
+                re.compile(self.pattern)
+            except re.error as e:
+                raise ValueError(f"分组规则无效: {e}") from None
+        if self.window < 0 or self.settle < 0 or self.interval <= 0:
+            raise ValueError("时间参数无效")
+        if self.workers < 1 or self.max_group < 1:
+            raise ValueError("任务数和分组大小必须大于 0")
+        if self.step is not None and self.step < 1:
+            raise ValueError("步长必须大于 0")
+
+    def group_key(self, name):
+        if self.op == "split":
+            return name
+        if not self.pattern:
+            return ""
+        match = re.search(self.pattern, name)
+        if match is None:
+            return ""
+        return match.group(1) if match.re.groups else match.group(0)
+
+
+class Journal:
+    # 持久化的处理记录：到达、排队、完成、失败各一次提交，进程重启后已完成的文件不再处理，
+    # 排队中未完成的文件重新分组。文件被替换（大小或修改时间变化）视为新文件
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, group_key TEXT, state TEXT, "
+            "arrived REAL, finished REAL, output TEXT, error TEXT)"
+        )
+        self._db.commit()
+
+    def known(self):
+        # {路径: (大小, 修改时间)}，包括所有状态
+        rows = self._db.execute("SELECT path, size, mtime_ns FROM files").fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def queued(self):
+        # 上次退出时还没处理完的文件：[(路径, 组名, 到达时间)]，按到达顺序
+        return self._db.execute(
+            "SELECT path, group_key, arrived FROM files WHERE state = 'queued' ORDER BY arrived, path"
+        ).fetchall()
+
+    def record(self, path, size, mtime_ns, group_key, state, arrived):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, group_key, state, arrived) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, group_key, state, arrived),
+            )
+
+    def finish(self, paths, state, output=None, error=None):
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "UPDATE files SET state = ?, finished = ?, output = ?, error = ? WHERE path = ?",
+                [(state, now, output, error, path) for path in paths],
+            )
+
+    def counts(self):
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM files GROUP BY state").fetchall())
+
+    def close(self):
+        self._db.close()
+
+
+@dataclass
+class WatchBatch:
+    # 一次合并或拆分任务；arrived 为每个输入文件的到达时间（time.time()）
+    key: str
+    paths: list
+    arrived: list
+    outputs: list = field(default_factory=list)
+    pages: int = 0
+    skipped: dict = field(default_factory=dict)   # 路径 -> 无法处理的原因
+    error: str = None
+    started: float = None
+    finished: float = None
+
+    @property
+    def latency(self):
+        # 从最早到达到输出完成的秒数
+        return self.finished - min(self.arrived) if self.finished and self.arrived else None
+
+
+def _inspect(path, size):
+    # 返回 (文件类型, 是否以 %%EOF 结尾)；完整的 PDF 最后 1 KB 内一定有 %%EOF
+    with open(path, "rb") as f:
+        kind = sniff(f.read(HEAD_BYTES))
+        f.seek(max(0, size - TAIL_BYTES))
+        return kind, b"%%EOF" in f.read(TAIL_BYTES)
+
+
+def _unique_path(path):
+    base, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = f"{base}-{n}{ext}"
+    return path
+
+
+def _ignore_interrupts():
+    # Ctrl+C 只由主进程处理：正在执行的任务照常完成并记入日志，而不是被当作失败
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _process_batch(op, paths, output, step, save):
+    # 在工作进程中执行：返回 (输出列表, 页数, {跳过的路径: 原因})。
+    # 加密或损坏的输入单独跳过，不拖累同组的其他文件。
+    # 结束时释放本批输入的映射：工作进程长期存在，否则监视目录里的文件在 Windows 上无法删除或移动
+    try:
+        usable, skipped = [], {}
+        for path in paths:
+            info = pdf_utils.probe_document(path)
+            if info.error or info.encrypted or not info.page_count:
+                skipped[path] = info.error or ("已加密" if info.encrypted else "没有页面")
+            else:
+                usable.append(path)
+        if not usable:
+            return [], 0, skipped
+        if op == "merge":
+            report = pdf_utils.merge_pdfs(usable, output, options=save)
+        elif step:
+            os.makedirs(output, exist_ok=True)
+            report = pdf_utils.split_by_step(usable[0], output, step, workers=1, options=save)
+        else:
+            os.makedirs(output, exist_ok=True)
+            report = pdf_utils.split_by_page(usable[0], output, workers=1, options=save)
+        return report.outputs, report.pages, skipped
+    finally:
+        for path in paths:
+            pdf_utils.release_source(path)
+
+
+class HotFolder:
+    # 监视一个目录（不递归）：轮询发现新文件，大小和修改时间稳定 settle 秒后才视为写完；
+    # 按分组规则归组，组内静默 window 秒后封组，交给最多 workers 个进程的进程池合并或拆分。
+    # 轮询不依赖文件系统通知，网络共享上同样可靠；poll() 在调用者的线程里执行，不需要事件循环
+    def __init__(self, folder, output_dir, options=None, journal_path=None):
+        self.folder = os.path.abspath(folder)
+        self.output_dir = os.path.abspath(output_dir)
+        self.options = options or WatchOptions()
+        if os.path.normcase(self.folder) == os.path.normcase(self.output_dir):
+            raise ValueError("输出目录不能是监视目录本身")
+        self.journal = Journal(journal_path or default_journal_path(self.folder))
+        self._known = self.journal.known()
+        self._candidates = {}   # 路径 -> (大小, 修改时间, 状态开始时间, 首次发现时间)
+        self._groups = {}       # 组名 -> WatchBatch（尚未封组）
+        self._last_arrival = {}
+        self._ready = deque()   # 已封组、等待空闲进程
+        self._running = {}      # future -> WatchBatch
+        self._pool = None
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.started = time.time()
+        self.arrived = 0
+        self.processed = 0
+        self.failed = 0
+        self.pages = 0
+        self.outputs = 0
+        os.makedirs(self.output_dir, exist_ok=True)
+        # 上次退出前排队的文件重新归组，按原到达时间计算延迟
+        for path, key, arrived in self.journal.queued():
+            self._join(key, path, arrived)
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = pdf_utils.process_pool(self.options.workers, initializer=_ignore_interrupts)
+        return self._pool
+
+    def _join(self, key, path, arrived):
+        batch = self._groups.get(key)
+        if batch is None:
+            batch = self._groups[key] = WatchBatch(key, [], [])
+        batch.paths.append(path)
+        batch.arrived.append(arrived)
+        self._last_arrival[key] = time.time()
+
+    def _unjoin(self, path):
+        for key, batch in self._groups.items():
+            if path in batch.paths:
+                i = batch.paths.index(path)
+                del batch.paths[i], batch.arrived[i]
+                if not batch.paths:
+                    del self._groups[key], self._last_arrival[key]
+                return True
+        return False
+
+    # --- 轮询 ---
+    def poll(self):
+        # 执行一轮：发现新文件、封组、派发任务、收集结果。返回本轮完成的 WatchBatch 列表
+        now = time.time()
+        self._scan(now)
+        self._seal(now)
+        finished = self._collect()
+        self._dispatch()
+        return finished
+
+    def _scan(self, now):
+        seen = set()
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError as e:
+            logger.warning("无法读取监视目录 %s: %s", self.folder, e)
+            return
+        for entry in entries:
+            name = entry.name
+            if name.startswith((".", "~")) or name.lower().endswith(_TEMP_SUFFIXES):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            path = entry.path
+            state = (st.st_size, st.st_mtime_ns)
+            if self._known.get(path) == state:
+                continue
+            seen.add(path)
+            previous = self._candidates.get(path)
+            if previous is None or previous[:2] != state:
+                # 第一次看到或仍在写入：重新开始计时，到达时间取第一次发现
+                first_seen = previous[3] if previous else now
+                self._candidates[path] = (*state, now, first_seen)
+                continue
+            if now - previous[2] < self.options.settle or not st.st_size:
+                continue
+            try:
+                kind, complete = _inspect(path, st.st_size)
+            except OSError:
+                # 可能仍被写入方独占打开，下一轮再试
+                continue
+            if kind == "pdf" and not complete and now - previous[2] < INCOMPLETE_GRACE:
+                # 写入方中途停顿超过 settle 时文件还没有结尾标记，继续等；一直没有就照常处理，交给 MuPDF 修复
+                continue
+            del self._candidates[path]
+            self._known[path] = state
+            if kind != "pdf":
+                self.journal.record(path, *state, None, "ignored", previous[3])
+                continue
+            key = self.options.group_key(name)
+            self.journal.record(path, *state, key, "queued", previous[3])
+            # 排队期间被覆盖的文件换成新内容，不重复加入
+            if not self._unjoin(path):
+                self.arrived += 1
+            self._join(key, path, previous[3])
+        # 写到一半又被删掉的文件
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+
+    def _seal(self, now, force=False):
+        for key in list(self._groups):
+            batch = self._groups[key]
+            quiet = now - self._last_arrival[key]
+            if force or self.options.op == "split" or quiet >= self.options.window \
+                    or len(batch.paths) >= self.options.max_group:
+                del self._groups[key]
+                del self._last_arrival[key]
+                self._ready.append(batch)
+
+    def _output_for(self, batch):
+        if self.options.op == "split":
+            stem = os.path.splitext(os.path.basename(batch.paths[0]))[0]
+            return _unique_path(os.path.join(self.output_dir, stem))
+        name = pdf_utils.safe_file_name(batch.key) if batch.key else "batch"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return _unique_path(os.path.join(self.output_dir, f"{name}-{stamp}.pdf"))
+
+    def _dispatch(self):
+        while self._ready and len(self._running) < self.options.workers:
+            batch = self._ready.popleft()
+            batch.started = time.time()
+            future = self._executor().submit(_process_batch, self.options.op, batch.paths, self._output_for(batch),
+                                             self.options.step, self.options.save)
+            self._running[future] = batch
+
+    def _collect(self, wait=False):
+        finished = []
+        for future in list(self._running):
+            if not wait and not future.done():
+                continue
+            batch = self._running.pop(future)
+            try:
+                batch.outputs, batch.pages, batch.skipped = future.result()
+            except Exception as e:
+                logger.exception("监视任务失败: %s", batch.key or batch.paths[0])
+                batch.error = str(e) or type(e).__name__
+            batch.finished = time.time()
+            self._record(batch)
+            finished.append(batch)
+        return finished
+
+    def _record(self, batch):
+        done = [p for p in batch.paths if p not in batch.skipped]
+        output = os.pathsep.join(batch.outputs)
+        if batch.error:
+            self.journal.finish(batch.paths, "failed", error=batch.error)
+            self.failed += len(batch.paths)
+            return
+        self.journal.finish(done, "done", output=output)
+        for path, reason in batch.skipped.items():
+            self.journal.finish([path], "failed", error=reason)
+        self.failed += len(batch.skipped)
+        self.processed += len(done)
+        self.pages += batch.pages
+        self.outputs += len(batch.outputs)
+        for path, arrived in zip(batch.paths, batch.arrived):
+            if path in batch.skipped:
+                continue
+            latency = batch.finished - arrived
+            self._latencies.append(latency)
+            recorder.add("watch.latency", latency)
+        recorder.add("watch.batch", batch.finished - batch.started, files=len(done), pages=batch.pages)
+
+    # --- 运行 ---
+    def run(self, stop, on_batch=None, on_poll=None):
+        # 阻塞轮询直到 stop（threading.Event）置位或被 Ctrl+C 打断；每完成一个任务调用一次 on_batch，
+        # 每轮结束调用 on_poll(stats())。日志连接属于创建 HotFolder 的线程，run() 也要在该线程里调用
+        try:
+            while not stop.is_set():
+                for batch in self.poll():
+                    if on_batch is not None:
+                        on_batch(batch)
+                if on_poll is not None:
+                    on_poll(self.stats())
+                stop.wait(self.options.interval)
+        finally:
+            for batch in self.close():
+                if on_batch is not None:
+                    on_batch(batch)
+
+    def close(self):
+        # 等正在执行的任务完成并记入日志；还没开始的组留在日志里，下次启动时继续
+        finished = self._collect(wait=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self.journal.close()
+        return finished
+
+    def stats(self):
+        waiting = sum(len(b.paths) for b in self._groups.values()) + sum(len(b.paths) for b in self._ready)
+        running = sum(len(b.paths) for b in self._running.values())
+        elapsed = max(time.time() - self.started, 1e-6)
+        latencies = sorted(self._latencies)
+        return {
+            "queue_depth": waiting + running,
+            "waiting": waiting,
+            "running": running,
+            "writing": len(self._candidates),
+            "arrived": self.arrived,
+            "processed": self.processed,
+            "failed": self.failed,
+            "outputs": self.outputs,
+            "pages": self.pages,
+            "latency_p50_s": round(latencies[len(latencies) // 2], 2) if latencies else None,
+            "latency_max_s": round(latencies[-1], 2) if latencies else None,
+            "files_per_min": round(self.processed / elapsed * 60, 2),
+            "pages_per_s": round(self.pages / elapsed, 2),
+        }